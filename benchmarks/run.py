@@ -0,0 +1,300 @@
+"""Benchmarks of the stock market hot paths.
+
+Run from the repository root with the package installed, e.g.::
+
+    uv run python benchmarks/run.py --output results.json
+    uv run python benchmarks/run.py --baseline results.json --tolerance 0.25
+
+Every case is timed as the median seconds per call over several repeats,
+each repeat running enough calls to last at least ``--min-time`` seconds.
+With ``--baseline`` the run is compared case by case against a stored JSON
+result, and the exit code is 1 if any case is slower than the baseline by
+more than ``--tolerance``.
+
+``market_tick.json`` is the result of ``--filter market_tick``: one
+:class:`Market` step against its 18 goods advanced by the scalar ``tick``.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from collections.abc import Callable, Iterator
+from functools import partial
+from pathlib import Path
+from typing import Any, NamedTuple
+
+import numpy as np
+
+from cookieLearner.market.batch import MarketBatch
+from cookieLearner.market.env import MarketEnv, VectorMarketEnv
+from cookieLearner.market.history import PriceHistory
+from cookieLearner.market.kernels import NUMBA_AVAILABLE
+from cookieLearner.market.market import (
+    DEFAULT_CONFIG,
+    NUM_GOODS,
+    GameEnvironment,
+    Mode,
+    resting_stock_value,
+    tick,
+)
+from cookieLearner.market.parallel import ThreadedMarkets, gil_enabled
+from cookieLearner.market.randomness import UniformBlocks
+from cookieLearner.market.simulation import Market
+
+ENVIRONMENT = GameEnvironment(bank_level=5, num_brokers=10, dragon_boost=0.0)
+BATCH_SIZES = (1, 100, 10_000, 100_000)
+ENV_MARKETS = 1000
+THREADED_MARKETS = 10_000
+
+
+class Case(NamedTuple):
+    """A benchmark: a callable to time and the good-ticks one call performs.
+
+    ``teardown`` releases what the case holds, e.g. worker threads, once it
+    has been timed.
+    """
+
+    name: str
+    function: Callable[[], Any]
+    good_ticks: int
+    teardown: Callable[[], None] | None = None
+
+
+def scalar_tick() -> Case:
+    """One good advanced by the scalar ``tick``."""
+    rng = UniformBlocks(seed=0)
+    state = [10.0, 0.0, Mode.STABLE, 100]
+    resting = resting_stock_value(0, ENVIRONMENT.bank_level)
+
+    def run() -> None:
+        state[:] = tick(
+            *state,
+            resting,
+            ENVIRONMENT.bank_level,
+            0.0,
+            0.0,
+            ENVIRONMENT.dragon_boost,
+            DEFAULT_CONFIG,
+            rng=rng,
+        )
+
+    return Case("scalar_tick", run, 1)
+
+
+def scalar_market_tick() -> Case:
+    """All goods of one market advanced by the scalar ``tick``, as in MarketEnv."""
+    rng = UniformBlocks(seed=0)
+    states = [[10.0, 0.0, Mode.STABLE, 100] for _ in range(NUM_GOODS)]
+    resting = [
+        resting_stock_value(stock_id, ENVIRONMENT.bank_level)
+        for stock_id in range(NUM_GOODS)
+    ]
+
+    def run() -> None:
+        for state, resting_value in zip(states, resting, strict=True):
+            state[:] = tick(
+                *state,
+                resting_value,
+                ENVIRONMENT.bank_level,
+                0.0,
+                0.0,
+                ENVIRONMENT.dragon_boost,
+                DEFAULT_CONFIG,
+                rng=rng,
+            )
+
+    return Case("scalar_market_tick", run, NUM_GOODS)
+
+
+def market_tick() -> Case:
+    """All goods of one :class:`Market`."""
+    market = Market(ENVIRONMENT, seed=0)
+    return Case("market_tick", market.step, NUM_GOODS)
+
+
+def batch_tick(n_markets: int) -> Case:
+    """All goods of a :class:`MarketBatch` of ``n_markets`` markets."""
+    batch = MarketBatch([ENVIRONMENT] * n_markets, seed=0, history_depth=None)
+    return Case(f"batch_tick[{n_markets}]", batch.step, n_markets * NUM_GOODS)
+
+
+def threaded_tick(n_markets: int, n_workers: int) -> Case:
+    """A :class:`ThreadedMarkets` step.
+
+    With the GIL enabled the markets run on one thread whatever
+    ``n_workers``, so the cases only differ on free-threaded builds.
+    """
+    markets = ThreadedMarkets([ENVIRONMENT] * n_markets, n_workers=n_workers)
+    return Case(
+        f"threaded_tick[{n_markets}x{n_workers}]",
+        lambda: markets.step_n(1),
+        n_markets * NUM_GOODS,
+        teardown=markets.close,
+    )
+
+
+def history_push() -> Case:
+    """Pushing one tick of a batch of markets to a :class:`PriceHistory`."""
+    history = PriceHistory((ENV_MARKETS, NUM_GOODS))
+    values = np.ones((ENV_MARKETS, NUM_GOODS))
+    return Case(
+        f"history_push[{ENV_MARKETS}]",
+        lambda: history.push(values),
+        ENV_MARKETS * NUM_GOODS,
+    )
+
+
+def env_step() -> Case:
+    """A :class:`MarketEnv` step without trades."""
+    env = MarketEnv(ENVIRONMENT, max_stock=100, seed=0)
+    env.reset()
+    action = np.zeros(NUM_GOODS, dtype=np.int64)
+    return Case("env_step", lambda: env.step(action), NUM_GOODS)
+
+
+def vector_env_step() -> Case:
+    """A :class:`VectorMarketEnv` step buying one unit of every good."""
+    env = VectorMarketEnv([ENVIRONMENT] * ENV_MARKETS, max_stock=100, seed=0)
+    env.reset()
+    action = np.ones((ENV_MARKETS, NUM_GOODS), dtype=np.int64)
+    return Case(
+        f"vector_env_step[{ENV_MARKETS}]",
+        lambda: env.step(action),
+        ENV_MARKETS * NUM_GOODS,
+    )
+
+
+def cases(batch_sizes: tuple[int, ...]) -> Iterator[tuple[str, Callable[[], Case]]]:
+    """Yields the name and constructor of every case.
+
+    Cases are only built when they run, so large batches are not all held in
+    memory at once.
+    """
+    yield "scalar_tick", scalar_tick
+    yield "scalar_market_tick", scalar_market_tick
+    yield "market_tick", market_tick
+    for n_markets in batch_sizes:
+        yield f"batch_tick[{n_markets}]", partial(batch_tick, n_markets)
+    for n_workers in sorted({1, os.cpu_count() or 1}):
+        yield (
+            f"threaded_tick[{THREADED_MARKETS}x{n_workers}]",
+            partial(threaded_tick, THREADED_MARKETS, n_workers),
+        )
+    yield f"history_push[{ENV_MARKETS}]", history_push
+    yield "env_step", env_step
+    yield f"vector_env_step[{ENV_MARKETS}]", vector_env_step
+
+
+def measure(case: Case, min_time: float, repeats: int) -> dict[str, float]:
+    """Times ``case`` and returns its seconds per call and throughput."""
+    case.function()
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            case.function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        calls *= 2
+
+    timings = [elapsed / calls]
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(calls):
+            case.function()
+        timings.append((time.perf_counter() - start) / calls)
+
+    seconds = statistics.median(timings)
+    return {
+        "seconds": seconds,
+        "min_seconds": min(timings),
+        "calls": calls,
+        "good_ticks_per_second": case.good_ticks / seconds,
+    }
+
+
+def compare(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    tolerance: float,
+) -> list[str]:
+    """Prints the ratio to the baseline per case and returns the regressions."""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name:32} no baseline")
+            continue
+        ratio = result["seconds"] / baseline[name]["seconds"]
+        regressed = ratio > 1 + tolerance
+        print(f"{name:32} {ratio:6.2f}x baseline{'  REGRESSION' if regressed else ''}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Runs the benchmarks and returns the exit code."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", type=Path, help="Write the results as JSON.")
+    parser.add_argument("--baseline", type=Path, help="JSON results to compare to.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Allowed slowdown relative to the baseline, 0.2 for 20%%.",
+    )
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--batch-sizes",
+        type=int,
+        nargs="+",
+        default=BATCH_SIZES,
+        help="Numbers of markets of the batched cases.",
+    )
+    parser.add_argument("--filter", default="", help="Run cases containing this.")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, make_case in cases(tuple(args.batch_sizes)):
+        if args.filter not in name:
+            continue
+        case = make_case()
+        try:
+            result = measure(case, args.min_time, args.repeats)
+        finally:
+            if case.teardown is not None:
+                case.teardown()
+        results[case.name] = result
+        print(
+            f"{case.name:32} {result['seconds'] * 1e6:12.2f} us"
+            f" {result['good_ticks_per_second'] / 1e6:10.3f} M good-ticks/s",
+        )
+        del case
+
+    report = {
+        "python": sys.version,
+        "gil_enabled": gil_enabled(),
+        "numba": NUMBA_AVAILABLE,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    if args.output is not None:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text())["results"]
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,366 @@
+"""Batched simulation of many independent stock markets.
+
+State lives in a handful of contiguous ``(n_markets, n_goods)`` arrays and
+every market is advanced by one call to :func:`tick_batch` per tick, or to its
+Numba counterpart if ``numba`` is installed (see :mod:`kernels`).
+"""
+
+from collections.abc import Sequence
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+from cookieLearner.market.compiled import CompiledConfig
+from cookieLearner.market.goods import GoodsTable
+from cookieLearner.market.history import HISTORY_DEPTH, PriceHistory
+from cookieLearner.market.kernels import tick_kernel
+from cookieLearner.market.market import (
+    DEFAULT_CONFIG,
+    NUM_GOODS,
+    Config,
+    GameEnvironment,
+)
+from cookieLearner.market.randomness import CounterStreams, UniformSource
+from cookieLearner.market.vectorized import (
+    MODE_CHOICES,
+    TICK_DRAWS,
+    DurationArray,
+    FloatArray,
+    ModeArray,
+)
+
+# Draw slots of a single market for a single tick, in the order of JS M.tick
+DRAW_GLOBAL_PROBABILITY = 0
+DRAW_GLOBAL_GATE = 1
+DRAW_GLOBAL_DELTA = 2
+
+GLOBAL_DRAWS = 3
+
+# Draw slots of a single good when the market is reset
+DRAW_INIT_MODE = 0
+DRAW_INIT_DURATION = 1
+DRAW_INIT_DELTA = 2
+
+INIT_DRAWS = 3
+
+# M.reset runs this many ticks after initializing the goods
+RESET_WARMUP_TICKS = 15
+
+
+def draw_global_events(
+    uniforms: FloatArray,
+    compiled: CompiledConfig,
+) -> tuple[FloatArray, FloatArray]:
+    """Draws the market-wide events of one tick as in JS M.tick.
+
+    Args:
+        uniforms: Uniforms of shape ``(GLOBAL_DRAWS, *market_shape)``, where
+            ``market_shape`` matches the per-market fields of ``compiled``.
+        compiled: Simulation parameters compiled for the game environments.
+
+    Returns:
+        tuple: ``global_delta`` and ``instant_mode_change_probability`` per market.
+
+    """
+    instant_mode_change_probability = uniforms[DRAW_GLOBAL_PROBABILITY]
+    global_delta = np.where(
+        uniforms[DRAW_GLOBAL_GATE] < compiled.global_delta_probability,
+        (uniforms[DRAW_GLOBAL_DELTA] - 0.5) * 2,
+        0.0,
+    )
+
+    return global_delta, instant_mode_change_probability
+
+
+def draw_initial_state(
+    resting_stock_values: FloatArray,
+    uniforms: FloatArray,
+    config: Config = DEFAULT_CONFIG,
+) -> tuple[FloatArray, FloatArray, ModeArray, DurationArray]:
+    """Draws the state of freshly initialized goods as in JS M.reset.
+
+    Args:
+        resting_stock_values: Resting values of the goods, of any shape.
+        uniforms: Uniforms of shape ``(INIT_DRAWS, *shape)``.
+        config: Simulation parameters.
+
+    Returns:
+        tuple: Stock values, deltas, mode indices and remaining durations.
+
+    """
+    # Weighted random choice as in JS choose([0,1,1,2,2,3,4,5])
+    stock_modes = MODE_CHOICES[
+        (uniforms[DRAW_INIT_MODE] * len(MODE_CHOICES)).astype(np.intp)
+    ]
+    remaining_mode_durations = np.floor(
+        config.duration_min + uniforms[DRAW_INIT_DURATION] * config.duration_max,
+    ).astype(np.int64)
+    stock_deltas = uniforms[DRAW_INIT_DELTA] * 0.2 - 0.1
+
+    return (
+        np.array(resting_stock_values, dtype=np.float64),
+        stock_deltas,
+        stock_modes,
+        remaining_mode_durations,
+    )
+
+
+class MarketBatch:
+    """Independent stock markets advanced together by one vectorized step.
+
+    Every market has its own :class:`GameEnvironment`. Per-good state is kept
+    in arrays of shape ``(n_markets, n_goods)``, per-market state in arrays of
+    shape ``(n_markets,)``. The arrays are updated in place, so views taken on
+    them stay valid across steps. Unless disabled, the stock values of the
+    last ticks are kept in :attr:`history`.
+
+    The environments are compiled into :attr:`compiled` once. After changing
+    ``bank_level`` or ``dragon_boost``, rebuild it with
+    :meth:`CompiledConfig.from_arrays` for the change to take effect.
+
+    With ``streams``, every draw is addressed by the global id of its market
+    and by :attr:`clock`, the number of resets and ticks since construction.
+    A market then evolves identically whichever batch or shard it is part of.
+    """
+
+    def __init__(
+        self,
+        environments: Sequence[GameEnvironment],
+        n_goods: int = NUM_GOODS,
+        config: Config = DEFAULT_CONFIG,
+        rng: UniformSource | None = None,
+        history_depth: int | None = HISTORY_DEPTH,
+        seed: int | None = None,
+        streams: CounterStreams | None = None,
+        market_ids: ArrayLike | None = None,
+    ) -> None:
+        """Creates the markets and initializes them as JS M.reset does.
+
+        Args:
+            environments: Game environment of every market.
+            n_goods: Number of goods per market.
+            config: Simulation parameters.
+            rng: Source of randomness, a generator seeded with ``seed`` if
+                omitted.
+            history_depth: Number of ticks of stock values to keep, ``None``
+                to keep no history.
+            seed: Seed of the default generator.
+            streams: Counter-based streams to draw from instead of ``rng``.
+            market_ids: Global ids addressing the markets in ``streams``,
+                ``0, ..., n_markets - 1`` if omitted.
+
+        """
+        self.config = config
+        self.rng = np.random.default_rng(seed) if rng is None else rng
+        self.streams = streams
+        self.market_ids = (
+            np.arange(len(environments))
+            if market_ids is None
+            else np.asarray(market_ids, dtype=np.int64)
+        )
+
+        self.bank_level = np.array(
+            [environment.bank_level for environment in environments],
+            dtype=np.int64,
+        )
+        self.num_brokers = np.array(
+            [environment.num_brokers for environment in environments],
+            dtype=np.int64,
+        )
+        self.dragon_boost = np.array(
+            [environment.dragon_boost for environment in environments],
+            dtype=np.float64,
+        )
+
+        self.compiled = CompiledConfig.from_arrays(
+            config,
+            bank_level=self.bank_level[:, np.newaxis],
+            dragon_boost=self.dragon_boost[:, np.newaxis],
+            n_goods=n_goods,
+        )
+
+        shape = (len(environments), n_goods)
+        self.stock_values = np.empty(shape, dtype=np.float64)
+        self.stock_deltas = np.empty(shape, dtype=np.float64)
+        self.stock_modes = np.empty(shape, dtype=np.int8)
+        self.remaining_mode_durations = np.empty(shape, dtype=np.int64)
+
+        self.history = (
+            None if history_depth is None else PriceHistory(shape, depth=history_depth)
+        )
+
+        self.global_delta = np.zeros(shape[0], dtype=np.float64)
+        self.instant_mode_change_probability = np.zeros(shape[0], dtype=np.float64)
+        self.ticks = 0
+        self.clock = 0
+
+        self._uniforms = np.empty((TICK_DRAWS, *shape), dtype=np.float64)
+        self._global_uniforms = np.empty((GLOBAL_DRAWS, shape[0]), dtype=np.float64)
+
+        self.reset()
+
+    @property
+    def n_markets(self) -> int:
+        """Number of markets in the batch."""
+        return self.stock_values.shape[0]
+
+    @property
+    def n_goods(self) -> int:
+        """Number of goods per market."""
+        return self.stock_values.shape[1]
+
+    def reset(self, warmup_ticks: int = RESET_WARMUP_TICKS) -> None:
+        """Re-initializes every good as in JS M.reset and runs the warm-up ticks.
+
+        Args:
+            warmup_ticks: Number of ticks to run after initialization.
+
+        """
+        (
+            self.stock_values[...],
+            self.stock_deltas[...],
+            self.stock_modes[...],
+            self.remaining_mode_durations[...],
+        ) = draw_initial_state(
+            self.compiled.resting_stock_values,
+            self._draw(INIT_DRAWS, self.n_goods),
+            config=self.config,
+        )
+        self.ticks = 0
+        self.clock += 1
+        if self.history is not None:
+            # JS starts with vals=[val,val-d]
+            self.history.clear()
+            self.history.push(self.stock_values - self.stock_deltas)
+            self.history.push(self.stock_values)
+
+        for _ in range(warmup_ticks):
+            self.step()
+
+    def reset_markets(
+        self,
+        markets: ArrayLike,
+        warmup_ticks: int = RESET_WARMUP_TICKS,
+    ) -> None:
+        """Re-initializes only the given markets and runs their warm-up ticks.
+
+        The other markets and :attr:`ticks` are left untouched. The stored
+        history of the reset markets is overwritten with their new values.
+
+        Args:
+            markets: Indices or boolean mask of the markets to reset.
+            warmup_ticks: Number of ticks to run after initialization.
+
+        Raises:
+            ValueError: If the batch draws from counter-based streams, whose
+                draws are addressed by the clock shared by all markets.
+
+        """
+        if self.streams is not None:
+            msg = "reset_markets needs an rng, not counter-based streams."
+            raise ValueError(msg)
+        markets = np.asarray(markets)
+        if markets.dtype == np.bool_:
+            markets = np.flatnonzero(markets)
+        shape = (markets.shape[0], self.n_goods)
+        compiled = CompiledConfig.from_arrays(
+            self.config,
+            bank_level=self.bank_level[markets, np.newaxis],
+            dragon_boost=self.dragon_boost[markets, np.newaxis],
+            n_goods=self.n_goods,
+        )
+
+        state = draw_initial_state(
+            compiled.resting_stock_values,
+            self.rng.random((INIT_DRAWS, *shape)),
+            config=self.config,
+        )
+        for _ in range(warmup_ticks):
+            global_delta, instant_mode_change_probability = draw_global_events(
+                self.rng.random((GLOBAL_DRAWS, shape[0], 1)),
+                compiled,
+            )
+            state = tick_kernel(
+                *state,
+                global_delta,
+                instant_mode_change_probability,
+                compiled,
+                uniforms=self.rng.random((TICK_DRAWS, *shape)),
+            )
+
+        (
+            self.stock_values[markets],
+            self.stock_deltas[markets],
+            self.stock_modes[markets],
+            self.remaining_mode_durations[markets],
+        ) = state
+        if self.history is not None:
+            self.history.fill(self.stock_values[markets], markets)
+
+    def step(self) -> None:
+        """Advances every market by one tick."""
+        # A trailing axis lines the draws up with the (n_markets, 1) columns
+        (
+            self.global_delta[:, np.newaxis],
+            self.instant_mode_change_probability[:, np.newaxis],
+        ) = draw_global_events(
+            self._draw(GLOBAL_DRAWS, out=self._global_uniforms)[..., np.newaxis],
+            self.compiled,
+        )
+
+        uniforms = self._draw(TICK_DRAWS, self.n_goods, out=self._uniforms)
+        (
+            self.stock_values[...],
+            self.stock_deltas[...],
+            self.stock_modes[...],
+            self.remaining_mode_durations[...],
+        ) = tick_kernel(
+            self.stock_values,
+            self.stock_deltas,
+            self.stock_modes,
+            self.remaining_mode_durations,
+            self.global_delta[:, np.newaxis],
+            self.instant_mode_change_probability[:, np.newaxis],
+            self.compiled,
+            uniforms=uniforms,
+        )
+        if self.history is not None:
+            self.history.push(self.stock_values)
+        self.ticks += 1
+        self.clock += 1
+
+    def step_n(self, n_ticks: int) -> None:
+        """Advances every market by ``n_ticks`` ticks."""
+        for _ in range(n_ticks):
+            self.step()
+
+    def _draw(
+        self,
+        n_draws: int,
+        n_goods: int | None = None,
+        out: FloatArray | None = None,
+    ) -> FloatArray:
+        """Draws uniforms for every market, and for every good if ``n_goods``."""
+        if self.streams is not None:
+            return self.streams.uniforms(self.clock, self.market_ids, n_draws, n_goods)
+        if out is not None:
+            return self.rng.random(out=out)
+        shape = (n_draws, self.n_markets)
+        return self.rng.random(shape if n_goods is None else (*shape, n_goods))
+
+    def goods_table(self) -> GoodsTable:
+        """Snapshot of every good packed into a ``(n_markets, n_goods)`` table."""
+        return GoodsTable.from_arrays(
+            self.stock_values,
+            self.stock_deltas,
+            self.stock_modes,
+            self.remaining_mode_durations,
+        )
+
+    def environment(self, market: int) -> GameEnvironment:
+        """Returns the game environment of a single market."""
+        return GameEnvironment(
+            bank_level=int(self.bank_level[market]),
+            num_brokers=int(self.num_brokers[market]),
+            dragon_boost=float(self.dragon_boost[market]),
+        )
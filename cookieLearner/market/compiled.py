@@ -0,0 +1,206 @@
+"""Simulation parameters with every environment-dependent term precomputed.
+
+:class:`Config` holds the raw knobs of the simulation, several of which only
+enter a tick combined with the :class:`GameEnvironment`, e.g. the secondary
+fluctuation range grows with the dragon boost and the high stock value
+threshold with the bank level. :class:`CompiledConfig` folds them once per
+market, so the tick engines read plain attributes of a frozen, slotted object
+instead of recomputing the same expressions every tick.
+"""
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Self
+
+import numpy as np
+from numpy.typing import NDArray
+
+from cookieLearner.market.market import (
+    NUM_GOODS,
+    Config,
+    GameEnvironment,
+    resting_stock_value,
+)
+from cookieLearner.market.randomness import FloatArray
+
+type Parameter = float | FloatArray
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledConfig:
+    """Derived constants of a :class:`Config` for given game environments.
+
+    Fields that depend on the environment are floats for a single market and
+    arrays of shape ``(n_markets, 1)`` for a batch, so they broadcast against
+    ``(n_markets, n_goods)`` good state. ``resting_stock_values`` has the
+    shape of the good state itself.
+    """
+
+    resting_stock_values: FloatArray
+    dragon_boost: Parameter
+    # 0.01 * dragon_boost, added to every delta at the start of a tick
+    delta_drift: Parameter
+    global_delta_probability: Parameter
+    fluctuation_probability_primary: float
+    fluctuation_range_primary: float
+    fluctuation_probability_secondary: float
+    fluctuation_range_secondary: Parameter
+    fluctuation_probability_tertiary: float
+    fluctuation_range_tertiary: Parameter
+    fast_mode_tick_chaotic_probability_primary: float
+    fast_mode_tick_chaotic_probability_secondary: float
+    # 2 + 6 * dragon_boost, the range of a chaotic delta reset
+    chaotic_delta_range: Parameter
+    fast_mode_tick_fast_rise_probability: float
+    fast_mode_tick_fast_rise_to_fast_fall_probability: float
+    fast_mode_tick_fast_fall_probability: float
+    high_stock_value_threshold: Parameter
+    high_stock_value_dampening: float
+    low_stock_value_threshold: float
+    low_stock_value_delta_dampening: float
+    min_stock_value: float
+    duration_min: int
+    # Multiplier of random() in the duration of a new mode
+    duration_span: int
+    chaotic_probability_with_dragon_boost: float
+    chaotic_probability_after_fast_mode: float
+
+    @classmethod
+    def from_config(
+        cls,
+        config: Config,
+        environment: GameEnvironment,
+        n_goods: int = NUM_GOODS,
+    ) -> Self:
+        """Compiles ``config`` for a single market.
+
+        Args:
+            config: Simulation parameters.
+            environment: Game environment of the market.
+            n_goods: Number of goods in the market.
+
+        Returns:
+            CompiledConfig: Constants with float environment-dependent fields.
+
+        """
+        return cls.from_arrays(
+            config,
+            bank_level=environment.bank_level,
+            dragon_boost=float(environment.dragon_boost),
+            n_goods=n_goods,
+        )
+
+    @classmethod
+    def from_environments(
+        cls,
+        config: Config,
+        environments: Sequence[GameEnvironment],
+        n_goods: int = NUM_GOODS,
+    ) -> Self:
+        """Compiles ``config`` for a batch of markets.
+
+        Args:
+            config: Simulation parameters.
+            environments: Game environment of every market.
+            n_goods: Number of goods per market.
+
+        Returns:
+            CompiledConfig: Constants with ``(n_markets, 1)`` environment-dependent
+                fields.
+
+        """
+        return cls.from_arrays(
+            config,
+            bank_level=np.array(
+                [[environment.bank_level] for environment in environments],
+                dtype=np.int64,
+            ),
+            dragon_boost=np.array(
+                [[environment.dragon_boost] for environment in environments],
+                dtype=np.float64,
+            ),
+            n_goods=n_goods,
+        )
+
+    @classmethod
+    def from_arrays(
+        cls,
+        config: Config,
+        bank_level: int | NDArray[np.integer],
+        dragon_boost: Parameter,
+        n_goods: int = NUM_GOODS,
+    ) -> Self:
+        """Compiles ``config`` for bank levels and dragon boosts of any shape.
+
+        Args:
+            config: Simulation parameters.
+            bank_level: Level of the bank building, a scalar or a column of
+                shape ``(n_markets, 1)``.
+            dragon_boost: Supreme Intellect aura multiplier, same shape as
+                ``bank_level``.
+            n_goods: Number of goods per market.
+
+        Returns:
+            CompiledConfig: Constants broadcastable against the good state.
+
+        """
+        return cls(
+            resting_stock_values=resting_stock_value(
+                np.arange(n_goods),
+                bank_level,
+                config=config,
+            ),
+            dragon_boost=dragon_boost,
+            delta_drift=0.01 * dragon_boost,
+            global_delta_probability=(
+                config.global_delta_probability
+                + config.global_delta_probability_dragon_boost * dragon_boost
+            ),
+            fluctuation_probability_primary=config.fluctuation_probability_primary,
+            fluctuation_range_primary=config.fluctuation_range_primary,
+            fluctuation_probability_secondary=config.fluctuation_probability_secondary,
+            fluctuation_range_secondary=(
+                config.fluctuation_range_secondary
+                + config.fluctuation_range_secondary_dragon_boost * dragon_boost
+            ),
+            fluctuation_probability_tertiary=config.fluctuation_probability_tertiary,
+            fluctuation_range_tertiary=(
+                config.fluctuation_range_tertiary
+                + config.fluctuation_range_tertiary_dragon_boost * dragon_boost
+            ),
+            fast_mode_tick_chaotic_probability_primary=(
+                config.fast_mode_tick_chaotic_probability_primary
+            ),
+            fast_mode_tick_chaotic_probability_secondary=(
+                config.fast_mode_tick_chaotic_probability_secondary
+            ),
+            chaotic_delta_range=2 + 6 * dragon_boost,
+            fast_mode_tick_fast_rise_probability=(
+                config.fast_mode_tick_fast_rise_probability
+            ),
+            fast_mode_tick_fast_rise_to_fast_fall_probability=(
+                config.fast_mode_tick_fast_rise_to_fast_fall_probability
+            ),
+            fast_mode_tick_fast_fall_probability=(
+                config.fast_mode_tick_fast_fall_probability
+            ),
+            high_stock_value_threshold=(
+                config.high_stock_value_threshold
+                # bank_level starts at 1, so we subtract 1 to make it zero-based
+                + (bank_level - 1) * config.high_stock_value_bank_level_factor
+            ),
+            high_stock_value_dampening=config.high_stock_value_dampening,
+            low_stock_value_threshold=config.low_stock_value_threshold,
+            low_stock_value_delta_dampening=config.low_stock_value_delta_dampening,
+            min_stock_value=config.min_stock_value,
+            duration_min=config.duration_min,
+            duration_span=(
+                config.duration_max - 200 * config.duration_max_dragon_boost
+            ),
+            chaotic_probability_with_dragon_boost=(
+                config.chaotic_probability_with_dragon_boost
+            ),
+            chaotic_probability_after_fast_mode=(
+                config.chaotic_probability_after_fast_mode
+            ),
+        )
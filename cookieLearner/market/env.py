@@ -0,0 +1,482 @@
+"""Gym-style trading environment over a single stock market.
+
+:class:`MarketEnv` advances its goods with the scalar :func:`tick` and lets an
+agent buy and sell between ticks following M.buyGood and M.sellGood. The
+per-good state is kept in Python lists, which the scalar helpers read and
+write fastest, and every observation is written into one preallocated array.
+Orders are sized by the rules of :mod:`cookieLearner.market.trading`, the same
+ones :class:`Portfolio` applies over arrays.
+
+:class:`VectorMarketEnv` runs the same rules over a :class:`MarketBatch`, with
+one vectorized tick for all markets per step.
+"""
+
+import math
+from collections.abc import Sequence
+from typing import Any
+
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+
+from cookieLearner.market.batch import RESET_WARMUP_TICKS, MarketBatch
+from cookieLearner.market.compiled import CompiledConfig
+from cookieLearner.market.market import (
+    DEFAULT_CONFIG,
+    NUM_GOODS,
+    WEIGHTED_MODES,
+    Config,
+    GameEnvironment,
+    Good,
+    tick,
+)
+from cookieLearner.market.portfolio import Portfolio
+from cookieLearner.market.randomness import FloatArray, UniformBlocks
+from cookieLearner.market.trading import (
+    LAST_BOUGHT,
+    LAST_NONE,
+    LAST_SOLD,
+    broker_overhead,
+    buy_cost,
+    buy_quantity,
+    sell_quantity,
+)
+
+# Cookies in the bank at reset, in units of the highest raw CpS
+DEFAULT_STARTING_COOKIES = 1000.0
+
+
+class MarketEnv:
+    """Trading environment of one market with ``reset`` and ``step``.
+
+    An action holds a signed quantity per good: positive buys, negative sells
+    and zero holds. ``MAX_QUANTITY`` buys as many units as affordable and
+    ``-MAX_QUANTITY`` sells all units. Before the market ticks, all sells are
+    applied, then the buys in ``stock_id`` order; a good bought since the last
+    tick cannot be sold and vice versa. The reward is the change of
+    :attr:`net_worth`.
+
+    The observation is the vector ``[stock values, stock deltas, units held,
+    bank]`` of ``3 * n_goods + 1`` entries with the bank in dollars. The same
+    array is overwritten by every ``reset`` and ``step``; copy it to keep it.
+    """
+
+    def __init__(
+        self,
+        environment: GameEnvironment,
+        max_stock: ArrayLike,
+        config: Config = DEFAULT_CONFIG,
+        n_goods: int = NUM_GOODS,
+        cookies_ps_raw_highest: float = 1.0,
+        starting_cookies: float = DEFAULT_STARTING_COOKIES,
+        episode_ticks: int | None = None,
+        seed: int | None = None,
+    ) -> None:
+        """Creates the environment; call :meth:`reset` before stepping.
+
+        Args:
+            environment: Game environment of the market.
+            max_stock: Warehouse space per good, see ``good_max_stock``.
+            config: Simulation parameters.
+            n_goods: Number of goods in the market.
+            cookies_ps_raw_highest: Highest raw CpS of the run, the price of
+                one dollar in cookies.
+            starting_cookies: Cookies in the bank at reset.
+            episode_ticks: Number of steps after which episodes are truncated,
+                unbounded if omitted.
+            seed: Seed of the first episode.
+
+        """
+        self.environment = environment
+        self.config = config
+        self.compiled = CompiledConfig.from_config(config, environment, n_goods)
+        self.max_stock = np.broadcast_to(
+            np.asarray(max_stock, dtype=np.int64),
+            (n_goods,),
+        ).tolist()
+        self.overhead = float(broker_overhead(environment.num_brokers))
+        self.cookies_ps_raw_highest = cookies_ps_raw_highest
+        self.starting_cookies = starting_cookies
+        self.episode_ticks = episode_ticks
+        self.rng = UniformBlocks(seed)
+
+        self.n_goods = n_goods
+        self._resting_stock_values = self.compiled.resting_stock_values.tolist()
+        self.stock_values = [0.0] * n_goods
+        self.stock_deltas = [0.0] * n_goods
+        self.stock_modes = [WEIGHTED_MODES[0]] * n_goods
+        self.remaining_mode_durations = [0] * n_goods
+        self.stock = [0] * n_goods
+        self.last = [LAST_NONE] * n_goods
+        self.cookies = starting_cookies
+        self.profit = 0.0
+        self.ticks = 0
+        self.steps = 0
+
+        self.observation = np.zeros(3 * n_goods + 1, dtype=np.float64)
+        self._info: dict[str, Any] = {}
+
+    @property
+    def bank(self) -> float:
+        """Cookies in the bank, in dollars."""
+        return self.cookies / self.cookies_ps_raw_highest
+
+    @property
+    def net_worth(self) -> float:
+        """Bank plus the value of the units held, in dollars."""
+        return self.bank + math.sumprod(self.stock, self.stock_values)
+
+    @property
+    def goods(self) -> list[Good]:
+        """Snapshot of the market as :class:`Good` objects."""
+        return [self.good(stock_id) for stock_id in range(self.n_goods)]
+
+    def good(self, stock_id: int) -> Good:
+        """Snapshot of a single good."""
+        return Good(
+            stock_id=stock_id,
+            stock_value=self.stock_values[stock_id],
+            stock_delta=self.stock_deltas[stock_id],
+            mode=self.stock_modes[stock_id].label,
+            remaining_mode_duration=self.remaining_mode_durations[stock_id],
+        )
+
+    def reset(self, seed: int | None = None) -> tuple[FloatArray, dict[str, Any]]:
+        """Starts an episode as JS M.reset does, including the warm-up ticks.
+
+        Args:
+            seed: Reseeds the environment if given.
+
+        Returns:
+            tuple: The observation and the info dict.
+
+        """
+        if seed is not None:
+            self.rng = UniformBlocks(seed)
+
+        rng = self.rng
+        config = self.config
+        for stock_id in range(self.n_goods):
+            self.stock_modes[stock_id] = WEIGHTED_MODES[
+                int(rng.random() * len(WEIGHTED_MODES))
+            ]
+            self.remaining_mode_durations[stock_id] = math.floor(
+                config.duration_min + rng.random() * config.duration_max,
+            )
+            self.stock_values[stock_id] = self._resting_stock_values[stock_id]
+            self.stock_deltas[stock_id] = rng.random() * 0.2 - 0.1
+            self.stock[stock_id] = 0
+            self.last[stock_id] = LAST_NONE
+        self.cookies = self.starting_cookies
+        self.profit = 0.0
+        self.ticks = 0
+        self.steps = 0
+
+        for _ in range(RESET_WARMUP_TICKS):
+            self._tick()
+
+        self._observe()
+        return self.observation, self._info
+
+    def step(
+        self,
+        action: ArrayLike,
+    ) -> tuple[FloatArray, float, bool, bool, dict[str, Any]]:
+        """Trades the quantities in ``action`` and advances the market a tick.
+
+        Args:
+            action: Signed quantity per good.
+
+        Returns:
+            tuple: Observation, reward, terminated, truncated and info dict.
+
+        """
+        net_worth = self.net_worth
+        for stock_id, quantity in enumerate(action):
+            if quantity < 0:
+                self.sell(stock_id, -int(quantity))
+        for stock_id, quantity in enumerate(action):
+            if quantity > 0:
+                self.buy(stock_id, int(quantity))
+
+        self._tick()
+        self.steps += 1
+
+        self._observe()
+        truncated = self.episode_ticks is not None and self.steps >= self.episode_ticks
+        return (
+            self.observation,
+            self.net_worth - net_worth,
+            False,
+            truncated,
+            self._info,
+        )
+
+    def buy(self, stock_id: int, quantity: int) -> bool:
+        """Buys units of a good as JS M.buyGood does.
+
+        The order fails as a whole if it is not affordable or the good was
+        sold this tick; it is capped by the free warehouse space.
+
+        Returns:
+            bool: Whether any units were bought.
+
+        """
+        stock_value = self.stock_values[stock_id]
+        cost = buy_cost(stock_value, self.cookies_ps_raw_highest, self.overhead)
+        quantity = int(
+            buy_quantity(
+                quantity,
+                cost,
+                self.cookies,
+                self.max_stock[stock_id] - self.stock[stock_id],
+                self.last[stock_id],
+            ),
+        )
+        if not quantity:
+            return False
+        self.profit -= stock_value * self.overhead * quantity
+        self.cookies -= cost * quantity
+        self.stock[stock_id] += quantity
+        self.last[stock_id] = LAST_BOUGHT
+        return True
+
+    def sell(self, stock_id: int, quantity: int) -> bool:
+        """Sells units of a good as JS M.sellGood does.
+
+        The order is capped by the units held and fails if the good was
+        bought this tick.
+
+        Returns:
+            bool: Whether any units were sold.
+
+        """
+        quantity = int(
+            sell_quantity(quantity, self.stock[stock_id], self.last[stock_id]),
+        )
+        if not quantity:
+            return False
+        stock_value = self.stock_values[stock_id]
+        self.profit += stock_value * quantity
+        self.cookies += self.cookies_ps_raw_highest * stock_value * quantity
+        self.stock[stock_id] -= quantity
+        self.last[stock_id] = LAST_SOLD
+        return True
+
+    def _tick(self) -> None:
+        """Runs one tick of JS M.tick over every good."""
+        rng = self.rng
+        global_delta = 0.0
+        instant_mode_change_probability = rng.random()
+        if rng.random() < self.compiled.global_delta_probability:
+            global_delta = (rng.random() - 0.5) * 2
+
+        bank_level = self.environment.bank_level
+        dragon_boost = self.environment.dragon_boost
+        config = self.config
+        stock_values = self.stock_values
+        stock_deltas = self.stock_deltas
+        stock_modes = self.stock_modes
+        remaining_mode_durations = self.remaining_mode_durations
+        for stock_id, resting_stock_value in enumerate(self._resting_stock_values):
+            (
+                stock_values[stock_id],
+                stock_deltas[stock_id],
+                stock_modes[stock_id],
+                remaining_mode_durations[stock_id],
+            ) = tick(
+                stock_values[stock_id],
+                stock_deltas[stock_id],
+                stock_modes[stock_id],
+                remaining_mode_durations[stock_id],
+                resting_stock_value,
+                bank_level,
+                global_delta,
+                instant_mode_change_probability,
+                dragon_boost,
+                config=config,
+                rng=rng,
+            )
+            self.last[stock_id] = LAST_NONE
+        self.ticks += 1
+
+    def _observe(self) -> None:
+        """Writes the current state into :attr:`observation`."""
+        n_goods = self.n_goods
+        observation = self.observation
+        observation[:n_goods] = self.stock_values
+        observation[n_goods : 2 * n_goods] = self.stock_deltas
+        observation[2 * n_goods : 3 * n_goods] = self.stock
+        observation[-1] = self.bank
+        self._info["profit"] = self.profit
+        self._info["cookies"] = self.cookies
+
+
+class VectorMarketEnv:
+    """Many independent :class:`MarketEnv` markets stepped by one call.
+
+    Per-good state is kept in ``(n_markets, n_goods)`` arrays, the market is
+    advanced by :meth:`MarketBatch.step` and trades are booked in a
+    :class:`Portfolio`. Actions are ``(n_markets, n_goods)`` arrays following
+    the rules of :class:`MarketEnv`. Observations, rewards and done flags are
+    stacked along the first axis and written into preallocated arrays that are
+    overwritten by every ``reset`` and ``step``.
+
+    Markets whose episode ends are reset in place within the same step: their
+    reward and ``truncated`` flag belong to the finished episode, their
+    observation to the new one.
+    """
+
+    def __init__(
+        self,
+        environments: Sequence[GameEnvironment],
+        max_stock: ArrayLike,
+        config: Config = DEFAULT_CONFIG,
+        n_goods: int = NUM_GOODS,
+        cookies_ps_raw_highest: ArrayLike = 1.0,
+        starting_cookies: ArrayLike = DEFAULT_STARTING_COOKIES,
+        episode_ticks: int | None = None,
+        seed: int | None = None,
+    ) -> None:
+        """Creates the markets; call :meth:`reset` before stepping.
+
+        Args:
+            environments: Game environment of every market.
+            max_stock: Warehouse space, broadcastable to ``(n_markets, n_goods)``.
+            config: Simulation parameters.
+            n_goods: Number of goods per market.
+            cookies_ps_raw_highest: Highest raw CpS of the run per market.
+            starting_cookies: Cookies in the bank at reset per market.
+            episode_ticks: Number of steps after which episodes are truncated,
+                unbounded if omitted.
+            seed: Seed of the first episodes.
+
+        """
+        self.batch = MarketBatch(
+            environments,
+            n_goods=n_goods,
+            config=config,
+            history_depth=None,
+            seed=seed,
+        )
+        shape = (self.batch.n_markets, n_goods)
+        self.starting_cookies = np.broadcast_to(
+            np.asarray(starting_cookies, dtype=np.float64),
+            shape[:1],
+        ).copy()
+        self.episode_ticks = episode_ticks
+
+        self.portfolio = Portfolio.for_batch(
+            self.batch,
+            max_stock,
+            cookies_ps_raw_highest=cookies_ps_raw_highest,
+            cookies=self.starting_cookies,
+        )
+        # Views of the ledger, updated in place by every trade
+        self.max_stock = self.portfolio.max_stock
+        self.overhead = self.portfolio.overhead[:, np.newaxis]
+        self.cookies_ps_raw_highest = self.portfolio.cookies_ps_raw_highest
+        self.stock = self.portfolio.stock
+        self.last = self.portfolio.last
+        self.cookies = self.portfolio.cookies
+        self.profit = self.portfolio.profit
+        self.steps = np.zeros(shape[0], dtype=np.int64)
+
+        self.observation = np.zeros((shape[0], 3 * n_goods + 1), dtype=np.float64)
+        self.rewards = np.zeros(shape[0], dtype=np.float64)
+        self.terminated = np.zeros(shape[0], dtype=np.bool_)
+        self.truncated = np.zeros(shape[0], dtype=np.bool_)
+        self._info: dict[str, Any] = {"profit": self.profit, "cookies": self.cookies}
+
+    @property
+    def n_markets(self) -> int:
+        """Number of markets."""
+        return self.batch.n_markets
+
+    @property
+    def n_goods(self) -> int:
+        """Number of goods per market."""
+        return self.batch.n_goods
+
+    @property
+    def bank(self) -> FloatArray:
+        """Cookies in the bank per market, in dollars."""
+        return self.cookies / self.cookies_ps_raw_highest
+
+    @property
+    def net_worth(self) -> FloatArray:
+        """Bank plus the value of the units held per market, in dollars."""
+        return self.bank + np.einsum(
+            "ij,ij->i",
+            self.stock,
+            self.batch.stock_values,
+        )
+
+    def reset(self, seed: int | None = None) -> tuple[FloatArray, dict[str, Any]]:
+        """Starts new episodes in every market.
+
+        Args:
+            seed: Reseeds the environment if given.
+
+        Returns:
+            tuple: The observations and the info dict.
+
+        """
+        if seed is not None:
+            self.batch.rng = np.random.default_rng(seed)
+        self.batch.reset()
+        self._reset_accounts(np.arange(self.n_markets))
+        self._observe()
+        return self.observation, self._info
+
+    def step(
+        self,
+        action: ArrayLike,
+    ) -> tuple[FloatArray, FloatArray, FloatArray, FloatArray, dict[str, Any]]:
+        """Trades ``action`` in every market and advances them all a tick.
+
+        Args:
+            action: Signed quantities of shape ``(n_markets, n_goods)``.
+
+        Returns:
+            tuple: Observations, rewards, terminated and truncated flags and
+                the info dict.
+
+        """
+        action = np.asarray(action, dtype=np.int64)
+        net_worth = self.net_worth
+
+        self.portfolio.trade(self.batch.stock_values, action)
+        self.batch.step()
+        self.portfolio.new_tick()
+        self.steps += 1
+
+        np.subtract(self.net_worth, net_worth, out=self.rewards)
+        if self.episode_ticks is not None:
+            np.greater_equal(self.steps, self.episode_ticks, out=self.truncated)
+            done = np.flatnonzero(self.truncated)
+            if done.shape[0]:
+                self.batch.reset_markets(done)
+                self._reset_accounts(done)
+
+        self._observe()
+        return (
+            self.observation,
+            self.rewards,
+            self.terminated,
+            self.truncated,
+            self._info,
+        )
+
+    def _reset_accounts(self, markets: NDArray[np.intp]) -> None:
+        """Empties the warehouses and the ledgers of the given markets."""
+        self.portfolio.reset(markets, cookies=self.starting_cookies[markets])
+        self.steps[markets] = 0
+
+    def _observe(self) -> None:
+        """Writes the current state into :attr:`observation`."""
+        n_goods = self.n_goods
+        observation = self.observation
+        observation[:, :n_goods] = self.batch.stock_values
+        observation[:, n_goods : 2 * n_goods] = self.batch.stock_deltas
+        observation[:, 2 * n_goods : 3 * n_goods] = self.stock
+        np.divide(self.cookies, self.cookies_ps_raw_highest, out=observation[:, -1])
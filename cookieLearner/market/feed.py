@@ -0,0 +1,141 @@
+"""Endless price feeds in fixed-size chunks.
+
+:func:`stream` advances a :class:`Market` or :class:`MarketBatch` forever
+(or for a given number of ticks) and yields its state a chunk of ticks at a
+time. Chunks are written into a fixed ring of reused buffers, so memory
+stays constant however long the feed runs.
+
+With ``prefetch`` the ticks are simulated by a background thread that runs
+up to ``prefetch`` chunks ahead of the consumer and then blocks until the
+consumer catches up, which bounds both memory and wasted work when the
+consumer is the slower side.
+"""
+
+import threading
+from collections.abc import Iterator
+from queue import Full, Queue
+
+from cookieLearner.market.batch import MarketBatch
+from cookieLearner.market.simulation import Market
+from cookieLearner.market.trajectories import (
+    DEFAULT_CHUNK_TICKS,
+    Trajectories,
+    record_ticks,
+)
+
+# Seconds between checks whether a consumer closed a prefetching feed
+_POLL_INTERVAL = 0.1
+
+# Filled chunks, a producer error, or None once the feed ends
+type _ChunkQueue = Queue[Trajectories | BaseException | None]
+
+
+def stream(
+    market: Market | MarketBatch,
+    chunk: int = DEFAULT_CHUNK_TICKS,
+    n_ticks: int | None = None,
+    prefetch: int = 0,
+) -> Iterator[Trajectories]:
+    """Yields the state of ``market`` after every tick, ``chunk`` ticks at a time.
+
+    A yielded chunk stays valid until the next one is requested; copy it to
+    keep it. The last chunk may be shorter if ``n_ticks`` is not a multiple
+    of ``chunk``. Closing the generator stops the feed.
+
+    Args:
+        market: Market or batch of markets to advance. It must not be stepped
+            elsewhere while the feed runs.
+        chunk: Number of ticks per chunk.
+        n_ticks: Number of ticks to feed, endless if omitted.
+        prefetch: Number of chunks simulated ahead of the consumer by a
+            background thread, ``0`` to simulate on demand.
+
+    Yields:
+        Trajectories: Arrays of shape ``(chunk, *market.stock_values.shape)``.
+
+    """
+    sizes = _chunk_sizes(chunk, n_ticks)
+    if prefetch <= 0:
+        buffer = Trajectories.empty_like(chunk, market)
+        for size in sizes:
+            view = Trajectories(*(column[:size] for column in buffer))
+            record_ticks(market, view)
+            yield view
+        return
+
+    yield from _prefetched(market, chunk, sizes, prefetch)
+
+
+def _chunk_sizes(chunk: int, n_ticks: int | None) -> Iterator[int]:
+    """Yields the number of ticks of every chunk of the feed."""
+    if n_ticks is None:
+        while True:
+            yield chunk
+    for start in range(0, n_ticks, chunk):
+        yield min(chunk, n_ticks - start)
+
+
+def _prefetched(
+    market: Market | MarketBatch,
+    chunk: int,
+    sizes: Iterator[int],
+    prefetch: int,
+) -> Iterator[Trajectories]:
+    """Runs the feed in a producer thread, at most ``prefetch`` chunks ahead."""
+    # Chunks in the queue, the one held by the consumer and the one being
+    # filled never share a buffer
+    buffers = [Trajectories.empty_like(chunk, market) for _ in range(prefetch + 2)]
+    chunks: _ChunkQueue = Queue(maxsize=prefetch)
+    stop = threading.Event()
+
+    producer = threading.Thread(
+        target=_produce,
+        args=(market, buffers, sizes, chunks, stop),
+        name="market-feed",
+        daemon=True,
+    )
+    producer.start()
+    try:
+        while (item := chunks.get()) is not None:
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        # A producer waiting for room notices within one poll interval
+        stop.set()
+        producer.join()
+
+
+def _produce(
+    market: Market | MarketBatch,
+    buffers: list[Trajectories],
+    sizes: Iterator[int],
+    chunks: _ChunkQueue,
+    stop: threading.Event,
+) -> None:
+    """Fills the buffers in turn and queues them, ``None`` at the end."""
+    try:
+        for index, size in enumerate(sizes):
+            buffer = buffers[index % len(buffers)]
+            view = Trajectories(*(column[:size] for column in buffer))
+            record_ticks(market, view)
+            if not _put(chunks, view, stop):
+                return
+        _put(chunks, None, stop)
+    except BaseException as error:  # noqa: BLE001
+        _put(chunks, error, stop)
+
+
+def _put(
+    chunks: _ChunkQueue,
+    item: Trajectories | BaseException | None,
+    stop: threading.Event,
+) -> bool:
+    """Queues ``item`` unless ``stop`` is set first; returns whether it was."""
+    while not stop.is_set():
+        try:
+            chunks.put(item, timeout=_POLL_INTERVAL)
+        except Full:
+            continue
+        return True
+    return False
@@ -0,0 +1,116 @@
+"""Fixed-depth price history, the Python side of JS ``me.vals``.
+
+The JS keeps ``vals`` newest first with ``unshift``/``pop``. Here every push
+writes its row twice into a buffer of ``2 * depth`` rows, at ``i`` and at
+``i + depth``. Pushing is O(1) and the last ``n <= depth`` rows are always one
+contiguous slice of the buffer, so windows are views and never copies.
+"""
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+from cookieLearner.market.vectorized import FloatArray
+
+# M.tick pops me.vals beyond this many entries
+HISTORY_DEPTH = 65
+
+
+class PriceHistory:
+    """Ring buffer of the last ``depth`` stock values of goods of any shape.
+
+    A single good uses ``shape=()``, a market ``(n_goods,)`` and a batch of
+    markets ``(n_markets, n_goods)``.
+    """
+
+    def __init__(self, shape: tuple[int, ...], depth: int = HISTORY_DEPTH) -> None:
+        self.depth = depth
+        self._buffer = np.zeros((2 * depth, *shape), dtype=np.float64)
+        self._position = depth - 1
+        self._count = 0
+
+    def __len__(self) -> int:
+        """Number of stored ticks, at most ``depth``."""
+        return self._count
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        """Shape of a single pushed row."""
+        return self._buffer.shape[1:]
+
+    def clear(self) -> None:
+        """Forgets all stored values."""
+        self._position = self.depth - 1
+        self._count = 0
+
+    def push(self, stock_values: ArrayLike) -> None:
+        """Appends the stock values of the current tick."""
+        position = self._position + 1
+        if position == self.depth:
+            position = 0
+        self._buffer[position] = stock_values
+        self._buffer[position + self.depth] = stock_values
+        self._position = position
+        if self._count < self.depth:
+            self._count += 1
+
+    def fill(self, stock_values: ArrayLike, index: ArrayLike | slice = ...) -> None:
+        """Overwrites every stored tick of the rows ``index`` of the goods.
+
+        Args:
+            stock_values: Values broadcastable to ``shape[index]``.
+            index: Index into the leading axis of ``shape``, e.g. markets.
+
+        """
+        self._buffer[:, index] = stock_values
+
+    def latest(self, back: int = 0) -> FloatArray:
+        """View of the values ``back`` ticks ago, ``me.vals[back]`` in JS."""
+        if not 0 <= back < self._count:
+            msg = f"back={back} is outside of the {self._count} stored ticks."
+            raise IndexError(msg)
+        return self._buffer[self._position + self.depth - back]
+
+    def window(self, n_ticks: int | None = None) -> FloatArray:
+        """View of the last ``n_ticks`` rows, oldest first.
+
+        Args:
+            n_ticks: Window length, all stored ticks if omitted.
+
+        Returns:
+            FloatArray: Array of shape ``(n_ticks, *shape)``.
+
+        """
+        n_ticks = self._count if n_ticks is None else n_ticks
+        if not 0 <= n_ticks <= self._count:
+            msg = f"n_ticks={n_ticks} is outside of the {self._count} stored ticks."
+            raise IndexError(msg)
+        end = self._position + self.depth + 1
+        return self._buffer[end - n_ticks : end]
+
+    def good_delta(self, back: int = 0, out: FloatArray | None = None) -> FloatArray:
+        """Relative change in percent as in JS M.goodDelta.
+
+        The change from ``back + 1`` to ``back`` ticks ago is floored to a
+        hundredth of a percent, and zero while fewer than ``back + 2`` ticks
+        are stored.
+
+        Args:
+            back: Number of ticks to look back, 0 for the current tick.
+            out: Preallocated array of ``shape`` to write the result into.
+
+        Returns:
+            FloatArray: The deltas, ``out`` if given.
+
+        """
+        if out is None:
+            out = np.empty(self.shape, dtype=np.float64)
+        if self._count < back + 2:
+            out[...] = 0.0
+            return out
+
+        np.divide(self.latest(back), self.latest(back + 1), out=out)
+        out -= 1
+        out *= 10000
+        np.floor(out, out=out)
+        out /= 100
+        return out
@@ -0,0 +1,118 @@
+"""Opt-in profiling of the batched tick.
+
+Inside ``with instrument() as profile:`` every call of
+:func:`cookieLearner.market.vectorized.tick_batch`, and hence every step of
+:class:`Market`, :class:`MarketBatch` and the engines built on them, adds the
+time spent in each phase of the tick and a few event counters to
+``profile``. Outside of the block the tick only checks :func:`active_profile`
+once. The Numba kernel falls back to ``tick_batch`` while a profile is
+active, since its fused loop has no phases to time.
+
+The active profile is held in a :class:`~contextvars.ContextVar`, so a block
+only sees the ticks run by its own thread or task. Blocks may nest, the
+inner one shadowing the outer, and blocks in different threads do not
+interfere. Worker threads, e.g. those of :class:`ThreadedMarkets`, start
+without a profile and are not instrumented.
+"""
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from time import perf_counter
+
+import numpy as np
+from numpy.typing import NDArray
+
+from cookieLearner.market.market import STOCK_MODES
+
+# Phases of a tick in the order they run
+PHASES = (
+    "mode_tick",
+    "instant_mode_change",
+    "fluctuations",
+    "fast_mode_tick",
+    "dampening",
+    "mode_expiry",
+)
+N_MODES = len(STOCK_MODES)
+
+
+@dataclass
+class TickProfile:
+    """Phase timings and event counts accumulated over many ticks."""
+
+    # Seconds spent per phase
+    phase_seconds: dict[str, float] = field(
+        default_factory=lambda: dict.fromkeys(PHASES, 0.0),
+    )
+    ticks: int = 0
+    good_ticks: int = 0
+    # Markets that drew a nonzero global delta
+    global_delta_events: int = 0
+    # Goods hit by an instant mode change
+    instant_mode_changes: int = 0
+    # Goods ending a tick clamped to Config.min_stock_value
+    min_stock_value_hits: int = 0
+    # Goods moving from mode ``row`` to mode ``column`` within a tick
+    mode_transitions: NDArray[np.int64] = field(
+        default_factory=lambda: np.zeros((N_MODES, N_MODES), dtype=np.int64),
+    )
+    _mark: float = field(default=0.0, repr=False)
+
+    def start(self) -> None:
+        """Starts timing the first phase of a tick."""
+        self._mark = perf_counter()
+
+    def lap(self, phase: str) -> None:
+        """Adds the time since the previous lap to ``phase``."""
+        now = perf_counter()
+        self.phase_seconds[phase] += now - self._mark
+        self._mark = now
+
+    def count_transitions(
+        self,
+        old_modes: NDArray[np.integer],
+        new_modes: NDArray[np.integer],
+    ) -> None:
+        """Adds the goods whose mode changed to :attr:`mode_transitions`."""
+        changed = old_modes != new_modes
+        self.mode_transitions += np.bincount(
+            old_modes[changed].astype(np.intp) * N_MODES + new_modes[changed],
+            minlength=N_MODES * N_MODES,
+        ).reshape(N_MODES, N_MODES)
+
+    def summary(self) -> str:
+        """Formats the timings and counters as a small table."""
+        total = sum(self.phase_seconds.values()) or 1.0
+        lines = [f"{self.ticks} ticks, {self.good_ticks} good-ticks"]
+        lines.extend(
+            f"  {phase:20} {seconds:10.4f} s {seconds / total:7.1%}"
+            for phase, seconds in self.phase_seconds.items()
+        )
+        lines.append(f"  global delta events  {self.global_delta_events}")
+        lines.append(f"  instant mode changes {self.instant_mode_changes}")
+        lines.append(f"  min value clamps     {self.min_stock_value_hits}")
+        lines.append(f"  mode transitions     {int(self.mode_transitions.sum())}")
+        return "\n".join(lines)
+
+
+# Profile receiving the measurements of the current context, None while
+# instrumentation is off
+_active: ContextVar[TickProfile | None] = ContextVar("tick_profile", default=None)
+
+
+def active_profile() -> TickProfile | None:
+    """Returns the profile of the innermost ``instrument`` block, if any."""
+    return _active.get()
+
+
+@contextmanager
+def instrument() -> Iterator[TickProfile]:
+    """Collects a :class:`TickProfile` of every tick this context runs in the block."""
+    profile = TickProfile()
+    token = _active.set(profile)
+    try:
+        yield profile
+    finally:
+        _active.reset(token)
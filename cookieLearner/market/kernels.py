@@ -0,0 +1,20 @@
+"""Selection of the batched tick used by the engines.
+
+``tick_kernel`` is :func:`cookieLearner.market.numba_engine.tick_batch_numba`
+if ``numba`` is installed and
+:func:`cookieLearner.market.vectorized.tick_batch` otherwise. Both take the
+same arguments and return the same states for the same uniforms.
+"""
+
+from cookieLearner.market.vectorized import tick_batch
+
+try:
+    from cookieLearner.market.numba_engine import tick_batch_numba
+except ModuleNotFoundError as error:
+    if error.name != "numba":
+        raise
+    NUMBA_AVAILABLE = False
+    tick_kernel = tick_batch
+else:
+    NUMBA_AVAILABLE = True
+    tick_kernel = tick_batch_numba
@@ -1,6 +1,7 @@
 import random
 from dataclasses import dataclass
-from typing import Literal, get_args
+from enum import IntEnum
+from typing import Literal, Protocol, Self, get_args
 
 StockMode = Literal[
     "Stable",
@@ -14,6 +15,51 @@ StockMode = Literal[
 FastMode = Literal["Fast Rise", "Fast Fall", "Chaotic"]
 
 
+class Mode(IntEnum):
+    """Integer code of a stock mode, ``me.mode`` in JS.
+
+    The engines store modes as ``int8`` codes; :class:`StockMode` names are
+    only used to present them.
+    """
+
+    STABLE = 0
+    SLOW_RISE = 1
+    SLOW_FALL = 2
+    FAST_RISE = 3
+    FAST_FALL = 4
+    CHAOTIC = 5
+
+    @property
+    def label(self) -> "StockMode":
+        """Display name of the mode."""
+        return STOCK_MODES[self]
+
+    @classmethod
+    def from_label(cls, label: "StockMode") -> Self:
+        """Returns the mode with the display name ``label``."""
+        return cls(STOCK_MODES.index(label))
+
+    @classmethod
+    def coerce(cls, mode: "Self | StockMode | int") -> Self:
+        """Returns ``mode`` as a :class:`Mode`, given a mode, its code or its name.
+
+        :attr:`Good.mode` holds either form: the display name when it comes from
+        a snapshot, the :class:`Mode` when it comes straight from :func:`tick`.
+
+        """
+        if isinstance(mode, str):
+            return cls.from_label(mode)
+        return cls(mode)
+
+
+class RandomSource(Protocol):
+    """Source of uniform floats on [0, 1), e.g. the ``random`` module."""
+
+    def random(self) -> float:
+        """Returns the next uniform float."""
+        ...
+
+
 @dataclass
 class Config:
     """Configuration parameters for the stock market simulation."""
@@ -44,9 +90,11 @@ class Config:
     fast_mode_tick_fast_fall_probability: float = 0.3
     resting_stock_value_base: float = 10.0
     resting_stock_value_multiplier: float = 10.0
+    global_delta_probability: float = 0.1
+    global_delta_probability_dragon_boost: float = 0.1
 
 
-@dataclass
+@dataclass(slots=True)
 class GameEnvironment:
     """Represents the game environment (user progress) for the stock market simulation."""
 
@@ -55,19 +103,41 @@ class GameEnvironment:
     dragon_boost: float
 
 
-@dataclass
+@dataclass(slots=True)
 class Good:
     """Represents a good in the stock market."""
 
     stock_id: int
     stock_value: float
     stock_delta: float
-    mode: StockMode
+    mode: StockMode | Mode
     remaining_mode_duration: int
 
 
 DEFAULT_CONFIG = Config()
-STOCK_MODES: tuple[StockMode] = get_args(StockMode)
+# Number of goods in M.goodsById, one per building from Farm to You
+NUM_GOODS = 18
+STOCK_MODES: tuple[StockMode, ...] = get_args(StockMode)
+
+# Weighted random choice as in JS choose([0,1,1,2,2,3,4,5])
+WEIGHTED_MODES: tuple[Mode, ...] = (
+    Mode.STABLE,
+    Mode.SLOW_RISE,
+    Mode.SLOW_RISE,
+    Mode.SLOW_FALL,
+    Mode.SLOW_FALL,
+    Mode.FAST_RISE,
+    Mode.FAST_FALL,
+    Mode.CHAOTIC,
+)
+
+# Coefficients of _apply_mode_tick indexed by Mode. The delta is multiplied by
+# the decay and moved by scale * (random() - offset), then the value is moved
+# by kick * random(). A zero scale or kick skips the draw, as JS does.
+MODE_DELTA_DECAY: tuple[float, ...] = (0.95, 1.0, 0.99, 1.0, 1.0, 1.0)
+MODE_DELTA_SCALE: tuple[float, ...] = (0.05, 0.0, -0.05, 0.15, -0.15, 0.3)
+MODE_DELTA_OFFSET: tuple[float, ...] = (0.5, 0.0, 0.1, 0.1, 0.1, 0.5)
+MODE_VALUE_KICK: tuple[float, ...] = (0.0, 0.0, 0.0, 5.0, -1.0, 0.0)
 
 
 def resting_stock_value(
@@ -92,7 +162,7 @@ def resting_stock_value(
 def tick(
     stock_value: float,
     stock_delta: float,
-    stock_mode: StockMode,
+    stock_mode: Mode | StockMode,
     remaining_mode_duration: int,
     resting_stock_value: float,
     bank_level: int,
@@ -100,7 +170,11 @@ def tick(
     instant_mode_change_probability: float,
     dragon_boost: float,
     config: Config = DEFAULT_CONFIG,
-) -> tuple[float, float, StockMode, int]:
+    rng: RandomSource = random,
+) -> tuple[float, float, Mode, int]:
+    # The helpers index the per-mode tables by Mode
+    stock_mode = Mode.coerce(stock_mode)
+
     stock_delta = stock_delta * 0.97 + 0.01 * dragon_boost
 
     stock_value, stock_delta = _apply_mode_tick(
@@ -108,6 +182,7 @@ def tick(
         stock_delta,
         resting_stock_value,
         stock_mode,
+        rng=rng,
     )
 
     stock_value, stock_delta, remaining_mode_duration = _maybe_instant_mode_change(
@@ -116,6 +191,7 @@ def tick(
         stock_value,
         stock_delta,
         remaining_mode_duration,
+        rng=rng,
     )
 
     stock_value, stock_delta = _apply_fluctuations(
@@ -123,6 +199,7 @@ def tick(
         stock_delta,
         dragon_boost,
         config=config,
+        rng=rng,
     )
 
     stock_value, stock_delta, stock_mode = _apply_fast_mode_tick(
@@ -131,6 +208,7 @@ def tick(
         stock_mode,
         dragon_boost,
         config=config,
+        rng=rng,
     )
 
     stock_value, stock_delta = _apply_high_stock_value_dampening(
@@ -154,6 +232,7 @@ def tick(
             stock_mode,
             dragon_boost,
             config=config,
+            rng=rng,
         )
 
     return stock_value, stock_delta, stock_mode, remaining_mode_duration
@@ -163,23 +242,18 @@ def _apply_mode_tick(
     stock_value: float,
     stock_delta: float,
     resting_stock_value: float,
-    mode: StockMode,
+    mode: Mode,
+    rng: RandomSource = random,
 ) -> tuple[float, float]:
     """Applies the mode-specific tick adjustments to the stock_value and stock_delta."""
-    if mode == "Stable":
-        stock_delta *= 0.95
-        stock_delta += 0.05 * (random.random() - 0.5)
-    elif mode == "Slow Fall":
-        stock_delta *= 0.99
-        stock_delta -= 0.05 * (random.random() - 0.1)
-    elif mode == "Fast Rise":
-        stock_delta += 0.15 * (random.random() - 0.1)
-        stock_value += random.random() * 5
-    elif mode == "Fast Fall":
-        stock_delta -= 0.15 * (random.random() - 0.1)
-        stock_value -= random.random()
-    elif mode == "Chaotic":
-        stock_delta += 0.3 * (random.random() - 0.5)
+    delta_scale = MODE_DELTA_SCALE[mode]
+    if delta_scale:
+        stock_delta = stock_delta * MODE_DELTA_DECAY[mode] + delta_scale * (
+            rng.random() - MODE_DELTA_OFFSET[mode]
+        )
+    value_kick = MODE_VALUE_KICK[mode]
+    if value_kick:
+        stock_value += value_kick * rng.random()
 
     stock_value += (resting_stock_value - stock_value) * 0.01
 
@@ -191,18 +265,19 @@ def _apply_fluctuations(
     stock_delta: float,
     dragon_boost: float,
     config: Config = DEFAULT_CONFIG,
+    rng: RandomSource = random,
 ) -> tuple[float, float]:
-    stock_value += (random.random() - 0.5) ** 2 * 3
-    stock_delta += 0.1 * (random.random() - 0.5)
-    if random.random() < config.fluctuation_probability_primary:
-        stock_value += (random.random() - 0.5) * config.fluctuation_range_primary
-    if random.random() < config.fluctuation_probability_secondary:
-        stock_value += (random.random() - 0.5) * (
+    stock_value += (rng.random() - 0.5) ** 2 * 3
+    stock_delta += 0.1 * (rng.random() - 0.5)
+    if rng.random() < config.fluctuation_probability_primary:
+        stock_value += (rng.random() - 0.5) * config.fluctuation_range_primary
+    if rng.random() < config.fluctuation_probability_secondary:
+        stock_value += (rng.random() - 0.5) * (
             config.fluctuation_range_secondary
             + config.fluctuation_range_secondary_dragon_boost * dragon_boost
         )
-    if random.random() < config.fluctuation_probability_tertiary:
-        stock_delta += (random.random() - 0.5) * (
+    if rng.random() < config.fluctuation_probability_tertiary:
+        stock_delta += (rng.random() - 0.5) * (
             config.fluctuation_range_tertiary
             + config.fluctuation_range_tertiary_dragon_boost * dragon_boost
         )
@@ -213,36 +288,37 @@ def _apply_fluctuations(
 def _apply_fast_mode_tick(
     stock_value: float,
     stock_delta: float,
-    mode: StockMode,
+    mode: Mode,
     dragon_boost: float,
     config: Config = DEFAULT_CONFIG,
+    rng: RandomSource = random,
 ) -> tuple[
     float,
     float,
-    StockMode,
+    Mode,
 ]:
-    if mode == "Chaotic":
-        if random.random() < config.fast_mode_tick_chaotic_probability_primary:
-            stock_value += (random.random() - 0.5) * 10
-        if random.random() < config.fast_mode_tick_chaotic_probability_secondary:
-            stock_delta = (random.random() - 0.5) * (2 + 6 * dragon_boost)
+    if mode == Mode.CHAOTIC:
+        if rng.random() < config.fast_mode_tick_chaotic_probability_primary:
+            stock_value += (rng.random() - 0.5) * 10
+        if rng.random() < config.fast_mode_tick_chaotic_probability_secondary:
+            stock_delta = (rng.random() - 0.5) * (2 + 6 * dragon_boost)
     if (
-        mode == "Fast Rise"
-        and random.random() < config.fast_mode_tick_fast_rise_probability
+        mode == Mode.FAST_RISE
+        and rng.random() < config.fast_mode_tick_fast_rise_probability
     ):
-        stock_delta += (random.random() - 0.5) * 0.1
-        stock_value += (random.random() - 0.7) * 10
+        stock_delta += (rng.random() - 0.5) * 0.1
+        stock_value += (rng.random() - 0.7) * 10
     if (
-        mode == "Fast Rise"
-        and random.random() < config.fast_mode_tick_fast_rise_to_fast_fall_probability
+        mode == Mode.FAST_RISE
+        and rng.random() < config.fast_mode_tick_fast_rise_to_fast_fall_probability
     ):
-        mode = "Fast Fall"
+        mode = Mode.FAST_FALL
     if (
-        mode == "Fast Fall"
-        and random.random() < config.fast_mode_tick_fast_fall_probability
+        mode == Mode.FAST_FALL
+        and rng.random() < config.fast_mode_tick_fast_fall_probability
     ):
-        stock_delta += (random.random() - 0.5) * 0.1
-        stock_value += (random.random() - 0.3) * 10
+        stock_delta += (rng.random() - 0.5) * 0.1
+        stock_value += (rng.random() - 0.3) * 10
 
     return stock_value, stock_delta, mode
 
@@ -253,43 +329,42 @@ def _maybe_instant_mode_change(
     stock_value: float,
     stock_delta: float,
     remaining_mode_duration: int,
+    rng: RandomSource = random,
 ) -> tuple[float, float, int]:
-    if global_delta != 0 and random.random() < instant_mode_change_probability:
-        stock_value -= (1 + stock_delta * random.random() ** 3 * 7) * global_delta
-        stock_value -= global_delta * (1 + random.random() ** 3 * 7)
-        stock_delta += global_delta * (1 + random.random() * 4)
+    if global_delta != 0 and rng.random() < instant_mode_change_probability:
+        stock_value -= (1 + stock_delta * rng.random() ** 3 * 7) * global_delta
+        stock_value -= global_delta * (1 + rng.random() ** 3 * 7)
+        stock_delta += global_delta * (1 + rng.random() * 4)
         remaining_mode_duration = 0
 
     return stock_value, stock_delta, remaining_mode_duration
 
 
 def _update_expired_mode(
-    mode: StockMode,
+    mode: Mode,
     dragon_boost: float,
     config: Config = DEFAULT_CONFIG,
-) -> tuple[StockMode, int]:
+    rng: RandomSource = random,
+) -> tuple[Mode, int]:
     duration = int(
         config.duration_min
-        + random.random()
-        * (config.duration_max - 200 * config.duration_max_dragon_boost),
+        + rng.random() * (config.duration_max - 200 * config.duration_max_dragon_boost),
     )
 
     # Higher Chance of Chaotic mode if dragon_boost is high
     # or if the mode was in Fast Rise or Fast Fall.
     if (
-        random.random() < dragon_boost
-        and random.random() < config.chaotic_probability_with_dragon_boost
+        rng.random() < dragon_boost
+        and rng.random() < config.chaotic_probability_with_dragon_boost
     ) or (
-        random.random() < config.chaotic_probability_after_fast_mode
-        and (mode in ("Fast Rise", "Fast Fall"))
+        rng.random() < config.chaotic_probability_after_fast_mode
+        and (mode in (Mode.FAST_RISE, Mode.FAST_FALL))
     ):
-        mode_index = STOCK_MODES.index("Chaotic")
+        mode = Mode.CHAOTIC
     else:
-        # Weighted random choice as in JS choose([0,1,1,2,2,3,4,5])
-        choices = [0, 1, 1, 2, 2, 3, 4, 5]
-        mode_index = random.choice(choices)
+        mode = WEIGHTED_MODES[int(rng.random() * len(WEIGHTED_MODES))]
 
-    return STOCK_MODES[mode_index], duration
+    return mode, duration
 
 
 def _apply_high_stock_value_dampening(
@@ -0,0 +1,233 @@
+"""Closed-form model of how goods move between modes.
+
+A good keeps its mode for a number of ticks drawn in ``_update_expired_mode``
+and then draws the next one. Three things shorten or alter a stint:
+
+- an instant mode change, which happens to a good with probability
+  ``global_delta_probability / 2`` per tick (a global delta times the mean of
+  the uniform ``instant_mode_change_probability``) and expires the mode;
+- the Fast Rise to Fast Fall flip of ``_apply_fast_mode_tick``, which keeps
+  the remaining duration;
+- the Chaotic bias on expiry from the dragon boost and after fast modes.
+
+:func:`mode_model` turns a :class:`Config` and a dragon boost into the
+stint-to-stint transition matrix, the stint length distribution, the
+stationary share of ticks per mode and the expected stint and run lengths,
+without simulating. A run is a streak of ticks in one mode and may span
+several stints that draw the same mode again. Results are memoized per ``(config, dragon_boost)``.
+"""
+
+from dataclasses import astuple, dataclass
+from functools import lru_cache
+
+import numpy as np
+
+from cookieLearner.market.compiled import CompiledConfig
+from cookieLearner.market.market import (
+    DEFAULT_CONFIG,
+    WEIGHTED_MODES,
+    Config,
+    GameEnvironment,
+    Mode,
+)
+from cookieLearner.market.randomness import FloatArray
+
+N_MODES = len(Mode)
+FAST_MODES = (Mode.FAST_RISE, Mode.FAST_FALL)
+
+
+@dataclass(frozen=True, slots=True)
+class ModeModel:
+    """Mode dynamics of a single good, see :func:`mode_model`.
+
+    A stint starts when a mode is drawn on expiry and lasts until the next
+    expiry; a Fast Rise stint may turn into Fast Fall before it ends.
+    """
+
+    # P(next mode | mode when the stint expires), _update_expired_mode
+    expiry_transitions: FloatArray
+    # P(mode when the stint expires | mode drawn for the stint)
+    end_modes: FloatArray
+    # P(mode drawn for the next stint | mode drawn for this stint)
+    stint_transitions: FloatArray
+    # P(stint lasts k + 1 ticks ignoring instant mode changes), the drawn
+    # duration clipped to at least one tick
+    duration_probabilities: FloatArray
+    # Per-tick probability of an instant mode change of a good
+    instant_change_probability: float
+    # P(stint lasts k + 1 ticks)
+    stint_length_probabilities: FloatArray
+    # Expected ticks in each column mode during a stint drawn in the row mode
+    stint_ticks: FloatArray
+    # Long-run share of stints drawn in each mode
+    stint_stationary: FloatArray
+    # Long-run share of ticks spent in each mode
+    stationary: FloatArray
+    # Expected length of a run of consecutive ticks in each mode, which may
+    # span several stints drawing the same mode
+    mean_dwell: FloatArray
+
+    def __post_init__(self) -> None:
+        """Freezes the arrays, which are shared by every cached lookup."""
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if isinstance(value, np.ndarray):
+                value.setflags(write=False)
+
+    @property
+    def expected_stint_length(self) -> float:
+        """Expected number of ticks of a stint, the same for every mode."""
+        lengths = np.arange(1, len(self.stint_length_probabilities) + 1)
+        return float(lengths @ self.stint_length_probabilities)
+
+
+def mode_model(
+    config: Config = DEFAULT_CONFIG,
+    dragon_boost: float = 0.0,
+) -> ModeModel:
+    """Returns the mode dynamics for ``config`` and ``dragon_boost``.
+
+    The bank level and brokers do not affect modes. The model is cached, so
+    repeated calls with equal arguments are free, and its arrays are read-only.
+    """
+    return _mode_model(astuple(config), float(dragon_boost))
+
+
+@lru_cache(maxsize=64)
+def _mode_model(config_fields: tuple, dragon_boost: float) -> ModeModel:
+    """Builds the :class:`ModeModel` of a hashable :class:`Config`."""
+    config = Config(*config_fields)
+    compiled = CompiledConfig.from_config(
+        config,
+        GameEnvironment(bank_level=1, num_brokers=0, dragon_boost=dragon_boost),
+        n_goods=1,
+    )
+
+    expiry_transitions = _expiry_transitions(compiled)
+    duration_probabilities = _duration_probabilities(
+        compiled.duration_min,
+        compiled.duration_span,
+    )
+    instant_change_probability = float(
+        np.clip(compiled.global_delta_probability, 0, 1) / 2,
+    )
+
+    # A stint of drawn duration r lasts min(r, G) ticks, G ~ Geometric(q)
+    ticks = np.arange(1, len(duration_probabilities) + 1)
+    duration_survival = np.cumsum(duration_probabilities[::-1])[::-1]
+    survival = duration_survival * (1 - instant_change_probability) ** (ticks - 1)
+    stint_length_probabilities = survival - np.append(survival[1:], 0.0)
+
+    # Fast Rise flips with probability f on each tick of its stint, the
+    # tick of the flip still counting as Fast Rise
+    flip = compiled.fast_mode_tick_fast_rise_to_fast_fall_probability
+    rise_ticks = float(survival @ (1 - flip) ** (ticks - 1))
+    no_flip = float(stint_length_probabilities @ (1 - flip) ** ticks)
+    expected_length = float(survival.sum())
+
+    end_modes = np.eye(N_MODES)
+    end_modes[Mode.FAST_RISE] = 0.0
+    end_modes[Mode.FAST_RISE, Mode.FAST_RISE] = no_flip
+    end_modes[Mode.FAST_RISE, Mode.FAST_FALL] = 1 - no_flip
+    stint_transitions = end_modes @ expiry_transitions
+
+    stint_ticks = np.eye(N_MODES) * expected_length
+    stint_ticks[Mode.FAST_RISE, Mode.FAST_RISE] = rise_ticks
+    stint_ticks[Mode.FAST_RISE, Mode.FAST_FALL] = expected_length - rise_ticks
+
+    stint_stationary = _stationary(stint_transitions)
+    time_per_stint = stint_stationary @ stint_ticks
+    stationary = time_per_stint / time_per_stint.sum()
+
+    # A run of a mode starts on a tick whose mode differs from the previous
+    # tick's. A stint continues the run of the previous one if it draws the
+    # mode of its last tick, which is Fast Fall only if a Fast Rise stint
+    # flipped before that tick; the draw depends on the mode at expiry.
+    flip_before_end = float(
+        stint_length_probabilities @ (1 - (1 - flip) ** (ticks - 1)),
+    )
+    flip_on_last_tick = 1 - no_flip - flip_before_end
+    continued = stint_stationary * np.diag(expiry_transitions)
+    continued[Mode.FAST_RISE] = stint_stationary[Mode.FAST_RISE] * (
+        no_flip * expiry_transitions[Mode.FAST_RISE, Mode.FAST_RISE]
+        + flip_on_last_tick * expiry_transitions[Mode.FAST_FALL, Mode.FAST_RISE]
+    )
+    continued[Mode.FAST_FALL] += (
+        stint_stationary[Mode.FAST_RISE]
+        * flip_before_end
+        * expiry_transitions[Mode.FAST_FALL, Mode.FAST_FALL]
+    )
+    # Runs entered per stint: the stints that do not continue a run, and the
+    # flips of Fast Rise before the last tick into Fast Fall
+    entries = stint_stationary - continued
+    entries[Mode.FAST_FALL] += stint_stationary[Mode.FAST_RISE] * flip_before_end
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_dwell = np.where(entries > 0, time_per_stint / entries, 0.0)
+
+    return ModeModel(
+        expiry_transitions=expiry_transitions,
+        end_modes=end_modes,
+        stint_transitions=stint_transitions,
+        duration_probabilities=duration_probabilities,
+        instant_change_probability=instant_change_probability,
+        stint_length_probabilities=stint_length_probabilities,
+        stint_ticks=stint_ticks,
+        stint_stationary=stint_stationary,
+        stationary=stationary,
+        mean_dwell=mean_dwell,
+    )
+
+
+def _expiry_transitions(compiled: CompiledConfig) -> FloatArray:
+    """Distribution of the mode drawn by ``_update_expired_mode``."""
+    weights = np.bincount(WEIGHTED_MODES, minlength=N_MODES) / len(WEIGHTED_MODES)
+    dragon_chaotic = float(
+        np.clip(compiled.dragon_boost, 0, 1)
+        * compiled.chaotic_probability_with_dragon_boost,
+    )
+
+    transitions = np.empty((N_MODES, N_MODES))
+    for mode in Mode:
+        chaotic = dragon_chaotic
+        if mode in FAST_MODES:
+            chaotic += (
+                1 - dragon_chaotic
+            ) * compiled.chaotic_probability_after_fast_mode
+        transitions[mode] = (1 - chaotic) * weights
+        transitions[mode, Mode.CHAOTIC] += chaotic
+    return transitions
+
+
+def _duration_probabilities(duration_min: float, duration_span: float) -> FloatArray:
+    """Distribution of the ticks until a freshly drawn mode expires.
+
+    The duration is ``int(duration_min + random() * duration_span)``,
+    truncated toward zero, and a mode lasts at least one tick, so index ``k``
+    holds the probability of ``k + 1`` ticks.
+    """
+    if duration_span == 0:
+        length = max(int(duration_min), 1)
+        probabilities = np.zeros(length)
+        probabilities[-1] = 1.0
+        return probabilities
+
+    low, high = sorted((duration_min, duration_min + duration_span))
+    longest = max(int(np.floor(high)), 1)
+    # int(x) <= 1 covers x < 2, int(x) == k covers [k, k + 1) for k >= 2
+    edges = np.concatenate([[-np.inf], np.arange(2, longest + 1), [np.inf]])
+    overlap = np.clip(
+        np.minimum(edges[1:], high) - np.maximum(edges[:-1], low),
+        0,
+        None,
+    )
+    return overlap / (high - low)
+
+
+def _stationary(transitions: FloatArray) -> FloatArray:
+    """Stationary distribution of a row-stochastic matrix."""
+    n_states = transitions.shape[0]
+    # Solve pi (P - I) = 0 with sum(pi) = 1 in the least-squares sense
+    system = np.vstack([transitions.T - np.eye(n_states), np.ones(n_states)])
+    target = np.append(np.zeros(n_states), 1.0)
+    stationary, *_ = np.linalg.lstsq(system, target)
+    return np.clip(stationary, 0, None) / np.clip(stationary, 0, None).sum()
@@ -0,0 +1,396 @@
+"""Optional Numba backend for the batched tick.
+
+Requires ``numba`` (``pip install cookie-learner[numba]``).
+
+:func:`tick_batch_numba` is a drop-in replacement of
+:func:`cookieLearner.market.vectorized.tick_batch`. Instead of evaluating
+every branch of the scalar helpers as a mask over all goods, a compiled loop
+visits each good once and only takes the branches that fire, keeping the
+good's state in registers. It reads the same ``TICK_DRAWS`` slots of the
+same uniforms, so both engines return bitwise identical states for the same
+draws. :mod:`cookieLearner.market.kernels` picks it automatically when
+``numba`` is installed.
+"""
+
+import numba
+import numpy as np
+from numpy.typing import ArrayLike
+
+from cookieLearner.market import instrumentation
+from cookieLearner.market.compiled import CompiledConfig
+from cookieLearner.market.market import Mode
+from cookieLearner.market.randomness import FloatArray, UniformSource
+from cookieLearner.market.vectorized import (
+    DELTA_DECAY_TABLE,
+    DELTA_OFFSET_TABLE,
+    DELTA_SCALE_TABLE,
+    DRAW_EXPIRY_CHOICE,
+    DRAW_EXPIRY_DRAGON_CHAOTIC,
+    DRAW_EXPIRY_DRAGON_GATE,
+    DRAW_EXPIRY_DURATION,
+    DRAW_EXPIRY_FAST_CHAOTIC,
+    DRAW_FAST_FALL_DELTA,
+    DRAW_FAST_FALL_GATE,
+    DRAW_FAST_FALL_VALUE,
+    DRAW_FAST_PRIMARY_DELTA,
+    DRAW_FAST_PRIMARY_GATE,
+    DRAW_FAST_PRIMARY_VALUE,
+    DRAW_FAST_SECONDARY_GATE,
+    DRAW_FLUCTUATION_DELTA,
+    DRAW_FLUCTUATION_PRIMARY,
+    DRAW_FLUCTUATION_PRIMARY_GATE,
+    DRAW_FLUCTUATION_SECONDARY,
+    DRAW_FLUCTUATION_SECONDARY_GATE,
+    DRAW_FLUCTUATION_TERTIARY,
+    DRAW_FLUCTUATION_TERTIARY_GATE,
+    DRAW_FLUCTUATION_VALUE,
+    DRAW_INSTANT_DELTA,
+    DRAW_INSTANT_GATE,
+    DRAW_INSTANT_VALUE_PRIMARY,
+    DRAW_INSTANT_VALUE_SECONDARY,
+    DRAW_MODE_DELTA,
+    DRAW_MODE_VALUE,
+    MODE_CHOICES,
+    TICK_DRAWS,
+    VALUE_KICK_TABLE,
+    DurationArray,
+    ModeArray,
+    tick_batch,
+)
+
+# Rows of the per-market parameter array, fields of CompiledConfig that may
+# differ between markets
+MARKET_PARAMETERS = (
+    "delta_drift",
+    "dragon_boost",
+    "fluctuation_range_secondary",
+    "fluctuation_range_tertiary",
+    "chaotic_delta_range",
+    "high_stock_value_threshold",
+)
+_DELTA_DRIFT = 0
+_DRAGON_BOOST = 1
+_FLUCTUATION_RANGE_SECONDARY = 2
+_FLUCTUATION_RANGE_TERTIARY = 3
+_CHAOTIC_DELTA_RANGE = 4
+_HIGH_STOCK_VALUE_THRESHOLD = 5
+
+# Entries of the shared parameter array, fields of CompiledConfig that are
+# the same for every market
+SHARED_PARAMETERS = (
+    "fluctuation_probability_primary",
+    "fluctuation_range_primary",
+    "fluctuation_probability_secondary",
+    "fluctuation_probability_tertiary",
+    "fast_mode_tick_chaotic_probability_primary",
+    "fast_mode_tick_chaotic_probability_secondary",
+    "fast_mode_tick_fast_rise_probability",
+    "fast_mode_tick_fast_rise_to_fast_fall_probability",
+    "fast_mode_tick_fast_fall_probability",
+    "high_stock_value_dampening",
+    "low_stock_value_threshold",
+    "low_stock_value_delta_dampening",
+    "min_stock_value",
+    "duration_min",
+    "duration_span",
+    "chaotic_probability_with_dragon_boost",
+    "chaotic_probability_after_fast_mode",
+)
+_FLUCTUATION_PROBABILITY_PRIMARY = 0
+_FLUCTUATION_RANGE_PRIMARY = 1
+_FLUCTUATION_PROBABILITY_SECONDARY = 2
+_FLUCTUATION_PROBABILITY_TERTIARY = 3
+_CHAOTIC_PROBABILITY_PRIMARY = 4
+_CHAOTIC_PROBABILITY_SECONDARY = 5
+_FAST_RISE_PROBABILITY = 6
+_FAST_RISE_TO_FAST_FALL_PROBABILITY = 7
+_FAST_FALL_PROBABILITY = 8
+_HIGH_STOCK_VALUE_DAMPENING = 9
+_LOW_STOCK_VALUE_THRESHOLD = 10
+_LOW_STOCK_VALUE_DELTA_DAMPENING = 11
+_MIN_STOCK_VALUE = 12
+_DURATION_MIN = 13
+_DURATION_SPAN = 14
+_CHAOTIC_PROBABILITY_WITH_DRAGON_BOOST = 15
+_CHAOTIC_PROBABILITY_AFTER_FAST_MODE = 16
+
+_CHAOTIC = np.int8(Mode.CHAOTIC)
+_FAST_RISE = np.int8(Mode.FAST_RISE)
+_FAST_FALL = np.int8(Mode.FAST_FALL)
+
+
+def tick_batch_numba(
+    stock_values: ArrayLike,
+    stock_deltas: ArrayLike,
+    stock_modes: ArrayLike,
+    remaining_mode_durations: ArrayLike,
+    global_delta: ArrayLike,
+    instant_mode_change_probability: ArrayLike,
+    compiled: CompiledConfig,
+    rng: UniformSource | None = None,
+    uniforms: FloatArray | None = None,
+) -> tuple[FloatArray, FloatArray, ModeArray, DurationArray]:
+    """Advances every good by one tick, see :func:`tick_batch`.
+
+    The last axis of the per-good arrays holds the goods of a market, the
+    leading axes (if any) the markets. ``global_delta``,
+    ``instant_mode_change_probability`` and the fields of ``compiled`` may
+    vary over the markets but not over the goods.
+
+    Returns:
+        tuple: New stock values, deltas, mode codes and remaining durations.
+
+    """
+    if instrumentation.active_profile() is not None:
+        # The fused loop has no phases to time
+        return tick_batch(
+            stock_values,
+            stock_deltas,
+            stock_modes,
+            remaining_mode_durations,
+            global_delta,
+            instant_mode_change_probability,
+            compiled,
+            rng=rng,
+            uniforms=uniforms,
+        )
+
+    stock_values = np.array(stock_values, dtype=np.float64)
+    stock_deltas = np.array(stock_deltas, dtype=np.float64)
+    stock_modes = np.array(stock_modes, dtype=np.int8)
+    remaining_mode_durations = np.array(remaining_mode_durations, dtype=np.int64)
+
+    shape = stock_values.shape
+    if uniforms is None:
+        rng = np.random.default_rng() if rng is None else rng
+        uniforms = rng.random((TICK_DRAWS, *shape))
+
+    grid = (-1, shape[-1])
+    market_shape = (*shape[:-1], 1)
+
+    def per_market(parameter: ArrayLike) -> FloatArray:
+        return np.broadcast_to(parameter, market_shape).astype(np.float64).ravel()
+
+    _tick_kernel(
+        stock_values.reshape(grid),
+        stock_deltas.reshape(grid),
+        stock_modes.reshape(grid),
+        remaining_mode_durations.reshape(grid),
+        np.broadcast_to(compiled.resting_stock_values, shape).reshape(grid),
+        per_market(global_delta),
+        per_market(instant_mode_change_probability),
+        np.stack(
+            [per_market(getattr(compiled, name)) for name in MARKET_PARAMETERS],
+        ),
+        np.array(
+            [getattr(compiled, name) for name in SHARED_PARAMETERS],
+            dtype=np.float64,
+        ),
+        uniforms.reshape(TICK_DRAWS, *grid),
+    )
+
+    return stock_values, stock_deltas, stock_modes, remaining_mode_durations
+
+
+@numba.njit(cache=True, nogil=True)
+def _tick_kernel(  # noqa: C901, PLR0912, PLR0915
+    stock_values: FloatArray,
+    stock_deltas: FloatArray,
+    stock_modes: ModeArray,
+    remaining_mode_durations: DurationArray,
+    resting_stock_values: FloatArray,
+    global_delta: FloatArray,
+    instant_mode_change_probability: FloatArray,
+    market_parameters: FloatArray,
+    parameters: FloatArray,
+    uniforms: FloatArray,
+) -> None:
+    """Advances ``(n_markets, n_goods)`` state in place by one tick.
+
+    Every expression is written in the same order as in
+    :mod:`cookieLearner.market.vectorized`, so the floating-point results match
+    bit for bit.
+    """
+    n_markets, n_goods = stock_values.shape
+    for market in range(n_markets):
+        delta_drift = market_parameters[_DELTA_DRIFT, market]
+        dragon_boost = market_parameters[_DRAGON_BOOST, market]
+        fluctuation_range_secondary = market_parameters[
+            _FLUCTUATION_RANGE_SECONDARY,
+            market,
+        ]
+        fluctuation_range_tertiary = market_parameters[
+            _FLUCTUATION_RANGE_TERTIARY,
+            market,
+        ]
+        chaotic_delta_range = market_parameters[_CHAOTIC_DELTA_RANGE, market]
+        high_stock_value_threshold = market_parameters[
+            _HIGH_STOCK_VALUE_THRESHOLD,
+            market,
+        ]
+        market_delta = global_delta[market]
+        market_probability = instant_mode_change_probability[market]
+
+        for good in range(n_goods):
+            value = stock_values[market, good]
+            delta = stock_deltas[market, good] * 0.97 + delta_drift
+            mode = stock_modes[market, good]
+            duration = remaining_mode_durations[market, good]
+
+            # _apply_mode_tick
+            delta = delta * DELTA_DECAY_TABLE[mode] + DELTA_SCALE_TABLE[mode] * (
+                uniforms[DRAW_MODE_DELTA, market, good] - DELTA_OFFSET_TABLE[mode]
+            )
+            value = (
+                value
+                + VALUE_KICK_TABLE[mode]
+                * uniforms[
+                    DRAW_MODE_VALUE,
+                    market,
+                    good,
+                ]
+            )
+            value = value + (resting_stock_values[market, good] - value) * 0.01
+
+            # _maybe_instant_mode_change
+            if (
+                market_delta != 0
+                and uniforms[DRAW_INSTANT_GATE, market, good] < market_probability
+            ):
+                primary = uniforms[DRAW_INSTANT_VALUE_PRIMARY, market, good]
+                secondary = uniforms[DRAW_INSTANT_VALUE_SECONDARY, market, good]
+                value = (
+                    value
+                    - (1 + delta * (primary * primary * primary) * 7) * market_delta
+                )
+                value -= market_delta * (1 + secondary * secondary * secondary * 7)
+                delta = delta + market_delta * (
+                    1 + uniforms[DRAW_INSTANT_DELTA, market, good] * 4
+                )
+                duration = 0
+
+            # _apply_fluctuations
+            value = (
+                value + (uniforms[DRAW_FLUCTUATION_VALUE, market, good] - 0.5) ** 2 * 3
+            )
+            delta = delta + 0.1 * (uniforms[DRAW_FLUCTUATION_DELTA, market, good] - 0.5)
+            if (
+                uniforms[DRAW_FLUCTUATION_PRIMARY_GATE, market, good]
+                < parameters[_FLUCTUATION_PROBABILITY_PRIMARY]
+            ):
+                value = (
+                    value
+                    + (uniforms[DRAW_FLUCTUATION_PRIMARY, market, good] - 0.5)
+                    * parameters[_FLUCTUATION_RANGE_PRIMARY]
+                )
+            if (
+                uniforms[DRAW_FLUCTUATION_SECONDARY_GATE, market, good]
+                < parameters[_FLUCTUATION_PROBABILITY_SECONDARY]
+            ):
+                value = (
+                    value
+                    + (uniforms[DRAW_FLUCTUATION_SECONDARY, market, good] - 0.5)
+                    * fluctuation_range_secondary
+                )
+            if (
+                uniforms[DRAW_FLUCTUATION_TERTIARY_GATE, market, good]
+                < parameters[_FLUCTUATION_PROBABILITY_TERTIARY]
+            ):
+                delta = (
+                    delta
+                    + (uniforms[DRAW_FLUCTUATION_TERTIARY, market, good] - 0.5)
+                    * fluctuation_range_tertiary
+                )
+
+            # _apply_fast_mode_tick, Chaotic overwrites the delta and Fast Rise
+            # may turn into Fast Fall within the same tick
+            if mode == _CHAOTIC:
+                if (
+                    uniforms[DRAW_FAST_PRIMARY_GATE, market, good]
+                    < parameters[_CHAOTIC_PROBABILITY_PRIMARY]
+                ):
+                    value = (
+                        value
+                        + (uniforms[DRAW_FAST_PRIMARY_VALUE, market, good] - 0.5) * 10
+                    )
+                if (
+                    uniforms[DRAW_FAST_SECONDARY_GATE, market, good]
+                    < parameters[_CHAOTIC_PROBABILITY_SECONDARY]
+                ):
+                    delta = (
+                        uniforms[DRAW_FAST_PRIMARY_DELTA, market, good] - 0.5
+                    ) * chaotic_delta_range
+            if mode == _FAST_RISE:
+                if (
+                    uniforms[DRAW_FAST_PRIMARY_GATE, market, good]
+                    < parameters[_FAST_RISE_PROBABILITY]
+                ):
+                    delta = (
+                        delta
+                        + (uniforms[DRAW_FAST_PRIMARY_DELTA, market, good] - 0.5) * 0.1
+                    )
+                    value = (
+                        value
+                        + (uniforms[DRAW_FAST_PRIMARY_VALUE, market, good] - 0.7) * 10
+                    )
+                if (
+                    uniforms[DRAW_FAST_SECONDARY_GATE, market, good]
+                    < parameters[_FAST_RISE_TO_FAST_FALL_PROBABILITY]
+                ):
+                    mode = _FAST_FALL
+            if (
+                mode == _FAST_FALL
+                and uniforms[DRAW_FAST_FALL_GATE, market, good]
+                < parameters[_FAST_FALL_PROBABILITY]
+            ):
+                delta = (
+                    delta + (uniforms[DRAW_FAST_FALL_DELTA, market, good] - 0.5) * 0.1
+                )
+                value = (
+                    value + (uniforms[DRAW_FAST_FALL_VALUE, market, good] - 0.3) * 10
+                )
+
+            # _apply_high_stock_value_dampening
+            if value > high_stock_value_threshold and delta > 0:
+                delta = delta * parameters[_HIGH_STOCK_VALUE_DAMPENING]
+
+            value = value + delta
+
+            # _apply_low_stock_value_dampening
+            low_threshold = parameters[_LOW_STOCK_VALUE_THRESHOLD]
+            if value < low_threshold:
+                value = value + (low_threshold - value) * 0.5
+            if value < low_threshold and delta < 0:
+                delta = delta * parameters[_LOW_STOCK_VALUE_DELTA_DAMPENING]
+            value = max(value, parameters[_MIN_STOCK_VALUE])
+
+            # _update_expired_mode
+            duration -= 1
+            if duration <= 0:
+                duration = int(
+                    parameters[_DURATION_MIN]
+                    + uniforms[DRAW_EXPIRY_DURATION, market, good]
+                    * parameters[_DURATION_SPAN],
+                )
+                if (
+                    uniforms[DRAW_EXPIRY_DRAGON_GATE, market, good] < dragon_boost
+                    and uniforms[DRAW_EXPIRY_DRAGON_CHAOTIC, market, good]
+                    < parameters[_CHAOTIC_PROBABILITY_WITH_DRAGON_BOOST]
+                ) or (
+                    uniforms[DRAW_EXPIRY_FAST_CHAOTIC, market, good]
+                    < parameters[_CHAOTIC_PROBABILITY_AFTER_FAST_MODE]
+                    and (mode in (_FAST_RISE, _FAST_FALL))
+                ):
+                    mode = _CHAOTIC
+                else:
+                    mode = MODE_CHOICES[
+                        int(
+                            uniforms[DRAW_EXPIRY_CHOICE, market, good]
+                            * len(MODE_CHOICES),
+                        )
+                    ]
+
+            stock_values[market, good] = value
+            stock_deltas[market, good] = delta
+            stock_modes[market, good] = mode
+            remaining_mode_durations[market, good] = duration
@@ -0,0 +1,400 @@
+"""Batched markets sharded across worker processes over shared memory.
+
+The good state of all markets lives in ``multiprocessing.shared_memory``
+blocks. Every worker owns a contiguous slice of markets, runs a
+:class:`MarketBatch` whose arrays are views of its slice, and advances it
+when told to. Only short command tuples cross process boundaries; the parent
+reads the state directly from the shared blocks.
+
+:class:`ThreadedMarkets` does the same with a pool of threads in one
+process. It needs a free-threaded build of Python to scale; with the GIL
+enabled it steps all markets from the calling thread instead.
+
+Draws come from :class:`CounterStreams` addressed by global market ids, so
+the result does not depend on the number of workers and equals a single
+``MarketBatch(environments, streams=CounterStreams(seed))``.
+"""
+
+import os
+import sys
+from collections.abc import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from itertools import pairwise
+from multiprocessing import get_context
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from types import TracebackType
+from typing import Any, NamedTuple, Self
+
+import numpy as np
+
+from cookieLearner.market.batch import MarketBatch
+from cookieLearner.market.market import (
+    DEFAULT_CONFIG,
+    NUM_GOODS,
+    Config,
+    GameEnvironment,
+)
+from cookieLearner.market.randomness import CounterStreams
+
+# Per-good state arrays of MarketBatch kept in shared memory
+SHARED_FIELDS = {
+    "stock_values": np.float64,
+    "stock_deltas": np.float64,
+    "stock_modes": np.int8,
+    "remaining_mode_durations": np.int64,
+}
+
+
+class SharedArraySpec(NamedTuple):
+    """Picklable description of an array in a shared memory block."""
+
+    name: str
+    shape: tuple[int, ...]
+    dtype: str
+
+
+def _attach(spec: SharedArraySpec) -> tuple[SharedMemory, np.ndarray]:
+    """Maps the shared block of ``spec`` and returns it with an array view."""
+    # The creating process owns the block, so workers must not track it
+    block = SharedMemory(name=spec.name, track=False)
+    return block, np.ndarray(spec.shape, dtype=spec.dtype, buffer=block.buf)
+
+
+def _shard_bounds(n_markets: int, n_workers: int) -> list[tuple[int, int]]:
+    """Splits ``n_markets`` markets into contiguous, near-equal slices."""
+    bounds = np.linspace(0, n_markets, n_workers + 1).astype(int).tolist()
+    return list(pairwise(bounds))
+
+
+def gil_enabled() -> bool:
+    """Whether the interpreter serializes Python threads with the GIL."""
+    # Only free-threaded builds of Python 3.13+ define a way to turn it off
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is None or is_gil_enabled()
+
+
+def _worker(
+    connection: Connection,
+    specs: dict[str, SharedArraySpec],
+    environments: Sequence[GameEnvironment],
+    start: int,
+    n_goods: int,
+    config: Config,
+    seed: int,
+) -> None:
+    """Runs the markets ``start, ..., start + len(environments) - 1``.
+
+    Commands are ``("step", n_ticks)``, ``("reset", None)`` and
+    ``("close", None)``; every command but close is answered with the clock.
+    """
+    stop = start + len(environments)
+    blocks = []
+    batch = MarketBatch(
+        environments,
+        n_goods=n_goods,
+        config=config,
+        history_depth=None,
+        streams=CounterStreams(seed),
+        market_ids=np.arange(start, stop),
+    )
+    for field, spec in specs.items():
+        block, array = _attach(spec)
+        blocks.append(block)
+        view = array[start:stop]
+        view[...] = getattr(batch, field)
+        setattr(batch, field, view)
+    connection.send(batch.clock)
+
+    try:
+        while True:
+            command, argument = connection.recv()
+            if command == "step":
+                batch.step_n(argument)
+            elif command == "reset":
+                batch.reset()
+            else:
+                break
+            connection.send(batch.clock)
+    finally:
+        for block in blocks:
+            block.close()
+        connection.close()
+
+
+class ShardedMarkets:
+    """Markets advanced in lockstep by a pool of worker processes.
+
+    The per-good state arrays of shape ``(n_markets, n_goods)`` are views of
+    shared memory and are updated in place by the workers. Call
+    :meth:`close`, or use the object as a context manager, to stop the
+    workers and free the shared blocks.
+    """
+
+    def __init__(
+        self,
+        environments: Sequence[GameEnvironment],
+        n_workers: int | None = None,
+        n_goods: int = NUM_GOODS,
+        config: Config = DEFAULT_CONFIG,
+        seed: int = 0,
+    ) -> None:
+        """Allocates the shared state and starts the workers.
+
+        Args:
+            environments: Game environment of every market.
+            n_workers: Number of worker processes, the CPU count if omitted.
+            n_goods: Number of goods per market.
+            config: Simulation parameters.
+            seed: Root seed of the counter-based streams.
+
+        """
+        n_markets = len(environments)
+        n_workers = min(n_workers or os.cpu_count() or 1, n_markets)
+        self.clock = 0
+
+        self._blocks: list[SharedMemory] = []
+        self._specs: dict[str, SharedArraySpec] = {}
+        self._connections: list[Connection] = []
+        self._processes = []
+        try:
+            self._start(environments, n_workers, n_goods, config, seed)
+        except BaseException:
+            # Nothing else would free the blocks of a half-started pool
+            self.close()
+            raise
+
+    @property
+    def n_workers(self) -> int:
+        """Number of worker processes."""
+        return len(self._processes)
+
+    def step_n(self, n_ticks: int) -> None:
+        """Advances every market by ``n_ticks`` ticks and waits for all workers."""
+        self._broadcast("step", n_ticks)
+
+    def reset(self) -> None:
+        """Re-initializes every market as in JS M.reset."""
+        self._broadcast("reset", None)
+
+    @property
+    def closed(self) -> bool:
+        """Whether :meth:`close` was called."""
+        return not self._blocks
+
+    def close(self) -> None:
+        """Stops the workers and frees the shared memory; closing again does nothing."""
+        if self.closed:
+            return
+        for connection in self._connections:
+            # A worker that failed to start has already hung up
+            with suppress(OSError):
+                connection.send(("close", None))
+            connection.close()
+        for process in self._processes:
+            process.join()
+        self._connections.clear()
+        self._processes.clear()
+        # Drop the views before unmapping the blocks they point into
+        for field in SHARED_FIELDS:
+            vars(self).pop(field, None)
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks.clear()
+
+    def __enter__(self) -> Self:
+        """Returns the running markets."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Stops the workers."""
+        self.close()
+
+    def _start(
+        self,
+        environments: Sequence[GameEnvironment],
+        n_workers: int,
+        n_goods: int,
+        config: Config,
+        seed: int,
+    ) -> None:
+        """Allocates the shared state, starts the workers and waits for them."""
+        shape = (len(environments), n_goods)
+        self.stock_values = self._allocate("stock_values", shape)
+        self.stock_deltas = self._allocate("stock_deltas", shape)
+        self.stock_modes = self._allocate("stock_modes", shape)
+        self.remaining_mode_durations = self._allocate(
+            "remaining_mode_durations",
+            shape,
+        )
+
+        self.shards = _shard_bounds(len(environments), n_workers)
+        # Forking a parent that runs threads, e.g. of JAX, can deadlock the child
+        context = get_context("forkserver")
+        for start, stop in self.shards:
+            parent_connection, child_connection = context.Pipe()
+            process = context.Process(
+                target=_worker,
+                args=(
+                    child_connection,
+                    self._specs,
+                    list(environments[start:stop]),
+                    start,
+                    n_goods,
+                    config,
+                    seed,
+                ),
+                daemon=True,
+            )
+            process.start()
+            child_connection.close()
+            self._connections.append(parent_connection)
+            self._processes.append(process)
+        self._gather()
+
+    def _allocate(self, field: str, shape: tuple[int, ...]) -> np.ndarray:
+        """Creates a shared block for ``field`` and returns an array view of it."""
+        dtype = np.dtype(SHARED_FIELDS[field])
+        block = SharedMemory(
+            create=True,
+            size=max(int(np.prod(shape)) * dtype.itemsize, 1),
+        )
+        self._blocks.append(block)
+        self._specs[field] = SharedArraySpec(block.name, shape, dtype.str)
+        return np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+    def _broadcast(self, command: str, argument: Any) -> None:
+        """Sends a command to every worker and waits for their answers."""
+        for connection in self._connections:
+            connection.send((command, argument))
+        self._gather()
+
+    def _gather(self) -> None:
+        """Waits until every worker reports its clock."""
+        clocks = {connection.recv() for connection in self._connections}
+        self.clock = clocks.pop()
+
+
+class ThreadedMarkets:
+    """Markets advanced in lockstep by a pool of threads.
+
+    Every thread owns a :class:`MarketBatch` over a contiguous block of
+    markets and its own :class:`CounterStreams`, and writes into views of the
+    shared ``(n_markets, n_goods)`` state arrays, so threads never touch the
+    same memory. If the GIL is enabled the blocks are stepped one after the
+    other from the calling thread, which gives the same results.
+
+    An ``instrument`` block only profiles the blocks stepped on the calling
+    thread; ticks run by the pool threads are not counted.
+    """
+
+    def __init__(
+        self,
+        environments: Sequence[GameEnvironment],
+        n_workers: int | None = None,
+        n_goods: int = NUM_GOODS,
+        config: Config = DEFAULT_CONFIG,
+        seed: int = 0,
+    ) -> None:
+        """Builds the per-thread batches and starts the pool.
+
+        Args:
+            environments: Game environment of every market.
+            n_workers: Number of threads, the CPU count if omitted. Forced to
+                1 if the GIL is enabled.
+            n_goods: Number of goods per market.
+            config: Simulation parameters.
+            seed: Root seed of the counter-based streams.
+
+        """
+        n_markets = len(environments)
+        n_workers = min(n_workers or os.cpu_count() or 1, n_markets)
+        if gil_enabled():
+            n_workers = 1
+
+        shape = (n_markets, n_goods)
+        self.stock_values = np.empty(shape, dtype=SHARED_FIELDS["stock_values"])
+        self.stock_deltas = np.empty(shape, dtype=SHARED_FIELDS["stock_deltas"])
+        self.stock_modes = np.empty(shape, dtype=SHARED_FIELDS["stock_modes"])
+        self.remaining_mode_durations = np.empty(
+            shape,
+            dtype=SHARED_FIELDS["remaining_mode_durations"],
+        )
+
+        self.shards = _shard_bounds(n_markets, n_workers)
+        self.batches = []
+        for start, stop in self.shards:
+            batch = MarketBatch(
+                environments[start:stop],
+                n_goods=n_goods,
+                config=config,
+                history_depth=None,
+                streams=CounterStreams(seed),
+                market_ids=np.arange(start, stop),
+            )
+            for field in SHARED_FIELDS:
+                view = getattr(self, field)[start:stop]
+                view[...] = getattr(batch, field)
+                setattr(batch, field, view)
+            self.batches.append(batch)
+
+        self._executor = (
+            ThreadPoolExecutor(n_workers, thread_name_prefix="market")
+            if n_workers > 1
+            else None
+        )
+
+    @property
+    def n_workers(self) -> int:
+        """Number of blocks stepped concurrently."""
+        return len(self.batches)
+
+    @property
+    def clock(self) -> int:
+        """Number of stream ticks consumed, equal in every block."""
+        return self.batches[0].clock
+
+    def step_n(self, n_ticks: int) -> None:
+        """Advances every market by ``n_ticks`` ticks and waits for all threads."""
+        self._map(lambda batch: batch.step_n(n_ticks))
+
+    def reset(self) -> None:
+        """Re-initializes every market as in JS M.reset."""
+        self._map(MarketBatch.reset)
+
+    def close(self) -> None:
+        """Stops the threads."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> Self:
+        """Returns the running markets."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Stops the threads."""
+        self.close()
+
+    def _map(self, function: Callable[[MarketBatch], None]) -> None:
+        """Applies ``function`` to every block and re-raises the first error."""
+        if self._executor is None:
+            for batch in self.batches:
+                function(batch)
+            return
+        for future in [
+            self._executor.submit(function, batch) for batch in self.batches
+        ]:
+            future.result()
@@ -0,0 +1,252 @@
+"""Holdings and profit of many players, M.buyGood and M.sellGood over arrays.
+
+A :class:`Portfolio` keeps the trading side of the stock market minigame for
+``(n_markets, n_goods)`` goods as struct-of-arrays: the units held, the price
+of the last purchase (``prev``), whether a good was bought or sold this tick
+(``last``), the bank and ``M.profit``. Orders for every market are applied by
+a few array operations per good, so backtests over a :class:`MarketBatch`
+scale to very many markets.
+
+Profit is tracked in dollars as ``M.profit`` does, and in cookies, which
+differ from dollars by ``Game.cookiesPsRawHighest`` at the time of each
+trade.
+"""
+
+from dataclasses import dataclass
+from typing import Self
+
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+
+from cookieLearner.market.batch import MarketBatch
+from cookieLearner.market.randomness import FloatArray
+from cookieLearner.market.trading import (
+    LAST_BOUGHT,
+    LAST_NONE,
+    LAST_SOLD,
+    broker_overhead,
+    buy_cost,
+    buy_quantity,
+    sell_quantity,
+)
+
+
+@dataclass
+class Portfolio:
+    """Trading state of many markets, updated in place.
+
+    Per-good fields have shape ``(n_markets, n_goods)``, per-market fields
+    ``(n_markets,)``. Orders are arrays of quantities of the same shape as
+    the goods, zero for no order and ``MAX_QUANTITY`` for as many as
+    possible; they take the current stock values in dollars.
+    """
+
+    # Units held per good, at most max_stock
+    stock: NDArray[np.int64]
+    # Value in dollars of the good at its last purchase, 0 if never bought
+    prev: FloatArray
+    # LAST_NONE, LAST_BOUGHT or LAST_SOLD since the last tick
+    last: NDArray[np.int8]
+    # Warehouse space per good, see good_max_stock
+    max_stock: NDArray[np.int64]
+    # Price multiplier of buying, see broker_overhead
+    overhead: FloatArray
+    # Game.cookiesPsRawHighest, the price of one dollar in cookies
+    cookies_ps_raw_highest: FloatArray
+    # Cookies in the bank
+    cookies: FloatArray
+    # M.profit, in dollars
+    profit: FloatArray
+    # Profit in cookies at the cookies_ps_raw_highest of every trade
+    profit_cookies: FloatArray
+
+    @classmethod
+    def empty(
+        cls,
+        n_markets: int,
+        n_goods: int,
+        max_stock: ArrayLike,
+        num_brokers: ArrayLike = 0,
+        cookies_ps_raw_highest: ArrayLike = 1.0,
+        cookies: ArrayLike = 0.0,
+    ) -> Self:
+        """Creates portfolios holding nothing.
+
+        Args:
+            n_markets: Number of markets.
+            n_goods: Number of goods per market.
+            max_stock: Warehouse space, broadcastable to ``(n_markets, n_goods)``.
+            num_brokers: Brokers per market.
+            cookies_ps_raw_highest: Highest raw CpS of the run per market.
+            cookies: Cookies in the bank per market.
+
+        Returns:
+            Portfolio: Empty warehouses with no profit.
+
+        """
+        shape = (n_markets, n_goods)
+
+        def per_market(values: ArrayLike) -> FloatArray:
+            return np.broadcast_to(
+                np.asarray(values, dtype=np.float64),
+                (n_markets,),
+            ).copy()
+
+        return cls(
+            stock=np.zeros(shape, dtype=np.int64),
+            prev=np.zeros(shape, dtype=np.float64),
+            last=np.zeros(shape, dtype=np.int8),
+            max_stock=np.broadcast_to(
+                np.asarray(max_stock, dtype=np.int64),
+                shape,
+            ).copy(),
+            overhead=per_market(broker_overhead(num_brokers)),
+            cookies_ps_raw_highest=per_market(cookies_ps_raw_highest),
+            cookies=per_market(cookies),
+            profit=np.zeros(n_markets, dtype=np.float64),
+            profit_cookies=np.zeros(n_markets, dtype=np.float64),
+        )
+
+    @classmethod
+    def for_batch(
+        cls,
+        batch: MarketBatch,
+        max_stock: ArrayLike,
+        cookies_ps_raw_highest: ArrayLike = 1.0,
+        cookies: ArrayLike = 0.0,
+    ) -> Self:
+        """Creates empty portfolios trading the markets of ``batch``."""
+        return cls.empty(
+            batch.n_markets,
+            batch.n_goods,
+            max_stock,
+            num_brokers=batch.num_brokers,
+            cookies_ps_raw_highest=cookies_ps_raw_highest,
+            cookies=cookies,
+        )
+
+    @property
+    def n_markets(self) -> int:
+        """Number of markets."""
+        return self.stock.shape[0]
+
+    @property
+    def n_goods(self) -> int:
+        """Number of goods per market."""
+        return self.stock.shape[1]
+
+    @property
+    def bank(self) -> FloatArray:
+        """Cookies in the bank per market, in dollars."""
+        return self.cookies / self.cookies_ps_raw_highest
+
+    def holdings_value(self, stock_values: FloatArray) -> FloatArray:
+        """Value of the units held per market, in dollars."""
+        return np.einsum("ij,ij->i", self.stock, stock_values)
+
+    def net_worth(self, stock_values: FloatArray) -> FloatArray:
+        """Bank plus the value of the units held per market, in dollars."""
+        return self.bank + self.holdings_value(stock_values)
+
+    def trade(self, stock_values: FloatArray, action: ArrayLike) -> None:
+        """Applies signed orders: all sells first, then the buys by ``stock_id``.
+
+        Positive quantities buy, negative ones sell and ``-MAX_QUANTITY``
+        sells everything.
+        """
+        action = np.asarray(action, dtype=np.int64)
+        self.sell(stock_values, np.maximum(-action, 0))
+        self.buy(stock_values, np.maximum(action, 0))
+
+    def sell(self, stock_values: FloatArray, quantity: ArrayLike) -> NDArray[np.bool_]:
+        """Sells units as JS M.sellGood does.
+
+        An order is capped by the units held and fails if the good was bought
+        this tick. Sells do not depend on the bank, so all goods are sold at
+        once.
+
+        Returns:
+            NDArray: Whether any units of each good were sold.
+
+        """
+        quantity = sell_quantity(
+            np.asarray(quantity, dtype=np.int64),
+            self.stock,
+            self.last,
+        )
+        sold = quantity > 0
+
+        proceeds = np.einsum("ij,ij->i", stock_values, quantity)
+        self.profit += proceeds
+        proceeds *= self.cookies_ps_raw_highest
+        self.profit_cookies += proceeds
+        self.cookies += proceeds
+        self.stock -= quantity
+        self.last[sold] = LAST_SOLD
+        return sold
+
+    def buy(self, stock_values: FloatArray, quantity: ArrayLike) -> NDArray[np.bool_]:
+        """Buys units as JS M.buyGood does.
+
+        An order is capped by the free warehouse space and fails as a whole if
+        it is not affordable or the good was sold this tick. Goods are bought
+        in ``stock_id`` order, since earlier purchases drain the bank.
+
+        Returns:
+            NDArray: Whether any units of each good were bought.
+
+        """
+        quantity = np.asarray(quantity, dtype=np.int64)
+        bought = np.zeros(self.stock.shape, dtype=np.bool_)
+        for stock_id in np.flatnonzero((quantity > 0).any(axis=0)):
+            bought[:, stock_id] = self._buy_good(
+                stock_id,
+                stock_values[:, stock_id],
+                quantity[:, stock_id],
+            )
+        return bought
+
+    def _buy_good(
+        self,
+        stock_id: int,
+        stock_values: FloatArray,
+        quantity: NDArray[np.int64],
+    ) -> NDArray[np.bool_]:
+        """Buys one good in every market, see :meth:`buy`."""
+        cost = buy_cost(stock_values, self.cookies_ps_raw_highest, self.overhead)
+        quantity = buy_quantity(
+            quantity,
+            cost,
+            self.cookies,
+            self.max_stock[:, stock_id] - self.stock[:, stock_id],
+            self.last[:, stock_id],
+        )
+        bought = quantity > 0
+
+        self.profit -= stock_values * self.overhead * quantity
+        spent = cost * quantity
+        self.profit_cookies -= spent
+        self.cookies -= spent
+        self.stock[:, stock_id] += quantity
+        self.last[bought, stock_id] = LAST_BOUGHT
+        self.prev[bought, stock_id] = stock_values[bought]
+        return bought
+
+    def new_tick(self) -> None:
+        """Clears ``last`` as M.tick does, allowing every trade again."""
+        self.last[...] = LAST_NONE
+
+    def reset(self, markets: ArrayLike, cookies: ArrayLike = 0.0) -> None:
+        """Empties the warehouses and ledgers of the given markets.
+
+        Args:
+            markets: Indices or mask of the markets to reset.
+            cookies: New bank of the reset markets.
+
+        """
+        self.stock[markets] = 0
+        self.prev[markets] = 0.0
+        self.last[markets] = LAST_NONE
+        self.cookies[markets] = cookies
+        self.profit[markets] = 0.0
+        self.profit_cookies[markets] = 0.0
@@ -0,0 +1,433 @@
+"""Precomputed distributions of good values.
+
+:func:`build_price_tables` simulates long, burned-in runs of the batched
+engine for every bank level and dragon boost bucket of a grid and tabulates
+the distribution of ``stock_value / resting_stock_value(stock_id,
+bank_level)`` per good, bank level, bucket and mode, plus the marginal over
+modes at mode index :data:`ALL_MODES`. The resulting :class:`PriceTables`
+answers quantile and CDF queries by indexing and linear interpolation, in
+constant time per query, so strategies can evaluate buy and sell thresholds
+every tick without simulating.
+
+Build and save tables from the command line with::
+
+    uv run python -m cookieLearner.market.price_tables --output tables.npz
+"""
+
+import argparse
+import json
+import sys
+from dataclasses import asdict, dataclass
+from itertools import product
+from pathlib import Path
+from typing import Self
+
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+
+from cookieLearner.market.batch import MarketBatch
+from cookieLearner.market.feed import stream
+from cookieLearner.market.market import (
+    DEFAULT_CONFIG,
+    NUM_GOODS,
+    Config,
+    GameEnvironment,
+    Mode,
+    resting_stock_value,
+)
+from cookieLearner.market.randomness import FloatArray
+
+N_MODES = len(Mode)
+# Mode index of the distribution over all modes
+ALL_MODES = N_MODES
+# Resolution and range of the histograms accumulated while simulating, in
+# multiples of the resting value; larger ratios fall into the last bin
+RATIO_STEP = 0.005
+MAX_RATIO = 25.0
+# Dragon boosts come in steps of 0.1 in game: 0, 0.1 with Reality Bending, 1
+# with Supreme Intellect and 1.1 with both
+DRAGON_BOOST_STEP = 0.1
+N_DRAGON_BOOSTS = 12
+# Bumped whenever the layout of saved tables changes
+TABLES_VERSION = 1
+
+
+@dataclass(frozen=True, slots=True)
+class PriceTables:
+    """Value distributions indexed by ``(stock_id, bank_level, dragon_boost, mode)``.
+
+    Values are stored relative to the resting value of the good. Bank levels
+    cover ``first_bank_level, first_bank_level + 1, ...`` and dragon boosts
+    the buckets ``0, dragon_boost_step, 2 * dragon_boost_step, ...``; queries
+    outside the grid use the nearest bank level and bucket. The mode axis
+    holds the six modes followed by :data:`ALL_MODES`.
+    """
+
+    config: Config
+    first_bank_level: int
+    dragon_boost_step: float
+    # Ratio at evenly spaced levels from 0 to 1, shape (..., n_quantiles)
+    quantiles: FloatArray
+    # CDF of the ratio at cdf_low + k * cdf_step, shape (..., cdf_points)
+    cdf: FloatArray
+    cdf_low: FloatArray
+    cdf_step: FloatArray
+    # Simulated good-ticks behind every distribution
+    counts: NDArray[np.int64]
+
+    @property
+    def n_goods(self) -> int:
+        """Number of tabulated goods."""
+        return self.quantiles.shape[0]
+
+    @property
+    def bank_levels(self) -> range:
+        """Tabulated bank levels."""
+        return range(
+            self.first_bank_level,
+            self.first_bank_level + self.quantiles.shape[1],
+        )
+
+    @property
+    def dragon_boosts(self) -> FloatArray:
+        """Dragon boost of every bucket."""
+        return np.arange(self.quantiles.shape[2]) * self.dragon_boost_step
+
+    def quantile(
+        self,
+        q: ArrayLike,
+        stock_id: ArrayLike,
+        bank_level: ArrayLike,
+        dragon_boost: ArrayLike = 0.0,
+        mode: ArrayLike = ALL_MODES,
+    ) -> FloatArray:
+        """Returns the value below which a good is a fraction ``q`` of the time.
+
+        Arguments broadcast against each other, e.g. ``stock_id=np.arange(18)``
+        queries every good at once.
+
+        Returns:
+            FloatArray: Stock values in dollars, NaN for cells never simulated.
+
+        """
+        cell = self._cell(stock_id, bank_level, dragon_boost, mode)
+        size = self.quantiles.shape[-1]
+        position = _clip(np.asarray(q, dtype=np.float64), 0, 1) * (size - 1)
+        ratio = _interpolate(self.quantiles, cell, position)
+        return ratio * self._resting(stock_id, bank_level)
+
+    def cdf_at(
+        self,
+        value: ArrayLike,
+        stock_id: ArrayLike,
+        bank_level: ArrayLike,
+        dragon_boost: ArrayLike = 0.0,
+        mode: ArrayLike = ALL_MODES,
+    ) -> FloatArray:
+        """Returns the fraction of the time a good is worth at most ``value``.
+
+        Arguments broadcast against each other as in :meth:`quantile`.
+
+        Returns:
+            FloatArray: Probabilities, NaN for cells never simulated.
+
+        """
+        cell = self._cell(stock_id, bank_level, dragon_boost, mode)
+        resting = self._resting(stock_id, bank_level)
+        ratio = np.asarray(value, dtype=np.float64) / resting
+        position = (ratio - self.cdf_low[cell]) / self.cdf_step[cell]
+        return _interpolate(self.cdf, cell, position)
+
+    def _resting(self, stock_id: ArrayLike, bank_level: ArrayLike) -> FloatArray:
+        """Resting values of the given goods at their actual bank levels."""
+        return resting_stock_value(
+            np.asarray(stock_id),
+            np.asarray(bank_level),
+            self.config,
+        )
+
+    def _cell(
+        self,
+        stock_id: ArrayLike,
+        bank_level: ArrayLike,
+        dragon_boost: ArrayLike,
+        mode: ArrayLike,
+    ) -> tuple[NDArray[np.intp], ...]:
+        """Index of the distributions of the given goods and environments."""
+        _, n_bank_levels, n_dragon_boosts, _ = self.counts.shape
+        bank = _clip(
+            np.asarray(bank_level, dtype=np.intp) - self.first_bank_level,
+            0,
+            n_bank_levels - 1,
+        )
+        bucket = _clip(
+            np.rint(np.asarray(dragon_boost) / self.dragon_boost_step).astype(np.intp),
+            0,
+            n_dragon_boosts - 1,
+        )
+        # Fancy indexing broadcasts the indices against each other
+        return (
+            np.asarray(stock_id, dtype=np.intp),
+            bank,
+            bucket,
+            np.asarray(mode, dtype=np.intp),
+        )
+
+    def save(self, path: str | Path) -> None:
+        """Writes the tables to an ``.npz`` file."""
+        header = {
+            "version": TABLES_VERSION,
+            "config": asdict(self.config),
+            "first_bank_level": self.first_bank_level,
+            "dragon_boost_step": self.dragon_boost_step,
+        }
+        np.savez_compressed(
+            path,
+            header=np.array(json.dumps(header)),
+            quantiles=self.quantiles,
+            cdf=self.cdf,
+            cdf_low=self.cdf_low,
+            cdf_step=self.cdf_step,
+            counts=self.counts,
+        )
+
+    @classmethod
+    def load(cls, path: str | Path) -> Self:
+        """Reads tables written by :meth:`save`.
+
+        Raises:
+            ValueError: If the tables were written by an unknown version.
+
+        """
+        with np.load(path) as data:
+            header = json.loads(str(data["header"]))
+            if header["version"] != TABLES_VERSION:
+                msg = f"Unsupported price tables version {header['version']}."
+                raise ValueError(msg)
+            return cls(
+                config=Config(**header["config"]),
+                first_bank_level=header["first_bank_level"],
+                dragon_boost_step=header["dragon_boost_step"],
+                quantiles=data["quantiles"],
+                cdf=data["cdf"],
+                cdf_low=data["cdf_low"],
+                cdf_step=data["cdf_step"],
+                counts=data["counts"],
+            )
+
+
+def build_price_tables(
+    min_bank_level: int = 1,
+    max_bank_level: int = 10,
+    dragon_boost_step: float = DRAGON_BOOST_STEP,
+    n_dragon_boosts: int = N_DRAGON_BOOSTS,
+    n_markets: int = 64,
+    n_ticks: int = 4000,
+    burn_in: int = 1000,
+    n_goods: int = NUM_GOODS,
+    config: Config = DEFAULT_CONFIG,
+    seed: int | None = None,
+    n_quantiles: int = 101,
+    cdf_points: int = 256,
+) -> PriceTables:
+    """Simulates every environment of a grid and tabulates the good values.
+
+    Every pair of bank level and dragon boost bucket is simulated as its own
+    :class:`MarketBatch` of ``n_markets`` markets, so memory stays bounded
+    however fine the grid.
+
+    Args:
+        min_bank_level: Lowest tabulated bank level.
+        max_bank_level: Highest tabulated bank level.
+        dragon_boost_step: Width of a dragon boost bucket.
+        n_dragon_boosts: Number of dragon boost buckets, starting at zero.
+        n_markets: Markets simulated per environment.
+        n_ticks: Ticks sampled per market after the burn-in.
+        burn_in: Ticks run after M.reset before sampling.
+        n_goods: Number of goods per market.
+        config: Simulation parameters.
+        seed: Seed of the simulations.
+        n_quantiles: Number of evenly spaced quantile levels from 0 to 1.
+        cdf_points: Number of points of every CDF table.
+
+    Returns:
+        PriceTables: Tables with one distribution per good, bank level,
+            bucket and mode.
+
+    """
+    bank_levels = range(min_bank_level, max_bank_level + 1)
+    shape = (n_goods, len(bank_levels), n_dragon_boosts, N_MODES + 1)
+    quantiles = np.full((*shape, n_quantiles), np.nan)
+    cdf = np.full((*shape, cdf_points), np.nan)
+    cdf_low = np.zeros(shape)
+    cdf_step = np.ones(shape)
+    counts = np.zeros(shape, dtype=np.int64)
+
+    n_bins = int(MAX_RATIO / RATIO_STEP)
+    edges = np.arange(n_bins + 1) * RATIO_STEP
+    levels = np.linspace(0, 1, n_quantiles)
+    seeds = np.random.SeedSequence(seed).spawn(len(bank_levels) * n_dragon_boosts)
+
+    for (bank, bank_level), bucket in product(
+        enumerate(bank_levels),
+        range(n_dragon_boosts),
+    ):
+        histograms = _simulate_histograms(
+            GameEnvironment(
+                bank_level=bank_level,
+                num_brokers=0,
+                dragon_boost=bucket * dragon_boost_step,
+            ),
+            n_markets,
+            n_ticks,
+            burn_in,
+            n_goods,
+            config,
+            seeds[bank * n_dragon_boosts + bucket],
+            n_bins,
+        )
+        histograms = np.concatenate(
+            [histograms, histograms.sum(axis=1, keepdims=True)],
+            axis=1,
+        )
+        for stock_id, mode in np.ndindex(histograms.shape[:2]):
+            histogram = histograms[stock_id, mode]
+            total = histogram.sum()
+            if total == 0:
+                continue
+            cell = (stock_id, bank, bucket, mode)
+            counts[cell] = total
+            # Piecewise linear CDF through the bin edges
+            cumulative = np.concatenate([[0.0], np.cumsum(histogram) / total])
+            quantiles[cell] = _invert_cdf(cumulative, edges, levels)
+            low, high = quantiles[cell][[0, -1]]
+            cdf_low[cell] = low
+            cdf_step[cell] = max(high - low, RATIO_STEP) / (cdf_points - 1)
+            cdf[cell] = np.interp(
+                low + np.arange(cdf_points) * cdf_step[cell],
+                edges,
+                cumulative,
+            )
+
+    return PriceTables(
+        config=config,
+        first_bank_level=min_bank_level,
+        dragon_boost_step=dragon_boost_step,
+        quantiles=quantiles,
+        cdf=cdf,
+        cdf_low=cdf_low,
+        cdf_step=cdf_step,
+        counts=counts,
+    )
+
+
+def _simulate_histograms(
+    environment: GameEnvironment,
+    n_markets: int,
+    n_ticks: int,
+    burn_in: int,
+    n_goods: int,
+    config: Config,
+    seed: np.random.SeedSequence,
+    n_bins: int,
+) -> NDArray[np.int64]:
+    """Counts of the ratio bins per good and mode, shape ``(n_goods, N_MODES, n_bins)``."""
+    batch = MarketBatch(
+        [environment] * n_markets,
+        n_goods=n_goods,
+        config=config,
+        rng=np.random.default_rng(seed),
+        history_depth=None,
+    )
+    batch.step_n(burn_in)
+
+    resting = batch.compiled.resting_stock_values
+    # Histogram cell of every good and mode, offset by the ratio bin below
+    cells = (np.arange(n_goods) * N_MODES)[:, np.newaxis] + np.arange(N_MODES)
+    histograms = np.zeros(n_goods * N_MODES * n_bins, dtype=np.int64)
+    for chunk in stream(batch, n_ticks=n_ticks):
+        bins = np.minimum(
+            (chunk.stock_values / resting / RATIO_STEP).astype(np.intp),
+            n_bins - 1,
+        )
+        goods = np.broadcast_to(np.arange(n_goods), bins.shape)
+        histograms += np.bincount(
+            (cells[goods, chunk.stock_modes] * n_bins + bins).ravel(),
+            minlength=histograms.size,
+        )
+    return histograms.reshape(n_goods, N_MODES, n_bins)
+
+
+def _invert_cdf(
+    cumulative: FloatArray,
+    edges: FloatArray,
+    levels: FloatArray,
+) -> FloatArray:
+    """Quantiles of a piecewise linear CDF given at ``edges``.
+
+    Level 0 maps to the lower edge of the first occupied bin and level 1 to
+    the upper edge of the last one.
+    """
+    first = np.flatnonzero(cumulative > 0)[0] - 1
+    last = np.flatnonzero(cumulative < 1)[-1] + 1
+    # First edge reaching every level, its bin being the one that crosses it
+    upper = _clip(
+        np.searchsorted(cumulative, levels, side="left"),
+        first + 1,
+        last,
+    )
+    below = cumulative[upper - 1]
+    fraction = (levels - below) / (cumulative[upper] - below)
+    return edges[upper - 1] + _clip(fraction, 0, 1) * RATIO_STEP
+
+
+def _clip(values: ArrayLike, low: float, high: float) -> NDArray:
+    """``np.clip`` without its dispatch overhead, which dominates small queries."""
+    return np.minimum(np.maximum(values, low), high)
+
+
+def _interpolate(
+    table: FloatArray,
+    cell: tuple[NDArray[np.intp], ...],
+    position: ArrayLike,
+) -> FloatArray:
+    """Linearly interpolates the last axis of ``table[cell]`` at fractional indices."""
+    size = table.shape[-1]
+    position = _clip(position, 0, size - 1)
+    index = np.minimum(position.astype(np.intp), size - 2)
+    below = table[(*cell, index)]
+    above = table[(*cell, index + 1)]
+    return below + (position - index) * (above - below)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Builds price tables and saves them, returning the exit code."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", type=Path, required=True)
+    parser.add_argument("--min-bank-level", type=int, default=1)
+    parser.add_argument("--max-bank-level", type=int, default=10)
+    parser.add_argument("--dragon-boost-step", type=float, default=DRAGON_BOOST_STEP)
+    parser.add_argument("--dragon-boosts", type=int, default=N_DRAGON_BOOSTS)
+    parser.add_argument("--markets", type=int, default=64)
+    parser.add_argument("--ticks", type=int, default=4000)
+    parser.add_argument("--burn-in", type=int, default=1000)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    tables = build_price_tables(
+        min_bank_level=args.min_bank_level,
+        max_bank_level=args.max_bank_level,
+        dragon_boost_step=args.dragon_boost_step,
+        n_dragon_boosts=args.dragon_boosts,
+        n_markets=args.markets,
+        n_ticks=args.ticks,
+        burn_in=args.burn_in,
+        seed=args.seed,
+    )
+    tables.save(args.output)
+    print(f"{int(tables.counts[..., ALL_MODES].sum())} good-ticks -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
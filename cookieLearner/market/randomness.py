@@ -0,0 +1,203 @@
+"""Sources of uniform random numbers for the tick helpers and engines.
+
+The scalar helpers in :mod:`cookieLearner.market.market` only need an object
+with a ``random()`` method, e.g. the ``random`` module. The engines draw whole
+arrays with ``random(size)`` or ``random(out=...)`` like
+``numpy.random.Generator``. :class:`UniformBlocks` serves both from large
+pre-drawn blocks, so a million scalar draws cost one call into NumPy.
+"""
+
+from operator import length_hint
+from typing import Any, Protocol
+
+import numpy as np
+from numpy.typing import NDArray
+
+type FloatArray = NDArray[np.float64]
+
+# Number of uniforms UniformBlocks draws at once
+DEFAULT_BLOCK_SIZE = 1 << 20
+# Number of uniforms UniformBlocks converts to Python floats at once
+SCALAR_CHUNK_SIZE = 1 << 12
+
+
+class UniformSource(Protocol):
+    """Draws uniforms on [0, 1) with the signature of ``Generator.random``."""
+
+    def random(
+        self,
+        size: int | tuple[int, ...] | None = None,
+        dtype: Any = np.float64,
+        out: FloatArray | None = None,
+    ) -> Any:
+        """Returns a float if ``size`` and ``out`` are omitted, else an array."""
+        ...
+
+
+class UniformBlocks:
+    """Hands out uniforms by index from pre-drawn blocks of a NumPy generator.
+
+    Scalar and array draws consume the same stream, so the sequence of values
+    only depends on the seed and the number of values taken, not on how they
+    were grouped into calls. Scalar draws are served by a C-level iterator over
+    ``SCALAR_CHUNK_SIZE`` values of the current block.
+    """
+
+    def __init__(
+        self,
+        seed: int | np.random.SeedSequence | None = None,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        bit_generator: type[np.random.BitGenerator] = np.random.PCG64,
+    ) -> None:
+        """Creates the source, drawing lazily on first use.
+
+        Args:
+            seed: Seed of the underlying bit generator, fresh entropy if omitted.
+            block_size: Number of uniforms drawn at once.
+            bit_generator: Bit generator class, e.g. ``PCG64`` or ``Philox``.
+
+        """
+        self.generator = np.random.Generator(bit_generator(seed))
+        self._block = np.empty(block_size, dtype=np.float64)
+        self._index = block_size
+        self._scalars = iter(())
+
+    @property
+    def block_size(self) -> int:
+        """Number of uniforms drawn at once."""
+        return self._block.shape[0]
+
+    def random(
+        self,
+        size: int | tuple[int, ...] | None = None,
+        dtype: Any = np.float64,
+        out: FloatArray | None = None,
+    ) -> Any:
+        """Takes the next uniforms, as a float or as an array of ``size``.
+
+        Args:
+            size: Shape of the returned array, a single float if omitted.
+            dtype: Only ``float64`` is supported.
+            out: Contiguous array to fill instead of allocating one.
+
+        Returns:
+            float | FloatArray: The uniforms.
+
+        """
+        if size is None and out is None:
+            try:
+                return next(self._scalars)
+            except StopIteration:
+                self._take_scalars()
+                return next(self._scalars)
+
+        if np.dtype(dtype) != np.float64:
+            msg = f"UniformBlocks only draws float64, not {np.dtype(dtype)}."
+            raise TypeError(msg)
+        if out is None:
+            out = np.empty(size, dtype=np.float64)
+        elif not out.flags.c_contiguous:
+            msg = "out must be C-contiguous."
+            raise ValueError(msg)
+
+        self._release_scalars()
+        self._fill(out.reshape(-1))
+        return out
+
+    def _take_scalars(self) -> None:
+        """Reserves the next chunk of the block for scalar draws."""
+        if self._index == self.block_size:
+            self._refill()
+        end = min(self._index + SCALAR_CHUNK_SIZE, self.block_size)
+        self._scalars = iter(self._block[self._index : end].tolist())
+        self._index = end
+
+    def _release_scalars(self) -> None:
+        """Hands the unused part of the scalar chunk back to the block."""
+        self._index -= length_hint(self._scalars)
+        self._scalars = iter(())
+
+    def _fill(self, flat: FloatArray) -> None:
+        """Copies the next ``len(flat)`` uniforms into ``flat``."""
+        filled = 0
+        total = flat.shape[0]
+        while filled < total:
+            if self._index == self.block_size:
+                self._refill()
+            n_values = min(total - filled, self.block_size - self._index)
+            flat[filled : filled + n_values] = self._block[
+                self._index : self._index + n_values
+            ]
+            self._index += n_values
+            filled += n_values
+
+    def _refill(self) -> None:
+        self.generator.random(out=self._block)
+        self._index = 0
+
+
+# Number of 64-bit words NumPy's Philox4x64 produces per counter value
+PHILOX_WORDS = 4
+# Third counter word of per-market and of per-good draws
+_PER_MARKET = 0
+_PER_GOOD = 1
+
+
+class CounterStreams:
+    """Counter-based uniforms addressed by ``(tick, market, good, slot)``.
+
+    Every uniform is a pure function of the root seed and its address, so any
+    shard of a batch can be regenerated on its own and results do not depend
+    on how markets are split across workers. The draws of one market in one
+    tick are read from NumPy's ``Philox`` bit generator started at the counter
+    ``(market * blocks, tick, kind, 0)``, where ``blocks`` counter values cover
+    all of its draws and ``kind`` tells per-market from per-good draws. A
+    contiguous range of market ids is therefore served by a single generator.
+    """
+
+    def __init__(self, seed: int) -> None:
+        self.seed = seed
+        self.key = np.random.SeedSequence(seed).generate_state(2, dtype=np.uint64)
+
+    def uniforms(
+        self,
+        tick: int,
+        market_ids: NDArray[np.integer],
+        n_draws: int,
+        n_goods: int | None = None,
+    ) -> FloatArray:
+        """Returns the uniforms of one tick.
+
+        Args:
+            tick: Tick whose draws are returned.
+            market_ids: Global ids of the markets.
+            n_draws: Number of draw slots per good, e.g. ``TICK_DRAWS``.
+            n_goods: Number of goods, ``None`` for per-market draws.
+
+        Returns:
+            FloatArray: Array of shape ``(n_draws, n_markets, n_goods)``, or
+                ``(n_draws, n_markets)`` for per-market draws.
+
+        """
+        market_ids = np.asarray(market_ids, dtype=np.int64).reshape(-1)
+        per_market = n_draws * (1 if n_goods is None else n_goods)
+        blocks = -(-per_market // PHILOX_WORDS)
+        kind = _PER_MARKET if n_goods is None else _PER_GOOD
+
+        draws = np.empty((market_ids.shape[0], blocks * PHILOX_WORDS))
+        breaks = np.flatnonzero(np.diff(market_ids) != 1) + 1
+        for start, stop in zip(
+            [0, *breaks.tolist()],
+            [*breaks.tolist(), market_ids.shape[0]],
+            strict=True,
+        ):
+            counter = [int(market_ids[start]) * blocks, tick, kind, 0]
+            generator = np.random.Generator(
+                np.random.Philox(key=self.key, counter=counter),
+            )
+            generator.random(out=draws[start:stop].reshape(-1))
+
+        draws = draws[:, :per_market]
+        if n_goods is None:
+            return draws.T
+        return draws.reshape(-1, n_draws, n_goods).transpose(1, 0, 2)
@@ -0,0 +1,293 @@
+"""Codec of the stock market save string, JS M.save and M.load.
+
+A save string reads::
+
+    officeLevel:brokers:graphLines:profit:graphCols: val*100:mode:d*100:dur:stock:hidden:last:prev*100!...! onMinigame
+
+with one ``!``-terminated record per good. :func:`decode_saves` parses many
+strings at once into a :class:`MarketSaves` of ``(n_saves,)`` and
+``(n_saves, n_goods)`` arrays, :func:`encode_saves` formats them back, and
+:meth:`MarketSaves.load_into` seeds a :class:`MarketBatch` with them.
+
+Well-formed saves are converted in bulk by NumPy; only saves with missing
+goods or fields, e.g. from versions with fewer goods, or with empty fields are
+parsed one good at a time with the defaults of M.load.
+"""
+
+import math
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Self
+
+import numpy as np
+from numpy.typing import NDArray
+
+from cookieLearner.market.batch import MarketBatch
+from cookieLearner.market.market import NUM_GOODS, Mode
+from cookieLearner.market.trading import MAX_OFFICE_LEVEL
+from cookieLearner.market.vectorized import DurationArray, FloatArray, ModeArray
+
+# Fields of a good record, in order
+GOOD_FIELDS = 8
+# Header values used by M.load for missing fields: officeLevel, brokers,
+# graphLines, profit and graphCols as left by a hard M.reset
+_HEADER_DEFAULTS = ("0", "0", "1", "0", "0")
+# JS writes numbers in this range of magnitudes positionally, others with an
+# exponent
+_JS_POSITIONAL_MIN = 1e-6
+_JS_POSITIONAL_MAX = 1e21
+
+
+@dataclass
+class MarketSaves:
+    """State of many saved markets as struct-of-arrays.
+
+    Per-market fields have shape ``(n_saves,)``, per-good fields
+    ``(n_saves, n_goods)``. ``loaded`` is ``False`` for goods missing from a
+    save, which M.load leaves untouched.
+    """
+
+    office_level: NDArray[np.int64]
+    brokers: NDArray[np.int64]
+    graph_lines: NDArray[np.int64]
+    profit: FloatArray
+    graph_cols: NDArray[np.int64]
+    on_minigame: NDArray[np.bool_]
+    stock_values: FloatArray
+    stock_modes: ModeArray
+    stock_deltas: FloatArray
+    remaining_mode_durations: DurationArray
+    stock: NDArray[np.int64]
+    hidden: NDArray[np.bool_]
+    last: NDArray[np.int8]
+    prev: FloatArray
+    loaded: NDArray[np.bool_]
+
+    @property
+    def n_saves(self) -> int:
+        """Number of saved markets."""
+        return self.stock_values.shape[0]
+
+    @classmethod
+    def from_batch(cls, batch: MarketBatch) -> Self:
+        """Captures the good state of ``batch``, with no holdings or offices.
+
+        ``stock``, ``last``, ``prev`` and ``profit`` are zero; set them from
+        the trading side, e.g. a ``VectorMarketEnv``, before encoding.
+        """
+        n_markets, n_goods = batch.stock_values.shape
+        return cls(
+            office_level=np.zeros(n_markets, dtype=np.int64),
+            brokers=batch.num_brokers.copy(),
+            graph_lines=np.ones(n_markets, dtype=np.int64),
+            profit=np.zeros(n_markets, dtype=np.float64),
+            graph_cols=np.zeros(n_markets, dtype=np.int64),
+            on_minigame=np.zeros(n_markets, dtype=np.bool_),
+            stock_values=batch.stock_values.copy(),
+            stock_modes=batch.stock_modes.copy(),
+            stock_deltas=batch.stock_deltas.copy(),
+            remaining_mode_durations=batch.remaining_mode_durations.copy(),
+            stock=np.zeros((n_markets, n_goods), dtype=np.int64),
+            hidden=np.zeros((n_markets, n_goods), dtype=np.bool_),
+            last=np.zeros((n_markets, n_goods), dtype=np.int8),
+            prev=np.zeros((n_markets, n_goods), dtype=np.float64),
+            loaded=np.ones((n_markets, n_goods), dtype=np.bool_),
+        )
+
+    def load_into(self, batch: MarketBatch) -> None:
+        """Overwrites the good state of ``batch`` as M.load does.
+
+        Goods missing from a save keep their state. The price history is
+        restarted from ``vals=[val, val-d]`` as in JS. ``bank_level`` and
+        ``dragon_boost`` are not part of a save and stay as they are.
+
+        Raises:
+            ValueError: If the number of saves or goods differs from the batch.
+
+        """
+        if self.stock_values.shape != batch.stock_values.shape:
+            msg = (
+                f"Cannot load saves of shape {self.stock_values.shape} into a "
+                f"batch of shape {batch.stock_values.shape}."
+            )
+            raise ValueError(msg)
+
+        for field in (
+            "stock_values",
+            "stock_deltas",
+            "stock_modes",
+            "remaining_mode_durations",
+        ):
+            np.copyto(getattr(batch, field), getattr(self, field), where=self.loaded)
+        batch.num_brokers[...] = self.brokers
+        if batch.history is not None:
+            batch.history.clear()
+            batch.history.push(batch.stock_values - batch.stock_deltas)
+            batch.history.push(batch.stock_values)
+
+
+def decode_saves(saves: Sequence[str], n_goods: int = NUM_GOODS) -> MarketSaves:
+    """Parses save strings of M.save.
+
+    Args:
+        saves: Save strings of the stock market minigame.
+        n_goods: Number of goods per market; extra records are ignored.
+
+    Returns:
+        MarketSaves: The state of every save.
+
+    Raises:
+        ValueError: If a field is not an integer or a mode code is unknown.
+
+    """
+    n_saves = len(saves)
+    headers = np.empty((n_saves, len(_HEADER_DEFAULTS)), dtype=np.float64)
+    on_minigame = np.zeros(n_saves, dtype=np.bool_)
+    records = np.zeros((n_saves, n_goods, GOOD_FIELDS), dtype=np.int64)
+    loaded = np.ones((n_saves, n_goods), dtype=np.bool_)
+
+    regular_rows = []
+    regular_goods = []
+    for row, save in enumerate(saves):
+        header, goods, on = [*save.split(" "), "", ""][:3]
+        fields = header.split(":")
+        headers[row] = [
+            float(fields[i] if i < len(fields) and fields[i] else default)
+            for i, default in enumerate(_HEADER_DEFAULTS)
+        ]
+        on_minigame[row] = int(on or 0) != 0
+
+        fields = goods[:-1].replace("!", ":")
+        if (
+            goods.count("!") == n_goods
+            and goods.count(":") == n_goods * (GOOD_FIELDS - 1)
+            and goods.endswith("!")
+            # Empty fields read as 0 in JS but stop the bulk parse
+            and "::" not in fields
+            and not fields.startswith(":")
+            and not fields.endswith(":")
+        ):
+            regular_rows.append(row)
+            regular_goods.append(fields)
+        else:
+            loaded[row] = _decode_goods(goods, records[row])
+
+    if regular_rows:
+        try:
+            # One C-level parse of all regular records
+            records[regular_rows] = np.fromstring(
+                ":".join(regular_goods),
+                dtype=np.int64,
+                sep=":",
+            ).reshape(len(regular_rows), n_goods, GOOD_FIELDS)
+        except ValueError:
+            # Some field is not a plain integer, find it save by save
+            for row in regular_rows:
+                loaded[row] = _decode_goods(saves[row].split(" ")[1], records[row])
+
+    unknown_modes = loaded & ((records[..., 1] < 0) | (records[..., 1] >= len(Mode)))
+    if unknown_modes.any():
+        row, good = np.argwhere(unknown_modes)[0]
+        msg = (
+            f"Save {row} has mode {records[row, good, 1]} for good {good}, "
+            f"expected 0 to {len(Mode) - 1}."
+        )
+        raise ValueError(msg)
+
+    return MarketSaves(
+        office_level=np.clip(headers[:, 0].astype(np.int64), 0, MAX_OFFICE_LEVEL),
+        brokers=headers[:, 1].astype(np.int64),
+        graph_lines=headers[:, 2].astype(np.int64),
+        profit=headers[:, 3].copy(),
+        graph_cols=headers[:, 4].astype(np.int64),
+        on_minigame=on_minigame,
+        stock_values=records[..., 0] / 100,
+        stock_modes=records[..., 1].astype(np.int8),
+        stock_deltas=records[..., 2] / 100,
+        remaining_mode_durations=records[..., 3].copy(),
+        stock=records[..., 4].copy(),
+        hidden=records[..., 5] != 0,
+        last=records[..., 6].astype(np.int8),
+        prev=records[..., 7] / 100,
+        loaded=loaded,
+    )
+
+
+def _decode_goods(goods: str, out: NDArray[np.int64]) -> NDArray[np.bool_]:
+    """Parses the good records of one save into ``out`` one by one.
+
+    Missing trailing fields are zero, as ``parseInt(itData[i]||0)`` in JS.
+
+    Returns:
+        NDArray: Whether each good had a record.
+
+    """
+    loaded = np.zeros(out.shape[0], dtype=np.bool_)
+    for index, record in enumerate(goods.split("!")[: out.shape[0]]):
+        if not record:
+            continue
+        fields = record.split(":")[:GOOD_FIELDS]
+        out[index, : len(fields)] = [int(field or 0) for field in fields]
+        loaded[index] = True
+    return loaded
+
+
+def encode_saves(saves: MarketSaves) -> list[str]:
+    """Formats every market of ``saves`` as M.save does.
+
+    Like ``parseInt(it.val*100)`` in JS, hundredths are truncated, so a
+    decoded value such as ``21.41`` may be written back as ``2140``.
+
+    Returns:
+        list[str]: One save string per market.
+
+    """
+    records = np.stack(
+        [
+            # parseInt truncates toward zero
+            np.trunc(saves.stock_values * 100),
+            saves.stock_modes,
+            np.trunc(saves.stock_deltas * 100),
+            saves.remaining_mode_durations,
+            saves.stock,
+            saves.hidden,
+            saves.last,
+            np.trunc(saves.prev * 100),
+        ],
+        axis=-1,
+    ).astype(np.int64)
+    n_goods = records.shape[1]
+    goods_format = ":".join(["%d"] * GOOD_FIELDS) + "!"
+    save_format = "%d:%d:%d:%s:%d: " + goods_format * n_goods + " %d"
+
+    headers = zip(
+        saves.office_level.tolist(),
+        saves.brokers.tolist(),
+        saves.graph_lines.tolist(),
+        [_js_number(profit) for profit in saves.profit.tolist()],
+        saves.graph_cols.tolist(),
+        strict=True,
+    )
+    return [
+        save_format % (*header, *goods, on_minigame)
+        for header, goods, on_minigame in zip(
+            headers,
+            records.reshape(records.shape[0], -1).tolist(),
+            saves.on_minigame.astype(np.int64).tolist(),
+            strict=True,
+        )
+    ]
+
+
+def _js_number(value: float) -> str:
+    """Formats a float as JS ``String(number)`` does."""
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "Infinity" if value > 0 else "-Infinity"
+    if value.is_integer() and abs(value) < _JS_POSITIONAL_MAX:
+        return str(int(value))
+    if _JS_POSITIONAL_MIN <= abs(value) < _JS_POSITIONAL_MAX:
+        return np.format_float_positional(value, unique=True, trim="-")
+    mantissa, exponent = repr(value).split("e")
+    return f"{mantissa}e{int(exponent):+d}"
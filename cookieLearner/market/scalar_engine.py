@@ -0,0 +1,232 @@
+"""Tick of a single market over Python lists, for :class:`Market`.
+
+A vectorized tick pays a fixed cost per NumPy call whatever the number of
+goods, which dominates for the 18 goods of one market. :func:`tick_goods`
+instead loops over the goods in Python, as :class:`MarketEnv` does with the
+scalar :func:`tick`, but reads the same ``TICK_DRAWS`` slots of the same
+uniforms as :func:`cookieLearner.market.vectorized.tick_batch`. Both return
+bitwise identical states for the same draws, so a :class:`Market` still
+evolves like its row of a :class:`MarketBatch`.
+"""
+
+from cookieLearner.market.compiled import CompiledConfig
+from cookieLearner.market.market import (
+    MODE_DELTA_DECAY,
+    MODE_DELTA_OFFSET,
+    MODE_DELTA_SCALE,
+    MODE_VALUE_KICK,
+    WEIGHTED_MODES,
+    Mode,
+)
+from cookieLearner.market.vectorized import (
+    DRAW_EXPIRY_CHOICE,
+    DRAW_EXPIRY_DRAGON_CHAOTIC,
+    DRAW_EXPIRY_DRAGON_GATE,
+    DRAW_EXPIRY_DURATION,
+    DRAW_EXPIRY_FAST_CHAOTIC,
+    DRAW_FAST_FALL_DELTA,
+    DRAW_FAST_FALL_GATE,
+    DRAW_FAST_FALL_VALUE,
+    DRAW_FAST_PRIMARY_DELTA,
+    DRAW_FAST_PRIMARY_GATE,
+    DRAW_FAST_PRIMARY_VALUE,
+    DRAW_FAST_SECONDARY_GATE,
+    DRAW_FLUCTUATION_DELTA,
+    DRAW_FLUCTUATION_PRIMARY,
+    DRAW_FLUCTUATION_PRIMARY_GATE,
+    DRAW_FLUCTUATION_SECONDARY,
+    DRAW_FLUCTUATION_SECONDARY_GATE,
+    DRAW_FLUCTUATION_TERTIARY,
+    DRAW_FLUCTUATION_TERTIARY_GATE,
+    DRAW_FLUCTUATION_VALUE,
+    DRAW_INSTANT_DELTA,
+    DRAW_INSTANT_GATE,
+    DRAW_INSTANT_VALUE_PRIMARY,
+    DRAW_INSTANT_VALUE_SECONDARY,
+    DRAW_MODE_DELTA,
+    DRAW_MODE_VALUE,
+)
+
+_CHAOTIC = int(Mode.CHAOTIC)
+_FAST_RISE = int(Mode.FAST_RISE)
+_FAST_FALL = int(Mode.FAST_FALL)
+_MODE_CHOICES = tuple(int(mode) for mode in WEIGHTED_MODES)
+
+
+def tick_goods(  # noqa: C901, PLR0912, PLR0915
+    stock_values: list[float],
+    stock_deltas: list[float],
+    stock_modes: list[int],
+    remaining_mode_durations: list[int],
+    global_delta: float,
+    instant_mode_change_probability: float,
+    compiled: CompiledConfig,
+    uniforms: memoryview,
+) -> None:
+    """Advances the goods of one market in place by one tick.
+
+    Every expression is written in the same order as in
+    :mod:`cookieLearner.market.vectorized`, so the floating-point results match
+    bit for bit.
+
+    Args:
+        stock_values: Stock value per good.
+        stock_deltas: Stock delta per good.
+        stock_modes: Mode code per good.
+        remaining_mode_durations: Ticks left in the current mode per good.
+        global_delta: Global delta drawn for this tick, zero if none.
+        instant_mode_change_probability: Chance of an instant mode change.
+        compiled: Simulation parameters compiled for a single market.
+        uniforms: Uniforms of shape ``(TICK_DRAWS, n_goods)``, a memoryview
+            of a C-contiguous array, so that a draw is read as a Python float
+            only if its branch needs it.
+
+    """
+    resting_stock_values = compiled.resting_stock_values.tolist()
+    delta_drift = compiled.delta_drift
+    dragon_boost = compiled.dragon_boost
+    fluctuation_probability_primary = compiled.fluctuation_probability_primary
+    fluctuation_range_primary = compiled.fluctuation_range_primary
+    fluctuation_probability_secondary = compiled.fluctuation_probability_secondary
+    fluctuation_range_secondary = compiled.fluctuation_range_secondary
+    fluctuation_probability_tertiary = compiled.fluctuation_probability_tertiary
+    fluctuation_range_tertiary = compiled.fluctuation_range_tertiary
+    chaotic_probability_primary = compiled.fast_mode_tick_chaotic_probability_primary
+    chaotic_probability_secondary = (
+        compiled.fast_mode_tick_chaotic_probability_secondary
+    )
+    chaotic_delta_range = compiled.chaotic_delta_range
+    fast_rise_probability = compiled.fast_mode_tick_fast_rise_probability
+    fast_rise_to_fast_fall_probability = (
+        compiled.fast_mode_tick_fast_rise_to_fast_fall_probability
+    )
+    fast_fall_probability = compiled.fast_mode_tick_fast_fall_probability
+    high_threshold = compiled.high_stock_value_threshold
+    high_dampening = compiled.high_stock_value_dampening
+    low_threshold = compiled.low_stock_value_threshold
+    low_dampening = compiled.low_stock_value_delta_dampening
+    min_stock_value = compiled.min_stock_value
+
+    for good in range(len(stock_values)):
+        value = stock_values[good]
+        delta = stock_deltas[good] * 0.97 + delta_drift
+        mode = stock_modes[good]
+        duration = remaining_mode_durations[good]
+
+        # _apply_mode_tick
+        delta = delta * MODE_DELTA_DECAY[mode] + MODE_DELTA_SCALE[mode] * (
+            uniforms[DRAW_MODE_DELTA, good] - MODE_DELTA_OFFSET[mode]
+        )
+        value = value + MODE_VALUE_KICK[mode] * uniforms[DRAW_MODE_VALUE, good]
+        value = value + (resting_stock_values[good] - value) * 0.01
+
+        # _maybe_instant_mode_change
+        if (
+            global_delta != 0
+            and uniforms[DRAW_INSTANT_GATE, good] < instant_mode_change_probability
+        ):
+            primary = uniforms[DRAW_INSTANT_VALUE_PRIMARY, good]
+            secondary = uniforms[DRAW_INSTANT_VALUE_SECONDARY, good]
+            value = (
+                value - (1 + delta * (primary * primary * primary) * 7) * global_delta
+            )
+            value -= global_delta * (1 + secondary * secondary * secondary * 7)
+            delta = delta + global_delta * (1 + uniforms[DRAW_INSTANT_DELTA, good] * 4)
+            duration = 0
+
+        # _apply_fluctuations
+        fluctuation = uniforms[DRAW_FLUCTUATION_VALUE, good] - 0.5
+        value = value + fluctuation * fluctuation * 3
+        delta = delta + 0.1 * (uniforms[DRAW_FLUCTUATION_DELTA, good] - 0.5)
+        if (
+            uniforms[DRAW_FLUCTUATION_PRIMARY_GATE, good]
+            < fluctuation_probability_primary
+        ):
+            value = (
+                value
+                + (uniforms[DRAW_FLUCTUATION_PRIMARY, good] - 0.5)
+                * fluctuation_range_primary
+            )
+        if (
+            uniforms[DRAW_FLUCTUATION_SECONDARY_GATE, good]
+            < fluctuation_probability_secondary
+        ):
+            value = (
+                value
+                + (uniforms[DRAW_FLUCTUATION_SECONDARY, good] - 0.5)
+                * fluctuation_range_secondary
+            )
+        if (
+            uniforms[DRAW_FLUCTUATION_TERTIARY_GATE, good]
+            < fluctuation_probability_tertiary
+        ):
+            delta = (
+                delta
+                + (uniforms[DRAW_FLUCTUATION_TERTIARY, good] - 0.5)
+                * fluctuation_range_tertiary
+            )
+
+        # _apply_fast_mode_tick, Chaotic overwrites the delta and Fast Rise
+        # may turn into Fast Fall within the same tick
+        if mode == _CHAOTIC:
+            if uniforms[DRAW_FAST_PRIMARY_GATE, good] < chaotic_probability_primary:
+                value = value + (uniforms[DRAW_FAST_PRIMARY_VALUE, good] - 0.5) * 10
+            if uniforms[DRAW_FAST_SECONDARY_GATE, good] < chaotic_probability_secondary:
+                delta = (
+                    uniforms[DRAW_FAST_PRIMARY_DELTA, good] - 0.5
+                ) * chaotic_delta_range
+        elif mode == _FAST_RISE:
+            if uniforms[DRAW_FAST_PRIMARY_GATE, good] < fast_rise_probability:
+                delta = delta + (uniforms[DRAW_FAST_PRIMARY_DELTA, good] - 0.5) * 0.1
+                value = value + (uniforms[DRAW_FAST_PRIMARY_VALUE, good] - 0.7) * 10
+            if (
+                uniforms[DRAW_FAST_SECONDARY_GATE, good]
+                < fast_rise_to_fast_fall_probability
+            ):
+                mode = _FAST_FALL
+        if (
+            mode == _FAST_FALL
+            and uniforms[DRAW_FAST_FALL_GATE, good] < fast_fall_probability
+        ):
+            delta = delta + (uniforms[DRAW_FAST_FALL_DELTA, good] - 0.5) * 0.1
+            value = value + (uniforms[DRAW_FAST_FALL_VALUE, good] - 0.3) * 10
+
+        # _apply_high_stock_value_dampening
+        if value > high_threshold and delta > 0:
+            delta = delta * high_dampening
+
+        value = value + delta
+
+        # _apply_low_stock_value_dampening
+        if value < low_threshold:
+            value = value + (low_threshold - value) * 0.5
+        if value < low_threshold and delta < 0:
+            delta = delta * low_dampening
+        value = max(value, min_stock_value)
+
+        # _update_expired_mode
+        duration -= 1
+        if duration <= 0:
+            duration = int(
+                compiled.duration_min
+                + uniforms[DRAW_EXPIRY_DURATION, good] * compiled.duration_span,
+            )
+            if (
+                uniforms[DRAW_EXPIRY_DRAGON_GATE, good] < dragon_boost
+                and uniforms[DRAW_EXPIRY_DRAGON_CHAOTIC, good]
+                < compiled.chaotic_probability_with_dragon_boost
+            ) or (
+                uniforms[DRAW_EXPIRY_FAST_CHAOTIC, good]
+                < compiled.chaotic_probability_after_fast_mode
+                and mode in (_FAST_RISE, _FAST_FALL)
+            ):
+                mode = _CHAOTIC
+            else:
+                mode = _MODE_CHOICES[
+                    int(uniforms[DRAW_EXPIRY_CHOICE, good] * len(_MODE_CHOICES))
+                ]
+
+        stock_values[good] = value
+        stock_deltas[good] = delta
+        stock_modes[good] = mode
+        remaining_mode_durations[good] = duration
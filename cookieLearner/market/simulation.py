@@ -0,0 +1,318 @@
+"""Single stock market owning the global tick loop of JS M.tick."""
+
+from collections.abc import Callable, Sequence
+
+import numpy as np
+
+from cookieLearner.market import instrumentation
+from cookieLearner.market.batch import (
+    DRAW_GLOBAL_DELTA,
+    DRAW_GLOBAL_GATE,
+    DRAW_GLOBAL_PROBABILITY,
+    GLOBAL_DRAWS,
+    INIT_DRAWS,
+    RESET_WARMUP_TICKS,
+    draw_global_events,
+    draw_initial_state,
+)
+from cookieLearner.market.compiled import CompiledConfig
+from cookieLearner.market.goods import GoodsTable
+from cookieLearner.market.history import HISTORY_DEPTH, PriceHistory
+from cookieLearner.market.kernels import tick_kernel
+from cookieLearner.market.market import (
+    DEFAULT_CONFIG,
+    NUM_GOODS,
+    Config,
+    GameEnvironment,
+    Good,
+    Mode,
+)
+from cookieLearner.market.randomness import (
+    CounterStreams,
+    UniformBlocks,
+    UniformSource,
+)
+from cookieLearner.market.scalar_engine import tick_goods
+from cookieLearner.market.vectorized import TICK_DRAWS, FloatArray
+
+# Upper bound on the ticks whose uniforms step_n draws at once
+STEP_CHUNK_TICKS = 1024
+
+
+class Market:
+    """A stock market of several goods sharing one :class:`GameEnvironment`.
+
+    Each tick draws the global delta and the instant mode change probability,
+    resets ``last``, advances all goods with :func:`tick_goods` and pushes the
+    new values to :attr:`history`. A Python loop over the goods of a single
+    market is cheaper than the fixed per-call cost of the batched kernels; it
+    reads the same draws and gives the same states. Per-good state is kept in
+    preallocated arrays indexed by ``stock_id`` and updated in place;
+    :attr:`goods` builds :class:`Good` objects on demand. The environment is
+    compiled into :attr:`compiled` once; rebuild it with
+    :meth:`CompiledConfig.from_config` after changing the environment.
+
+    With ``streams``, draws are addressed by ``market_id`` and :attr:`clock`
+    exactly as in :class:`MarketBatch`, so the market evolves like row
+    ``market_id`` of a batch drawing from the same streams.
+    """
+
+    def __init__(
+        self,
+        environment: GameEnvironment,
+        goods: Sequence[Good] | None = None,
+        config: Config = DEFAULT_CONFIG,
+        rng: UniformSource | None = None,
+        history_depth: int = HISTORY_DEPTH,
+        seed: int | None = None,
+        streams: CounterStreams | None = None,
+        market_id: int = 0,
+    ) -> None:
+        """Creates a market from ``goods`` or, if omitted, as JS M.reset does.
+
+        Args:
+            environment: Game environment shared by all goods.
+            goods: Initial goods, ordered by ``stock_id``.
+            config: Simulation parameters.
+            rng: Source of randomness, pre-drawn blocks seeded with ``seed``
+                if omitted.
+            history_depth: Number of ticks of stock values to keep.
+            seed: Seed of the default source.
+            streams: Counter-based streams to draw from instead of ``rng``.
+            market_id: Global id addressing the market in ``streams``.
+
+        """
+        self.environment = environment
+        self.config = config
+        self.rng = UniformBlocks(seed) if rng is None else rng
+        self.streams = streams
+        self.market_id = market_id
+
+        n_goods = NUM_GOODS if goods is None else len(goods)
+        self.stock_values = np.empty(n_goods, dtype=np.float64)
+        self.stock_deltas = np.empty(n_goods, dtype=np.float64)
+        self.stock_modes = np.empty(n_goods, dtype=np.int8)
+        self.remaining_mode_durations = np.empty(n_goods, dtype=np.int64)
+        # 0: didn't buy or sell this tick; 1: bought this tick; 2: sold this tick
+        self.last = np.zeros(n_goods, dtype=np.int8)
+        self.compiled = CompiledConfig.from_config(config, environment, n_goods)
+
+        self.history = PriceHistory((n_goods,), depth=history_depth)
+
+        self.global_delta = 0.0
+        self.instant_mode_change_probability = 0.0
+        self.ticks = 0
+        self.clock = 0
+
+        if goods is None:
+            self.reset()
+        else:
+            for stock_id, good in enumerate(goods):
+                self.stock_values[stock_id] = good.stock_value
+                self.stock_deltas[stock_id] = good.stock_delta
+                self.stock_modes[stock_id] = Mode.coerce(good.mode)
+                self.remaining_mode_durations[stock_id] = good.remaining_mode_duration
+            self._reset_history()
+
+    @property
+    def n_goods(self) -> int:
+        """Number of goods in the market."""
+        return self.stock_values.shape[0]
+
+    @property
+    def goods(self) -> list[Good]:
+        """Snapshot of the current state as :class:`Good` objects."""
+        return [self.good(stock_id) for stock_id in range(self.n_goods)]
+
+    def goods_table(self) -> GoodsTable:
+        """Snapshot of the current state packed into a :class:`GoodsTable`."""
+        return GoodsTable.from_arrays(
+            self.stock_values,
+            self.stock_deltas,
+            self.stock_modes,
+            self.remaining_mode_durations,
+        )
+
+    def good(self, stock_id: int) -> Good:
+        """Snapshot of the current state of a single good."""
+        return Good(
+            stock_id=stock_id,
+            stock_value=float(self.stock_values[stock_id]),
+            stock_delta=float(self.stock_deltas[stock_id]),
+            mode=Mode(self.stock_modes[stock_id]).label,
+            remaining_mode_duration=int(self.remaining_mode_durations[stock_id]),
+        )
+
+    def reset(self, warmup_ticks: int = RESET_WARMUP_TICKS) -> None:
+        """Re-initializes every good as in JS M.reset and runs the warm-up ticks."""
+        (
+            self.stock_values[...],
+            self.stock_deltas[...],
+            self.stock_modes[...],
+            self.remaining_mode_durations[...],
+        ) = draw_initial_state(
+            self.compiled.resting_stock_values,
+            self._draw(INIT_DRAWS, self.n_goods)
+            if self.streams is not None
+            else self.rng.random((INIT_DRAWS, self.n_goods)),
+            config=self.config,
+        )
+        self.last[...] = 0
+        self.ticks = 0
+        self.clock += 1
+        self._reset_history()
+
+        self.step_n(warmup_ticks)
+
+    def step(self) -> None:
+        """Advances the market by one tick."""
+        if self.streams is not None:
+            self._advance(
+                self._draw(GLOBAL_DRAWS),
+                self._draw(TICK_DRAWS, self.n_goods),
+            )
+            return
+
+        uniforms = self.rng.random(GLOBAL_DRAWS + TICK_DRAWS * self.n_goods)
+        self._advance(
+            uniforms[:GLOBAL_DRAWS],
+            uniforms[GLOBAL_DRAWS:].reshape(TICK_DRAWS, self.n_goods),
+        )
+
+    def step_n(self, n_ticks: int) -> None:
+        """Advances the market by ``n_ticks`` ticks.
+
+        Uniforms are drawn for up to ``STEP_CHUNK_TICKS`` ticks at once, in the
+        same order as ``n_ticks`` calls to :meth:`step`.
+        """
+        if self.streams is not None:
+            for _ in range(n_ticks):
+                self.step()
+            return
+
+        draws_per_tick = GLOBAL_DRAWS + TICK_DRAWS * self.n_goods
+        while n_ticks > 0:
+            chunk_ticks = min(n_ticks, STEP_CHUNK_TICKS)
+            for uniforms in self.rng.random((chunk_ticks, draws_per_tick)):
+                self._advance(
+                    uniforms[:GLOBAL_DRAWS],
+                    uniforms[GLOBAL_DRAWS:].reshape(TICK_DRAWS, self.n_goods),
+                )
+            n_ticks -= chunk_ticks
+
+    def run_until(
+        self,
+        predicate: Callable[["Market"], bool],
+        max_ticks: int | None = None,
+    ) -> int:
+        """Steps the market until ``predicate(market)`` holds after a tick.
+
+        Args:
+            predicate: Stop condition, evaluated after every tick.
+            max_ticks: Maximum number of ticks to run, unbounded if omitted.
+
+        Returns:
+            int: The number of ticks run.
+
+        """
+        ticks = 0
+        while max_ticks is None or ticks < max_ticks:
+            self.step()
+            ticks += 1
+            if predicate(self):
+                break
+        return ticks
+
+    def _reset_history(self) -> None:
+        """Restarts the history as JS does with ``vals=[val,val-d]``."""
+        self.history.clear()
+        self.history.push(self.stock_values - self.stock_deltas)
+        self.history.push(self.stock_values)
+
+    def _draw(self, n_draws: int, n_goods: int | None = None) -> FloatArray:
+        """Draws the uniforms of the current clock tick from ``streams``."""
+        uniforms = self.streams.uniforms(
+            self.clock,
+            np.array([self.market_id]),
+            n_draws,
+            n_goods,
+        )
+        return uniforms[:, 0]
+
+    def _advance(self, global_uniforms: FloatArray, uniforms: FloatArray) -> None:
+        """Runs one tick of JS M.tick on the global and per-good uniforms.
+
+        Args:
+            global_uniforms: Uniforms of shape ``(GLOBAL_DRAWS,)``.
+            uniforms: Uniforms of shape ``(TICK_DRAWS, n_goods)``.
+
+        """
+        if instrumentation.active_profile() is not None:
+            # Only the batched kernel records phases and events
+            self._advance_batched(global_uniforms, uniforms)
+            return
+
+        global_uniforms = global_uniforms.tolist()
+        self.instant_mode_change_probability = global_uniforms[DRAW_GLOBAL_PROBABILITY]
+        self.global_delta = (
+            (global_uniforms[DRAW_GLOBAL_DELTA] - 0.5) * 2
+            if global_uniforms[DRAW_GLOBAL_GATE]
+            < self.compiled.global_delta_probability
+            else 0.0
+        )
+        self.last[...] = 0
+
+        stock_values = self.stock_values.tolist()
+        stock_deltas = self.stock_deltas.tolist()
+        stock_modes = self.stock_modes.tolist()
+        remaining_mode_durations = self.remaining_mode_durations.tolist()
+        tick_goods(
+            stock_values,
+            stock_deltas,
+            stock_modes,
+            remaining_mode_durations,
+            self.global_delta,
+            self.instant_mode_change_probability,
+            self.compiled,
+            memoryview(np.ascontiguousarray(uniforms)),
+        )
+        self.stock_values[...] = stock_values
+        self.stock_deltas[...] = stock_deltas
+        self.stock_modes[...] = stock_modes
+        self.remaining_mode_durations[...] = remaining_mode_durations
+        self.history.push(self.stock_values)
+        self.ticks += 1
+        self.clock += 1
+
+    def _advance_batched(
+        self,
+        global_uniforms: FloatArray,
+        uniforms: FloatArray,
+    ) -> None:
+        """Runs one tick as :meth:`_advance` does with the batched tick kernel."""
+        global_delta, instant_mode_change_probability = draw_global_events(
+            global_uniforms,
+            self.compiled,
+        )
+        self.global_delta = float(global_delta)
+        self.instant_mode_change_probability = float(instant_mode_change_probability)
+        self.last[...] = 0
+
+        (
+            self.stock_values[...],
+            self.stock_deltas[...],
+            self.stock_modes[...],
+            self.remaining_mode_durations[...],
+        ) = tick_kernel(
+            self.stock_values,
+            self.stock_deltas,
+            self.stock_modes,
+            self.remaining_mode_durations,
+            self.global_delta,
+            self.instant_mode_change_probability,
+            self.compiled,
+            uniforms=uniforms,
+        )
+        self.history.push(self.stock_values)
+        self.ticks += 1
+        self.clock += 1
@@ -0,0 +1,282 @@
+"""On-disk trajectory datasets backed by memory-mapped ``.npy`` files.
+
+A store is a directory holding one ``.npy`` file per :class:`Trajectories`
+field, each of shape ``(capacity, n_markets, n_goods)``, the game
+environment of every market in ``environment_ids.npy`` and a small
+``header.json``. The header records the :class:`Config`, the distinct
+:class:`GameEnvironment` objects, the seed and the number of ticks written
+so far.
+
+:class:`TrajectoryWriter` appends chunks of ticks, e.g. from
+:func:`iter_trajectories`, and :class:`TrajectoryReader` maps the files
+read-only, so slicing a window of ticks, markets and goods touches only the
+pages of that window.
+"""
+
+import json
+from collections.abc import Iterator, Sequence
+from dataclasses import asdict, astuple
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Self
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from cookieLearner.market.market import (
+    DEFAULT_CONFIG,
+    NUM_GOODS,
+    Config,
+    GameEnvironment,
+)
+from cookieLearner.market.trajectories import (
+    DEFAULT_CHUNK_TICKS,
+    TRAJECTORY_DTYPES,
+    Trajectories,
+    iter_trajectories,
+)
+
+HEADER_FILE = "header.json"
+ENVIRONMENT_IDS_FILE = "environment_ids.npy"
+# Bumped whenever the layout of a store changes
+STORE_VERSION = 1
+
+type Window = int | slice
+
+
+class TrajectoryWriter:
+    """Appends chunks of ticks to a new trajectory store.
+
+    The field files are created with room for ``capacity`` ticks. The header
+    is rewritten on :meth:`flush` and :meth:`close`, so a store that was not
+    closed cleanly still reads up to the last flush.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        capacity: int,
+        environments: Sequence[GameEnvironment],
+        n_goods: int = NUM_GOODS,
+        config: Config = DEFAULT_CONFIG,
+        seed: int | None = None,
+    ) -> None:
+        """Creates the store directory and its files.
+
+        Args:
+            path: Directory of the store, created if missing.
+            capacity: Maximum number of ticks the store can hold.
+            environments: Game environment of every market.
+            n_goods: Number of goods per market.
+            config: Simulation parameters the trajectories were made with.
+            seed: Seed the trajectories were made with.
+
+        """
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.capacity = capacity
+        self.n_ticks = 0
+
+        # GameEnvironment is mutable and unhashable, its fields are not
+        index: dict[tuple, int] = {}
+        distinct = []
+        for environment in environments:
+            if index.setdefault(astuple(environment), len(distinct)) == len(distinct):
+                distinct.append(environment)
+        np.save(
+            self.path / ENVIRONMENT_IDS_FILE,
+            np.array(
+                [index[astuple(environment)] for environment in environments],
+                np.int32,
+            ),
+        )
+        self._header: dict[str, Any] = {
+            "version": STORE_VERSION,
+            "n_ticks": 0,
+            "capacity": capacity,
+            "n_markets": len(environments),
+            "n_goods": n_goods,
+            "seed": seed,
+            "config": asdict(config),
+            "environments": [asdict(environment) for environment in distinct],
+        }
+
+        shape = (capacity, len(environments), n_goods)
+        self.arrays: Trajectories | None = Trajectories(
+            *(
+                open_memmap(
+                    self.path / f"{field}.npy",
+                    mode="w+",
+                    dtype=dtype,
+                    shape=shape,
+                )
+                for field, dtype in TRAJECTORY_DTYPES.items()
+            ),
+        )
+        self.flush()
+
+    def append(self, chunk: Trajectories) -> None:
+        """Writes the ticks of ``chunk`` after the ticks written so far.
+
+        Raises:
+            ValueError: If the writer is closed or the chunk does not fit into
+                the remaining capacity.
+
+        """
+        if self.arrays is None:
+            msg = "Cannot append to a closed trajectory store."
+            raise ValueError(msg)
+        stop = self.n_ticks + chunk.n_ticks
+        if stop > self.capacity:
+            msg = (
+                f"Cannot append {chunk.n_ticks} ticks to a store holding "
+                f"{self.n_ticks} of {self.capacity}."
+            )
+            raise ValueError(msg)
+        for column, values in zip(self.arrays, chunk, strict=True):
+            column[self.n_ticks : stop] = values
+        self.n_ticks = stop
+
+    def flush(self) -> None:
+        """Writes the mapped pages and the header to disk."""
+        for column in self.arrays or ():
+            column.flush()
+        self._header["n_ticks"] = self.n_ticks
+        (self.path / HEADER_FILE).write_text(json.dumps(self._header, indent=2))
+
+    @property
+    def closed(self) -> bool:
+        """Whether :meth:`close` was called."""
+        return self.arrays is None
+
+    def close(self) -> None:
+        """Flushes and unmaps the field files; closing again does nothing."""
+        if self.arrays is None:
+            return
+        self.flush()
+        # Dropping the last references unmaps the files
+        self.arrays = None
+
+    def __enter__(self) -> Self:
+        """Returns the open writer."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Closes the writer."""
+        self.close()
+
+
+class TrajectoryReader:
+    """Read-only, memory-mapped view of a trajectory store.
+
+    :attr:`trajectories` holds ``np.memmap`` arrays of the ticks written so
+    far; slicing them returns views that are loaded lazily by the OS.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        """Maps the store at ``path``.
+
+        Raises:
+            ValueError: If the store was written by an unknown version.
+
+        """
+        self.path = Path(path)
+        header = json.loads((self.path / HEADER_FILE).read_text())
+        if header["version"] != STORE_VERSION:
+            msg = f"Unsupported trajectory store version {header['version']}."
+            raise ValueError(msg)
+
+        self.n_ticks: int = header["n_ticks"]
+        self.n_markets: int = header["n_markets"]
+        self.n_goods: int = header["n_goods"]
+        self.seed: int | None = header["seed"]
+        self.config = Config(**header["config"])
+        self.distinct_environments = [
+            GameEnvironment(**environment) for environment in header["environments"]
+        ]
+        self.environment_ids = np.load(self.path / ENVIRONMENT_IDS_FILE)
+        self.trajectories = Trajectories(
+            *(
+                np.load(self.path / f"{field}.npy", mmap_mode="r")[: self.n_ticks]
+                for field in TRAJECTORY_DTYPES
+            ),
+        )
+
+    @property
+    def environments(self) -> list[GameEnvironment]:
+        """Game environment of every market."""
+        return [self.distinct_environments[i] for i in self.environment_ids]
+
+    def window(
+        self,
+        ticks: Window = slice(None),
+        markets: Window = slice(None),
+        goods: Window = slice(None),
+    ) -> Trajectories:
+        """Returns a view of the states of some ticks, markets and goods.
+
+        An integer instead of a slice drops the corresponding axis.
+        """
+        return Trajectories(
+            *(column[ticks, markets, goods] for column in self.trajectories),
+        )
+
+    def iter_chunks(
+        self,
+        chunk_ticks: int = DEFAULT_CHUNK_TICKS,
+        markets: Window = slice(None),
+        goods: Window = slice(None),
+    ) -> Iterator[Trajectories]:
+        """Yields consecutive windows of at most ``chunk_ticks`` ticks."""
+        for start in range(0, self.n_ticks, chunk_ticks):
+            yield self.window(slice(start, start + chunk_ticks), markets, goods)
+
+
+def write_trajectories(
+    path: str | Path,
+    n_markets: int,
+    n_ticks: int,
+    environment: GameEnvironment | Sequence[GameEnvironment],
+    config: Config = DEFAULT_CONFIG,
+    seed: int | None = None,
+    n_goods: int = NUM_GOODS,
+    chunk_ticks: int = DEFAULT_CHUNK_TICKS,
+) -> TrajectoryReader:
+    """Simulates ``n_markets`` markets for ``n_ticks`` ticks into a store.
+
+    Only one chunk of ``chunk_ticks`` ticks is held in memory at a time; see
+    :func:`iter_trajectories` for the arguments.
+
+    Returns:
+        TrajectoryReader: The written store.
+
+    """
+    environments = (
+        [environment] * n_markets
+        if isinstance(environment, GameEnvironment)
+        else list(environment)
+    )
+    with TrajectoryWriter(
+        path,
+        capacity=n_ticks,
+        environments=environments,
+        n_goods=n_goods,
+        config=config,
+        seed=seed,
+    ) as writer:
+        for chunk in iter_trajectories(
+            n_markets,
+            n_ticks,
+            environments,
+            config=config,
+            seed=seed,
+            n_goods=n_goods,
+            chunk_ticks=chunk_ticks,
+        ):
+            writer.append(chunk)
+    return TrajectoryReader(path)
@@ -0,0 +1,134 @@
+"""Rules of buying and selling goods, M.buyGood and M.sellGood in JS.
+
+Prices are in dollars, i.e. seconds of the highest raw CpS of the run. A
+good worth ``val`` dollars costs ``cookies_ps_raw_highest * val`` cookies,
+plus the broker overhead when buying.
+"""
+
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+
+# Passing this quantity buys as many units as affordable or sells all units
+MAX_QUANTITY = 10000
+
+# Warehouse space added by each office upgrade, M.getGoodMaxStock
+OFFICE_STOCK_BONUSES = (25, 50, 75, 100)
+# Level of the last office, the Palace of Greed
+MAX_OFFICE_LEVEL = 5
+# From this office level on, the building-based warehouse space is 1.5 times
+OFFICE_LEVEL_STOCK_MULTIPLIER = 5
+
+# 0: didn't buy or sell this tick; 1: bought this tick; 2: sold this tick
+LAST_NONE = 0
+LAST_BOUGHT = 1
+LAST_SOLD = 2
+
+
+def broker_overhead(num_brokers: ArrayLike) -> float | NDArray[np.float64]:
+    """Returns the price multiplier of buying, 20% minus 5% per broker.
+
+    Returns:
+        float: The overhead factor, ``1 + 0.2 * 0.95**num_brokers``.
+
+    """
+    return 1 + 0.01 * (20 * np.power(0.95, num_brokers))
+
+
+def good_max_stock(
+    building_highest: ArrayLike,
+    building_level: ArrayLike,
+    office_level: int = 0,
+) -> NDArray[np.int64]:
+    """Returns the warehouse space of goods as in JS M.getGoodMaxStock.
+
+    Args:
+        building_highest: Highest amount of the tied building owned this run.
+        building_level: Level of the tied building.
+        office_level: Upgrade level of the offices, 0 to 5.
+
+    Returns:
+        NDArray: The maximum number of units per good.
+
+    """
+    bonus = sum(OFFICE_STOCK_BONUSES[:office_level])
+    multiplier = 1.5 if office_level >= OFFICE_LEVEL_STOCK_MULTIPLIER else 1
+    return np.ceil(
+        np.asarray(building_highest) * multiplier
+        + bonus
+        + np.asarray(building_level) * 10,
+    ).astype(np.int64)
+
+
+def buy_cost(
+    stock_value: ArrayLike,
+    cookies_ps_raw_highest: ArrayLike,
+    overhead: ArrayLike,
+) -> float | NDArray[np.float64]:
+    """Returns the price in cookies of one unit, overhead included.
+
+    Returns:
+        float: ``cookies_ps_raw_highest * stock_value * overhead``, multiplied
+            in the same order as JS so that ledgers match to the bit.
+
+    """
+    cost = cookies_ps_raw_highest * stock_value
+    return cost * overhead
+
+
+def buy_quantity(
+    quantity: ArrayLike,
+    cost: ArrayLike,
+    cookies: ArrayLike,
+    free_stock: ArrayLike,
+    last: ArrayLike,
+) -> NDArray[np.int64]:
+    """Returns the units a buy order gets as in JS M.buyGood.
+
+    ``MAX_QUANTITY`` asks for as many units as affordable. The order is capped
+    by the free warehouse space and fails as a whole if it is not affordable
+    or the good was sold this tick.
+
+    Args:
+        quantity: Units ordered.
+        cost: Price of one unit in cookies, see :func:`buy_cost`.
+        cookies: Cookies in the bank.
+        free_stock: Warehouse space left for the good.
+        last: ``LAST_NONE``, ``LAST_BOUGHT`` or ``LAST_SOLD`` for the good.
+
+    Returns:
+        NDArray: The units bought, zero where the order fails.
+
+    """
+    quantity = np.where(
+        quantity == MAX_QUANTITY,
+        np.floor(np.divide(cookies, cost)).astype(np.int64),
+        quantity,
+    )
+    quantity = np.minimum(quantity, free_stock)
+    return quantity * (
+        (quantity > 0) & (last != LAST_SOLD) & (cookies >= cost * quantity)
+    )
+
+
+def sell_quantity(
+    quantity: ArrayLike,
+    stock: ArrayLike,
+    last: ArrayLike,
+) -> NDArray[np.int64]:
+    """Returns the units a sell order gets as in JS M.sellGood.
+
+    ``MAX_QUANTITY`` sells every unit held. The order is capped by the units
+    held and fails if the good was bought this tick.
+
+    Args:
+        quantity: Units ordered.
+        stock: Units held.
+        last: ``LAST_NONE``, ``LAST_BOUGHT`` or ``LAST_SOLD`` for the good.
+
+    Returns:
+        NDArray: The units sold, zero where the order fails.
+
+    """
+    quantity = np.where(quantity == MAX_QUANTITY, stock, quantity)
+    quantity = np.minimum(quantity, stock)
+    return quantity * ((quantity > 0) & (last != LAST_BOUGHT))
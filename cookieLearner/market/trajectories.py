@@ -0,0 +1,187 @@
+"""Bulk generation of price paths for offline learning and analysis.
+
+:func:`iter_trajectories` advances a :class:`MarketBatch` and copies the
+state after every tick into compact ``(ticks, n_markets, n_goods)`` arrays,
+yielding them a chunk of ticks at a time so memory stays bounded however
+long the run. :func:`generate_trajectories` collects a whole run into one
+preallocated :class:`Trajectories`, or into arrays supplied by the caller,
+e.g. memory maps.
+"""
+
+from collections.abc import Iterator, Sequence
+from typing import NamedTuple, Self
+
+import numpy as np
+from numpy.typing import NDArray
+
+from cookieLearner.market.batch import MarketBatch
+from cookieLearner.market.market import (
+    DEFAULT_CONFIG,
+    NUM_GOODS,
+    Config,
+    GameEnvironment,
+)
+from cookieLearner.market.simulation import Market
+
+# Number of ticks copied per chunk unless specified
+DEFAULT_CHUNK_TICKS = 1024
+
+# Storage types of the trajectory columns. Durations become negative when a
+# mode is drawn with a negative duration, see Config.duration_max_dragon_boost
+TRAJECTORY_DTYPES = {
+    "stock_values": np.float32,
+    "stock_deltas": np.float32,
+    "stock_modes": np.int8,
+    "remaining_mode_durations": np.int32,
+}
+
+
+class Trajectories(NamedTuple):
+    """Good state of many markets over many ticks, one array per field.
+
+    Every array has shape ``(n_ticks, n_markets, n_goods)``, or
+    ``(n_ticks, n_goods)`` for a single market; row ``t`` holds the state after
+    tick ``t + 1``.
+    """
+
+    stock_values: NDArray[np.float32]
+    stock_deltas: NDArray[np.float32]
+    stock_modes: NDArray[np.int8]
+    remaining_mode_durations: NDArray[np.int32]
+
+    @classmethod
+    def empty(cls, n_ticks: int, n_markets: int, n_goods: int = NUM_GOODS) -> Self:
+        """Allocates uninitialized arrays for ``n_ticks`` ticks."""
+        shape = (n_ticks, n_markets, n_goods)
+        return cls(
+            **{
+                field: np.empty(shape, dtype=dtype)
+                for field, dtype in TRAJECTORY_DTYPES.items()
+            },
+        )
+
+    @classmethod
+    def empty_like(cls, n_ticks: int, market: Market | MarketBatch) -> Self:
+        """Allocates uninitialized arrays for ``n_ticks`` ticks of ``market``."""
+        shape = (n_ticks, *market.stock_values.shape)
+        return cls(
+            **{
+                field: np.empty(shape, dtype=dtype)
+                for field, dtype in TRAJECTORY_DTYPES.items()
+            },
+        )
+
+    @property
+    def n_ticks(self) -> int:
+        """Number of recorded ticks."""
+        return self.stock_values.shape[0]
+
+
+def iter_trajectories(
+    n_markets: int,
+    n_ticks: int,
+    environment: GameEnvironment | Sequence[GameEnvironment],
+    config: Config = DEFAULT_CONFIG,
+    seed: int | None = None,
+    n_goods: int = NUM_GOODS,
+    chunk_ticks: int = DEFAULT_CHUNK_TICKS,
+) -> Iterator[Trajectories]:
+    """Simulates ``n_markets`` markets and yields their states chunk by chunk.
+
+    The chunks are views of one buffer of ``chunk_ticks`` ticks that is
+    overwritten by the next chunk; copy them to keep them. The last chunk
+    may be shorter.
+
+    Args:
+        n_markets: Number of markets.
+        n_ticks: Number of ticks to simulate after the reset.
+        environment: Game environment of all markets, or one per market.
+        config: Simulation parameters.
+        seed: Seed of the random generator.
+        n_goods: Number of goods per market.
+        chunk_ticks: Maximum number of ticks per chunk.
+
+    Yields:
+        Trajectories: The states after the ticks of the chunk.
+
+    """
+    environments = (
+        [environment] * n_markets
+        if isinstance(environment, GameEnvironment)
+        else list(environment)
+    )
+    if len(environments) != n_markets:
+        msg = f"Expected {n_markets} environments, got {len(environments)}."
+        raise ValueError(msg)
+
+    batch = MarketBatch(
+        environments,
+        n_goods=n_goods,
+        config=config,
+        history_depth=None,
+        seed=seed,
+    )
+    buffer = Trajectories.empty(min(chunk_ticks, n_ticks), n_markets, n_goods)
+    for start in range(0, n_ticks, chunk_ticks):
+        size = min(chunk_ticks, n_ticks - start)
+        chunk = Trajectories(*(column[:size] for column in buffer))
+        record_ticks(batch, chunk)
+        yield chunk
+
+
+def record_ticks(market: Market | MarketBatch, chunk: Trajectories) -> None:
+    """Steps ``market`` once per row of ``chunk`` and copies its state there."""
+    for row in range(chunk.n_ticks):
+        market.step()
+        chunk.stock_values[row] = market.stock_values
+        chunk.stock_deltas[row] = market.stock_deltas
+        chunk.stock_modes[row] = market.stock_modes
+        chunk.remaining_mode_durations[row] = market.remaining_mode_durations
+
+
+def generate_trajectories(
+    n_markets: int,
+    n_ticks: int,
+    environment: GameEnvironment | Sequence[GameEnvironment],
+    config: Config = DEFAULT_CONFIG,
+    seed: int | None = None,
+    n_goods: int = NUM_GOODS,
+    chunk_ticks: int = DEFAULT_CHUNK_TICKS,
+    out: Trajectories | None = None,
+) -> Trajectories:
+    """Simulates ``n_markets`` markets for ``n_ticks`` ticks.
+
+    Args:
+        n_markets: Number of markets.
+        n_ticks: Number of ticks to simulate after the reset.
+        environment: Game environment of all markets, or one per market.
+        config: Simulation parameters.
+        seed: Seed of the random generator.
+        n_goods: Number of goods per market.
+        chunk_ticks: Number of ticks simulated between copies into ``out``.
+        out: Arrays of shape ``(n_ticks, n_markets, n_goods)`` to fill,
+            allocated if omitted.
+
+    Returns:
+        Trajectories: The state of every good after every tick.
+
+    """
+    if out is None:
+        out = Trajectories.empty(n_ticks, n_markets, n_goods)
+
+    start = 0
+    for chunk in iter_trajectories(
+        n_markets,
+        n_ticks,
+        environment,
+        config=config,
+        seed=seed,
+        n_goods=n_goods,
+        chunk_ticks=chunk_ticks,
+    ):
+        stop = start + chunk.n_ticks
+        for column, values in zip(out, chunk, strict=True):
+            column[start:stop] = values
+        start = stop
+
+    return out
@@ -0,0 +1,599 @@
+"""Trading policies solved by value iteration over a discretized good.
+
+A good evolves as a Markov process over its value, delta, mode and
+remaining mode duration. Holding units adds a binary state: since prices are
+linear in the quantity, the best order either fills the warehouse or empties
+it, so the warehouse space only scales the value of a policy and a policy
+reduces to buying or selling everything.
+
+:func:`solve_trading_policy` discretizes value and delta on uniform grids,
+keeps the mode, and marginalizes the remaining duration, which with the
+default :class:`Config` is redrawn almost every tick. The transition kernel of
+every good and bank level is estimated by counting the transitions of a
+burned-in :class:`MarketBatch`, and value iteration then runs for all broker
+counts at once. The resulting :class:`TradingPolicy` maps a state to
+:data:`HOLD`, :data:`BUY` or :data:`SELL` by indexing alone.
+
+Build and save a policy from the command line with::
+
+    uv run python -m cookieLearner.market.value_iteration --output policy.npz
+"""
+
+import argparse
+import json
+import sys
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import NamedTuple, Self
+
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+
+from cookieLearner.market.batch import MarketBatch
+from cookieLearner.market.feed import stream
+from cookieLearner.market.market import (
+    DEFAULT_CONFIG,
+    NUM_GOODS,
+    Config,
+    GameEnvironment,
+    Mode,
+)
+from cookieLearner.market.randomness import FloatArray
+from cookieLearner.market.trading import (
+    LAST_BOUGHT,
+    LAST_NONE,
+    LAST_SOLD,
+    MAX_QUANTITY,
+    broker_overhead,
+)
+from cookieLearner.market.trajectories import Trajectories
+
+# Actions of a policy, coded as the ``last`` flag the trade leaves behind
+HOLD = LAST_NONE
+BUY = LAST_BOUGHT
+SELL = LAST_SOLD
+
+N_MODES = len(Mode)
+# Quantiles of the pilot run bounding the value and delta grids; states
+# outside fall into the outermost bins
+GRID_QUANTILES = (0.001, 0.999)
+# Bumped whenever the layout of saved policies changes
+POLICY_VERSION = 1
+
+
+class _Kernel(NamedTuple):
+    """Estimated transitions of the goods of one bank level.
+
+    States of good ``g`` are numbered ``g * n_states + state``, transitions
+    are stored as sparse rows sorted by their origin.
+    """
+
+    value_low: FloatArray
+    value_step: FloatArray
+    delta_low: FloatArray
+    delta_step: FloatArray
+    # First transition of every state, plus the total at the end
+    row_starts: NDArray[np.intp]
+    targets: NDArray[np.intp]
+    probabilities: FloatArray
+    # Mean stock value of the samples of every state
+    state_values: FloatArray
+    # Whether a state was left at least once in the samples
+    visited: NDArray[np.bool_]
+
+
+@dataclass(frozen=True, slots=True)
+class TradingPolicy:
+    """Best action per ``(stock_id, bank_level, num_brokers)`` and good state.
+
+    :attr:`actions` and :attr:`values` have shape ``(n_goods, n_bank_levels,
+    n_brokers, value_bins, delta_bins, N_MODES, 2)``, the last axis being
+    whether units are held. Values are the discounted profit in dollars per
+    unit of warehouse space. Bank levels and broker counts outside the table
+    use the nearest tabulated one.
+    """
+
+    config: Config
+    dragon_boost: float
+    discount: float
+    first_bank_level: int
+    # Grids of the value and delta bins, shape (n_goods, n_bank_levels)
+    value_low: FloatArray
+    value_step: FloatArray
+    delta_low: FloatArray
+    delta_step: FloatArray
+    actions: NDArray[np.int8]
+    values: NDArray[np.float32]
+
+    @property
+    def bank_levels(self) -> range:
+        """Tabulated bank levels."""
+        return range(
+            self.first_bank_level,
+            self.first_bank_level + self.actions.shape[1],
+        )
+
+    @property
+    def max_brokers(self) -> int:
+        """Highest tabulated broker count."""
+        return self.actions.shape[2] - 1
+
+    def action(
+        self,
+        stock_id: ArrayLike,
+        bank_level: ArrayLike,
+        num_brokers: ArrayLike,
+        stock_value: ArrayLike,
+        stock_delta: ArrayLike,
+        mode: ArrayLike,
+        held: ArrayLike,
+    ) -> NDArray[np.int8]:
+        """Returns :data:`HOLD`, :data:`BUY` or :data:`SELL` for every good.
+
+        Arguments broadcast against each other, e.g. a market's goods are
+        looked up at once with ``stock_id=np.arange(18)`` and its state arrays.
+        ``held`` tells whether any units of the good are held.
+        """
+        return self.actions[
+            self._state(
+                stock_id,
+                bank_level,
+                num_brokers,
+                stock_value,
+                stock_delta,
+                mode,
+                held,
+            )
+        ]
+
+    def quantities(
+        self,
+        stock_id: ArrayLike,
+        bank_level: ArrayLike,
+        num_brokers: ArrayLike,
+        stock_value: ArrayLike,
+        stock_delta: ArrayLike,
+        mode: ArrayLike,
+        stock: ArrayLike,
+    ) -> NDArray[np.int64]:
+        """Returns the policy as a ``MarketEnv`` action for units ``stock`` held.
+
+        Buys are ``MAX_QUANTITY``, sells ``-MAX_QUANTITY`` and holds zero.
+        """
+        actions = self.action(
+            stock_id,
+            bank_level,
+            num_brokers,
+            stock_value,
+            stock_delta,
+            mode,
+            np.asarray(stock) > 0,
+        )
+        return np.select(
+            [actions == BUY, actions == SELL],
+            [MAX_QUANTITY, -MAX_QUANTITY],
+            0,
+        )
+
+    def _state(
+        self,
+        stock_id: ArrayLike,
+        bank_level: ArrayLike,
+        num_brokers: ArrayLike,
+        stock_value: ArrayLike,
+        stock_delta: ArrayLike,
+        mode: ArrayLike,
+        held: ArrayLike,
+    ) -> tuple[NDArray[np.intp], ...]:
+        """Index of the given states into :attr:`actions`."""
+        _, n_bank_levels, n_brokers, value_bins, delta_bins, *_ = self.actions.shape
+        stock_id = np.asarray(stock_id, dtype=np.intp)
+        bank = _clip(
+            np.asarray(bank_level, dtype=np.intp) - self.first_bank_level,
+            0,
+            n_bank_levels - 1,
+        )
+        grid = (stock_id, bank)
+        # Fancy indexing broadcasts the indices against each other
+        return (
+            stock_id,
+            bank,
+            _clip(np.asarray(num_brokers, dtype=np.intp), 0, n_brokers - 1),
+            _bins(stock_value, self.value_low[grid], self.value_step[grid], value_bins),
+            _bins(stock_delta, self.delta_low[grid], self.delta_step[grid], delta_bins),
+            np.asarray(mode, dtype=np.intp),
+            np.asarray(held, dtype=np.intp),
+        )
+
+    def save(self, path: str | Path) -> None:
+        """Writes the policy to an ``.npz`` file."""
+        header = {
+            "version": POLICY_VERSION,
+            "config": asdict(self.config),
+            "dragon_boost": self.dragon_boost,
+            "discount": self.discount,
+            "first_bank_level": self.first_bank_level,
+        }
+        np.savez_compressed(
+            path,
+            header=np.array(json.dumps(header)),
+            value_low=self.value_low,
+            value_step=self.value_step,
+            delta_low=self.delta_low,
+            delta_step=self.delta_step,
+            actions=self.actions,
+            values=self.values,
+        )
+
+    @classmethod
+    def load(cls, path: str | Path) -> Self:
+        """Reads a policy written by :meth:`save`.
+
+        Raises:
+            ValueError: If the policy was written by an unknown version.
+
+        """
+        with np.load(path) as data:
+            header = json.loads(str(data["header"]))
+            if header["version"] != POLICY_VERSION:
+                msg = f"Unsupported trading policy version {header['version']}."
+                raise ValueError(msg)
+            return cls(
+                config=Config(**header["config"]),
+                dragon_boost=header["dragon_boost"],
+                discount=header["discount"],
+                first_bank_level=header["first_bank_level"],
+                value_low=data["value_low"],
+                value_step=data["value_step"],
+                delta_low=data["delta_low"],
+                delta_step=data["delta_step"],
+                actions=data["actions"],
+                values=data["values"],
+            )
+
+
+def solve_trading_policy(
+    min_bank_level: int = 1,
+    max_bank_level: int = 10,
+    max_brokers: int = 20,
+    dragon_boost: float = 0.0,
+    value_bins: int = 40,
+    delta_bins: int = 16,
+    discount: float = 0.99,
+    tolerance: float = 1e-3,
+    max_iterations: int = 10_000,
+    n_markets: int = 128,
+    n_ticks: int = 5000,
+    burn_in: int = 1000,
+    n_goods: int = NUM_GOODS,
+    config: Config = DEFAULT_CONFIG,
+    seed: int | None = None,
+) -> TradingPolicy:
+    """Estimates the dynamics of every good and solves its trading policy.
+
+    Args:
+        min_bank_level: Lowest tabulated bank level.
+        max_bank_level: Highest tabulated bank level.
+        max_brokers: Highest tabulated broker count; policies for
+            ``0, ..., max_brokers`` brokers are solved.
+        dragon_boost: Dragon boost of the simulated markets.
+        value_bins: Number of bins of the stock value.
+        delta_bins: Number of bins of the stock delta.
+        discount: Discount factor per tick.
+        tolerance: Value iteration stops once the values of all states
+            change by the same amount up to this many dollars per unit.
+        max_iterations: Value iteration stops after this many sweeps at the
+            latest.
+        n_markets: Markets simulated per bank level.
+        n_ticks: Ticks sampled per market after the burn-in.
+        burn_in: Ticks run after M.reset before sampling; the grids are fit
+            to the last half of them.
+        n_goods: Number of goods per market.
+        config: Simulation parameters.
+        seed: Seed of the simulations.
+
+    Returns:
+        TradingPolicy: Actions and values of every good, bank level, broker
+            count and state.
+
+    """
+    bank_levels = range(min_bank_level, max_bank_level + 1)
+    n_states = value_bins * delta_bins * N_MODES
+    overheads = broker_overhead(np.arange(max_brokers + 1))
+    grid_shape = (n_goods, len(bank_levels))
+    grids = [np.empty(grid_shape) for _ in range(4)]
+    shape = (
+        *grid_shape,
+        max_brokers + 1,
+        value_bins,
+        delta_bins,
+        N_MODES,
+        2,
+    )
+    actions = np.empty(shape, dtype=np.int8)
+    values = np.empty(shape, dtype=np.float32)
+
+    seeds = np.random.SeedSequence(seed).spawn(len(bank_levels))
+    for bank, bank_level in enumerate(bank_levels):
+        kernel = _estimate_kernel(
+            GameEnvironment(
+                bank_level=bank_level,
+                num_brokers=0,
+                dragon_boost=dragon_boost,
+            ),
+            n_markets,
+            n_ticks,
+            burn_in,
+            n_goods,
+            config,
+            seeds[bank],
+            value_bins,
+            delta_bins,
+        )
+        for grid, column in zip(grids, kernel[:4], strict=True):
+            grid[:, bank] = column
+        for stock_id in range(n_goods):
+            states = slice(stock_id * n_states, (stock_id + 1) * n_states)
+            good_actions, good_values = _value_iteration(
+                kernel,
+                states,
+                overheads,
+                discount,
+                tolerance,
+                max_iterations,
+            )
+            cell = (stock_id, bank)
+            actions[cell] = good_actions.reshape(shape[2:])
+            values[cell] = good_values.reshape(shape[2:])
+
+    return TradingPolicy(
+        config=config,
+        dragon_boost=dragon_boost,
+        discount=discount,
+        first_bank_level=min_bank_level,
+        value_low=grids[0],
+        value_step=grids[1],
+        delta_low=grids[2],
+        delta_step=grids[3],
+        actions=actions,
+        values=values,
+    )
+
+
+def _estimate_kernel(
+    environment: GameEnvironment,
+    n_markets: int,
+    n_ticks: int,
+    burn_in: int,
+    n_goods: int,
+    config: Config,
+    seed: np.random.SeedSequence,
+    value_bins: int,
+    delta_bins: int,
+) -> _Kernel:
+    """Counts the state transitions of ``n_markets`` markets over ``n_ticks``."""
+    batch = MarketBatch(
+        [environment] * n_markets,
+        n_goods=n_goods,
+        config=config,
+        rng=np.random.default_rng(seed),
+        history_depth=None,
+    )
+    batch.step_n(burn_in - burn_in // 2)
+    # Fit the grids of every good to the last half of the burn-in
+    pilot = np.concatenate(
+        [
+            np.stack([chunk.stock_values, chunk.stock_deltas]).reshape(2, -1, n_goods)
+            for chunk in stream(batch, n_ticks=max(burn_in // 2, 1))
+        ],
+        axis=1,
+    )
+    low, high = np.quantile(pilot, GRID_QUANTILES, axis=1)
+    steps = (high - low) / np.array([[value_bins], [delta_bins]])
+    (value_low, delta_low), (value_step, delta_step) = low, np.maximum(steps, 1e-9)
+
+    n_states = value_bins * delta_bins * N_MODES
+    offsets = np.arange(n_goods) * n_states
+    total_states = n_goods * n_states
+
+    def states(chunk: Trajectories | MarketBatch) -> NDArray[np.intp]:
+        """Global state numbers of the goods of ``chunk``."""
+        return offsets + _state_number(
+            _bins(chunk.stock_values, value_low, value_step, value_bins),
+            _bins(chunk.stock_deltas, delta_low, delta_step, delta_bins),
+            chunk.stock_modes,
+            delta_bins,
+        )
+
+    previous = states(batch)
+    occupancy = np.zeros(total_states)
+    value_sums = np.zeros(total_states)
+    pairs = np.empty(0, dtype=np.int64)
+    pair_counts = np.empty(0, dtype=np.int64)
+    for chunk in stream(batch, n_ticks=n_ticks, chunk=256):
+        current = states(chunk)
+        origins = np.concatenate([previous[np.newaxis], current[:-1]])
+        chunk_pairs, chunk_counts = np.unique(
+            origins.astype(np.int64) * total_states + current,
+            return_counts=True,
+        )
+        # Merge with the pairs counted so far
+        pairs, inverse = np.unique(
+            np.concatenate([pairs, chunk_pairs]),
+            return_inverse=True,
+        )
+        pair_counts = np.bincount(
+            inverse,
+            weights=np.concatenate([pair_counts, chunk_counts]),
+        ).astype(np.int64)
+        occupancy += np.bincount(current.ravel(), minlength=total_states)
+        value_sums += np.bincount(
+            current.ravel(),
+            weights=chunk.stock_values.ravel(),
+            minlength=total_states,
+        )
+        previous = current[-1]
+
+    origins, targets = np.divmod(pairs, total_states)
+    # States never left in the samples stay where they are, so holding units
+    # there is worth their value and buying is never worth it
+    visited = np.zeros(total_states, dtype=np.bool_)
+    visited[origins] = True
+    unvisited = np.flatnonzero(~visited)
+    origins = np.concatenate([origins, unvisited])
+    targets = np.concatenate([targets, unvisited])
+    pair_counts = np.concatenate([pair_counts, np.ones(len(unvisited), np.int64)])
+    order = np.argsort(origins, kind="stable")
+    origins, targets, pair_counts = origins[order], targets[order], pair_counts[order]
+    visits = np.bincount(origins, weights=pair_counts, minlength=total_states)
+
+    # Unseen states are valued at the center of their value bin
+    centers = value_low + (np.arange(value_bins)[:, np.newaxis] + 0.5) * value_step
+    centers = np.repeat(centers.T, delta_bins * N_MODES, axis=1).ravel()
+    return _Kernel(
+        value_low=value_low,
+        value_step=value_step,
+        delta_low=delta_low,
+        delta_step=delta_step,
+        row_starts=np.searchsorted(origins, np.arange(total_states + 1)),
+        targets=targets,
+        probabilities=pair_counts / visits[origins],
+        state_values=np.where(
+            occupancy > 0,
+            value_sums / np.maximum(occupancy, 1),
+            centers,
+        ),
+        visited=visited,
+    )
+
+
+def _value_iteration(
+    kernel: _Kernel,
+    states: slice,
+    overheads: FloatArray,
+    discount: float,
+    tolerance: float,
+    max_iterations: int,
+) -> tuple[NDArray[np.int8], FloatArray]:
+    """Solves the states of one good for every broker overhead.
+
+    ``V[h]`` is the value of holding ``h`` units per unit of space::
+
+        V[0] = max(discount * E[V[0]], -value * overhead + discount * E[V[1]])
+        V[1] = max(discount * E[V[1]], value + discount * E[V[0]])
+
+    Buying and selling in the same tick is impossible, as in M.buyGood and
+    M.sellGood, since a trade moves to the other holding for the next tick.
+
+    The sweeps stop once the change of the values is the same in every
+    visited state up to ``tolerance``, which fixes the policy long before the
+    values themselves converge; the remaining common offset is then added in
+    closed form (MacQueen's bounds).
+
+    Returns:
+        tuple: Actions and values of shape ``(n_brokers, n_states, 2)``.
+
+    """
+    starts = kernel.row_starts[states.start : states.stop + 1]
+    targets = kernel.targets[starts[0] : starts[-1]] - states.start
+    probabilities = kernel.probabilities[starts[0] : starts[-1], np.newaxis]
+    n_states = states.stop - states.start
+    n_columns = 2 * len(overheads)
+    # Sums over the transitions of every state and column in one bincount
+    origins = np.repeat(np.arange(n_states), np.diff(starts))
+    cells = (origins[:, np.newaxis] * n_columns + np.arange(n_columns)).ravel()
+
+    visited = kernel.visited[states]
+    stock_values = kernel.state_values[states, np.newaxis]
+    buy_prices = -stock_values * overheads
+    # Columns are (holding, broker count), holding-major
+    values = np.zeros((n_states, n_columns))
+    for _ in range(max_iterations):
+        expected = discount * np.bincount(
+            cells,
+            weights=(values[targets] * probabilities).ravel(),
+            minlength=n_states * n_columns,
+        ).reshape(n_states, 2, -1)
+        updated = np.concatenate(
+            [
+                np.maximum(expected[:, 0], buy_prices + expected[:, 1]),
+                np.maximum(expected[:, 1], stock_values + expected[:, 0]),
+            ],
+            axis=1,
+        )
+        change = updated[visited] - values[visited]
+        values = updated
+        low, high = change.min(axis=0), change.max(axis=0)
+        if (high - low).max() < tolerance:
+            values[visited] += discount / (1 - discount) * (low + high) / 2
+            break
+
+    actions = np.full(expected.shape, HOLD, dtype=np.int8)
+    actions[:, 0][buy_prices + expected[:, 1] > expected[:, 0]] = BUY
+    actions[:, 1][stock_values + expected[:, 0] > expected[:, 1]] = SELL
+    return (
+        actions.transpose(2, 0, 1),
+        values.reshape(n_states, 2, -1).transpose(2, 0, 1),
+    )
+
+
+def _state_number(
+    value_bins: NDArray[np.intp],
+    delta_bins: NDArray[np.intp],
+    modes: ArrayLike,
+    n_delta_bins: int,
+) -> NDArray[np.intp]:
+    """Number of a state within the states of its good."""
+    return (value_bins * n_delta_bins + delta_bins) * N_MODES + np.asarray(
+        modes,
+        dtype=np.intp,
+    )
+
+
+def _bins(
+    values: ArrayLike,
+    low: ArrayLike,
+    step: ArrayLike,
+    n_bins: int,
+) -> NDArray[np.intp]:
+    """Index of the uniform bins holding ``values``, clamped to the grid."""
+    position = (np.asarray(values, dtype=np.float64) - low) / step
+    return _clip(position, 0, n_bins - 1).astype(np.intp)
+
+
+def _clip(values: ArrayLike, low: float, high: float) -> NDArray:
+    """``np.clip`` without its dispatch overhead, which dominates small lookups."""
+    return np.minimum(np.maximum(values, low), high)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Solves a trading policy and saves it, returning the exit code."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", type=Path, required=True)
+    parser.add_argument("--min-bank-level", type=int, default=1)
+    parser.add_argument("--max-bank-level", type=int, default=10)
+    parser.add_argument("--max-brokers", type=int, default=20)
+    parser.add_argument("--dragon-boost", type=float, default=0.0)
+    parser.add_argument("--discount", type=float, default=0.99)
+    parser.add_argument("--markets", type=int, default=128)
+    parser.add_argument("--ticks", type=int, default=5000)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    policy = solve_trading_policy(
+        min_bank_level=args.min_bank_level,
+        max_bank_level=args.max_bank_level,
+        max_brokers=args.max_brokers,
+        dragon_boost=args.dragon_boost,
+        discount=args.discount,
+        n_markets=args.markets,
+        n_ticks=args.ticks,
+        seed=args.seed,
+    )
+    policy.save(args.output)
+    print(f"{policy.actions.size} states -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
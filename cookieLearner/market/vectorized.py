@@ -0,0 +1,461 @@
+"""Vectorized counterpart of :func:`cookieLearner.market.market.tick`.
+
+All goods are advanced in one pass over struct-of-arrays state. Every
+mode-dependent branch of the scalar helpers becomes a mask, so the result
+follows the same rules element-wise as calling ``tick`` once per good.
+
+Instead of the variable number of ``random.random()`` calls made by the
+scalar path, each good consumes a fixed block of ``TICK_DRAWS`` uniforms per
+tick. Every random event owns one slot of that block (see the ``DRAW_*``
+constants), so the draw layout does not depend on which branches fire.
+"""
+
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+
+from cookieLearner.market import instrumentation
+from cookieLearner.market.compiled import CompiledConfig
+from cookieLearner.market.market import (
+    MODE_DELTA_DECAY,
+    MODE_DELTA_OFFSET,
+    MODE_DELTA_SCALE,
+    MODE_VALUE_KICK,
+    WEIGHTED_MODES,
+    Mode,
+)
+from cookieLearner.market.randomness import FloatArray, UniformSource
+
+# Weighted random choice as in JS choose([0,1,1,2,2,3,4,5])
+MODE_CHOICES = np.array(WEIGHTED_MODES, dtype=np.int8)
+
+# Coefficients of _apply_mode_tick, gathered by mode code
+DELTA_DECAY_TABLE = np.array(MODE_DELTA_DECAY, dtype=np.float64)
+DELTA_SCALE_TABLE = np.array(MODE_DELTA_SCALE, dtype=np.float64)
+DELTA_OFFSET_TABLE = np.array(MODE_DELTA_OFFSET, dtype=np.float64)
+VALUE_KICK_TABLE = np.array(MODE_VALUE_KICK, dtype=np.float64)
+
+# Draw slots of a single good for a single tick.
+# _apply_mode_tick
+DRAW_MODE_DELTA = 0
+DRAW_MODE_VALUE = 1
+# _maybe_instant_mode_change
+DRAW_INSTANT_GATE = 2
+DRAW_INSTANT_VALUE_PRIMARY = 3
+DRAW_INSTANT_VALUE_SECONDARY = 4
+DRAW_INSTANT_DELTA = 5
+# _apply_fluctuations
+DRAW_FLUCTUATION_VALUE = 6
+DRAW_FLUCTUATION_DELTA = 7
+DRAW_FLUCTUATION_PRIMARY_GATE = 8
+DRAW_FLUCTUATION_PRIMARY = 9
+DRAW_FLUCTUATION_SECONDARY_GATE = 10
+DRAW_FLUCTUATION_SECONDARY = 11
+DRAW_FLUCTUATION_TERTIARY_GATE = 12
+DRAW_FLUCTUATION_TERTIARY = 13
+# _apply_fast_mode_tick, Chaotic and Fast Rise are exclusive and share slots
+DRAW_FAST_PRIMARY_GATE = 14
+DRAW_FAST_PRIMARY_DELTA = 15
+DRAW_FAST_PRIMARY_VALUE = 16
+DRAW_FAST_SECONDARY_GATE = 17
+DRAW_FAST_FALL_GATE = 18
+DRAW_FAST_FALL_DELTA = 19
+DRAW_FAST_FALL_VALUE = 20
+# _update_expired_mode
+DRAW_EXPIRY_DURATION = 21
+DRAW_EXPIRY_DRAGON_GATE = 22
+DRAW_EXPIRY_DRAGON_CHAOTIC = 23
+DRAW_EXPIRY_FAST_CHAOTIC = 24
+DRAW_EXPIRY_CHOICE = 25
+
+TICK_DRAWS = 26
+
+type ModeArray = NDArray[np.int8]
+type DurationArray = NDArray[np.int64]
+
+
+def tick_batch(
+    stock_values: ArrayLike,
+    stock_deltas: ArrayLike,
+    stock_modes: ArrayLike,
+    remaining_mode_durations: ArrayLike,
+    global_delta: ArrayLike,
+    instant_mode_change_probability: ArrayLike,
+    compiled: CompiledConfig,
+    rng: UniformSource | None = None,
+    uniforms: FloatArray | None = None,
+) -> tuple[FloatArray, FloatArray, ModeArray, DurationArray]:
+    """Advances every good by one tick.
+
+    The per-good arguments are arrays of a common shape, e.g. ``(n_goods,)``.
+    ``global_delta`` and ``instant_mode_change_probability`` may be scalars or
+    arrays broadcastable to that shape, as may the fields of ``compiled``.
+    Modes are :class:`Mode` codes.
+
+    Args:
+        stock_values: Current stock values.
+        stock_deltas: Current stock deltas.
+        stock_modes: Current mode codes.
+        remaining_mode_durations: Ticks left in the current mode.
+        global_delta: Global delta drawn for this tick, zero if none.
+        instant_mode_change_probability: Chance of an instant mode change.
+        compiled: Simulation parameters compiled for the game environment.
+        rng: Source of the uniforms, a fresh generator if omitted.
+        uniforms: Pre-drawn uniforms of shape ``(TICK_DRAWS, *shape)``.
+            Takes precedence over ``rng``.
+
+    Returns:
+        tuple: New stock values, deltas, mode codes and remaining durations.
+
+    """
+    stock_values = np.asarray(stock_values, dtype=np.float64)
+    stock_deltas = np.asarray(stock_deltas, dtype=np.float64)
+    stock_modes = np.asarray(stock_modes, dtype=np.int8)
+    remaining_mode_durations = np.asarray(remaining_mode_durations, dtype=np.int64)
+
+    if uniforms is None:
+        rng = np.random.default_rng() if rng is None else rng
+        uniforms = rng.random((TICK_DRAWS, *stock_values.shape))
+
+    # Read once, so ticks pay a single lookup while instrumentation is off
+    profile = instrumentation.active_profile()
+    if profile is not None:
+        profile.start()
+        initial_modes = stock_modes
+
+    stock_deltas = stock_deltas * 0.97 + compiled.delta_drift
+
+    stock_values, stock_deltas = _apply_mode_tick_batch(
+        stock_values,
+        stock_deltas,
+        compiled.resting_stock_values,
+        stock_modes,
+        uniforms,
+    )
+    if profile is not None:
+        profile.lap("mode_tick")
+
+    stock_values, stock_deltas, remaining_mode_durations = (
+        _maybe_instant_mode_change_batch(
+            global_delta,
+            instant_mode_change_probability,
+            stock_values,
+            stock_deltas,
+            remaining_mode_durations,
+            uniforms,
+        )
+    )
+    if profile is not None:
+        profile.lap("instant_mode_change")
+
+    stock_values, stock_deltas = _apply_fluctuations_batch(
+        stock_values,
+        stock_deltas,
+        uniforms,
+        compiled,
+    )
+    if profile is not None:
+        profile.lap("fluctuations")
+
+    stock_values, stock_deltas, stock_modes = _apply_fast_mode_tick_batch(
+        stock_values,
+        stock_deltas,
+        stock_modes,
+        uniforms,
+        compiled,
+    )
+    if profile is not None:
+        profile.lap("fast_mode_tick")
+
+    stock_deltas = _apply_high_stock_value_dampening_batch(
+        stock_values,
+        stock_deltas,
+        compiled,
+    )
+
+    stock_values = stock_values + stock_deltas
+
+    stock_values, stock_deltas = _apply_low_stock_value_dampening_batch(
+        stock_values,
+        stock_deltas,
+        compiled,
+    )
+    if profile is not None:
+        profile.lap("dampening")
+
+    remaining_mode_durations = remaining_mode_durations - 1
+    expired = remaining_mode_durations <= 0
+    new_modes, new_durations = _update_expired_mode_batch(
+        stock_modes,
+        uniforms,
+        compiled,
+    )
+    stock_modes = np.where(expired, new_modes, stock_modes)
+    remaining_mode_durations = np.where(
+        expired,
+        new_durations,
+        remaining_mode_durations,
+    )
+    if profile is not None:
+        profile.lap("mode_expiry")
+        _count_events(
+            profile,
+            initial_modes,
+            stock_values,
+            stock_modes,
+            global_delta,
+            instant_mode_change_probability,
+            uniforms,
+            compiled,
+        )
+
+    return stock_values, stock_deltas, stock_modes, remaining_mode_durations
+
+
+def _count_events(
+    profile: instrumentation.TickProfile,
+    initial_modes: ModeArray,
+    stock_values: FloatArray,
+    stock_modes: ModeArray,
+    global_delta: ArrayLike,
+    instant_mode_change_probability: ArrayLike,
+    uniforms: FloatArray,
+    compiled: CompiledConfig,
+) -> None:
+    """Adds the counters of one instrumented tick to ``profile``."""
+    profile.ticks += 1
+    profile.good_ticks += stock_values.size
+    profile.global_delta_events += np.count_nonzero(global_delta)
+    profile.instant_mode_changes += np.count_nonzero(
+        (np.asarray(global_delta) != 0)
+        & (uniforms[DRAW_INSTANT_GATE] < instant_mode_change_probability),
+    )
+    profile.min_stock_value_hits += np.count_nonzero(
+        stock_values == compiled.min_stock_value,
+    )
+    profile.count_transitions(initial_modes, stock_modes)
+
+
+def _apply_mode_tick_batch(
+    stock_values: FloatArray,
+    stock_deltas: FloatArray,
+    resting_stock_values: ArrayLike,
+    modes: ModeArray,
+    uniforms: FloatArray,
+) -> tuple[FloatArray, FloatArray]:
+    """Vectorized ``_apply_mode_tick``, gathering the coefficients by mode."""
+    modes = modes.astype(np.intp)
+    stock_deltas = stock_deltas * DELTA_DECAY_TABLE[modes] + DELTA_SCALE_TABLE[
+        modes
+    ] * (uniforms[DRAW_MODE_DELTA] - DELTA_OFFSET_TABLE[modes])
+    stock_values = stock_values + VALUE_KICK_TABLE[modes] * uniforms[DRAW_MODE_VALUE]
+
+    stock_values = stock_values + (resting_stock_values - stock_values) * 0.01
+
+    return stock_values, stock_deltas
+
+
+def _maybe_instant_mode_change_batch(
+    global_delta: ArrayLike,
+    instant_mode_change_probability: ArrayLike,
+    stock_values: FloatArray,
+    stock_deltas: FloatArray,
+    remaining_mode_durations: DurationArray,
+    uniforms: FloatArray,
+) -> tuple[FloatArray, FloatArray, DurationArray]:
+    """Vectorized ``_maybe_instant_mode_change``."""
+    changed = (np.asarray(global_delta) != 0) & (
+        uniforms[DRAW_INSTANT_GATE] < instant_mode_change_probability
+    )
+
+    # Cubes are spelled out: NumPy's SIMD power may differ from libm in the
+    # last bit, which would break bitwise agreement with the Numba kernel
+    primary = uniforms[DRAW_INSTANT_VALUE_PRIMARY]
+    secondary = uniforms[DRAW_INSTANT_VALUE_SECONDARY]
+    new_values = (
+        stock_values
+        - (1 + stock_deltas * (primary * primary * primary) * 7) * global_delta
+    )
+    new_values -= global_delta * (1 + secondary * secondary * secondary * 7)
+    new_deltas = stock_deltas + global_delta * (1 + uniforms[DRAW_INSTANT_DELTA] * 4)
+
+    return (
+        np.where(changed, new_values, stock_values),
+        np.where(changed, new_deltas, stock_deltas),
+        np.where(changed, 0, remaining_mode_durations),
+    )
+
+
+def _apply_fluctuations_batch(
+    stock_values: FloatArray,
+    stock_deltas: FloatArray,
+    uniforms: FloatArray,
+    compiled: CompiledConfig,
+) -> tuple[FloatArray, FloatArray]:
+    """Vectorized ``_apply_fluctuations``."""
+    stock_values = stock_values + (uniforms[DRAW_FLUCTUATION_VALUE] - 0.5) ** 2 * 3
+    stock_deltas = stock_deltas + 0.1 * (uniforms[DRAW_FLUCTUATION_DELTA] - 0.5)
+
+    stock_values = np.where(
+        uniforms[DRAW_FLUCTUATION_PRIMARY_GATE]
+        < compiled.fluctuation_probability_primary,
+        stock_values
+        + (uniforms[DRAW_FLUCTUATION_PRIMARY] - 0.5)
+        * compiled.fluctuation_range_primary,
+        stock_values,
+    )
+    stock_values = np.where(
+        uniforms[DRAW_FLUCTUATION_SECONDARY_GATE]
+        < compiled.fluctuation_probability_secondary,
+        stock_values
+        + (uniforms[DRAW_FLUCTUATION_SECONDARY] - 0.5)
+        * compiled.fluctuation_range_secondary,
+        stock_values,
+    )
+    stock_deltas = np.where(
+        uniforms[DRAW_FLUCTUATION_TERTIARY_GATE]
+        < compiled.fluctuation_probability_tertiary,
+        stock_deltas
+        + (uniforms[DRAW_FLUCTUATION_TERTIARY] - 0.5)
+        * compiled.fluctuation_range_tertiary,
+        stock_deltas,
+    )
+
+    return stock_values, stock_deltas
+
+
+def _apply_fast_mode_tick_batch(
+    stock_values: FloatArray,
+    stock_deltas: FloatArray,
+    modes: ModeArray,
+    uniforms: FloatArray,
+    compiled: CompiledConfig,
+) -> tuple[FloatArray, FloatArray, ModeArray]:
+    """Vectorized ``_apply_fast_mode_tick``."""
+    chaotic = modes == Mode.CHAOTIC
+    stock_values = np.where(
+        chaotic
+        & (
+            uniforms[DRAW_FAST_PRIMARY_GATE]
+            < compiled.fast_mode_tick_chaotic_probability_primary
+        ),
+        stock_values + (uniforms[DRAW_FAST_PRIMARY_VALUE] - 0.5) * 10,
+        stock_values,
+    )
+    stock_deltas = np.where(
+        chaotic
+        & (
+            uniforms[DRAW_FAST_SECONDARY_GATE]
+            < compiled.fast_mode_tick_chaotic_probability_secondary
+        ),
+        (uniforms[DRAW_FAST_PRIMARY_DELTA] - 0.5) * compiled.chaotic_delta_range,
+        stock_deltas,
+    )
+
+    fast_rise = modes == Mode.FAST_RISE
+    rising = fast_rise & (
+        uniforms[DRAW_FAST_PRIMARY_GATE] < compiled.fast_mode_tick_fast_rise_probability
+    )
+    stock_deltas = np.where(
+        rising,
+        stock_deltas + (uniforms[DRAW_FAST_PRIMARY_DELTA] - 0.5) * 0.1,
+        stock_deltas,
+    )
+    stock_values = np.where(
+        rising,
+        stock_values + (uniforms[DRAW_FAST_PRIMARY_VALUE] - 0.7) * 10,
+        stock_values,
+    )
+    modes = np.where(
+        fast_rise
+        & (
+            uniforms[DRAW_FAST_SECONDARY_GATE]
+            < compiled.fast_mode_tick_fast_rise_to_fast_fall_probability
+        ),
+        np.int8(Mode.FAST_FALL),
+        modes,
+    )
+
+    falling = (modes == Mode.FAST_FALL) & (
+        uniforms[DRAW_FAST_FALL_GATE] < compiled.fast_mode_tick_fast_fall_probability
+    )
+    stock_deltas = np.where(
+        falling,
+        stock_deltas + (uniforms[DRAW_FAST_FALL_DELTA] - 0.5) * 0.1,
+        stock_deltas,
+    )
+    stock_values = np.where(
+        falling,
+        stock_values + (uniforms[DRAW_FAST_FALL_VALUE] - 0.3) * 10,
+        stock_values,
+    )
+
+    return stock_values, stock_deltas, modes
+
+
+def _update_expired_mode_batch(
+    modes: ModeArray,
+    uniforms: FloatArray,
+    compiled: CompiledConfig,
+) -> tuple[ModeArray, DurationArray]:
+    """Vectorized ``_update_expired_mode``, evaluated for every good.
+
+    The caller selects the result for the goods whose mode actually expired.
+    """
+    durations = np.trunc(
+        compiled.duration_min + uniforms[DRAW_EXPIRY_DURATION] * compiled.duration_span,
+    ).astype(np.int64)
+
+    # Higher Chance of Chaotic mode if dragon_boost is high
+    # or if the mode was in Fast Rise or Fast Fall.
+    to_chaotic = (
+        (uniforms[DRAW_EXPIRY_DRAGON_GATE] < compiled.dragon_boost)
+        & (
+            uniforms[DRAW_EXPIRY_DRAGON_CHAOTIC]
+            < compiled.chaotic_probability_with_dragon_boost
+        )
+    ) | (
+        (
+            uniforms[DRAW_EXPIRY_FAST_CHAOTIC]
+            < compiled.chaotic_probability_after_fast_mode
+        )
+        & ((modes == Mode.FAST_RISE) | (modes == Mode.FAST_FALL))
+    )
+    choices = MODE_CHOICES[
+        (uniforms[DRAW_EXPIRY_CHOICE] * len(MODE_CHOICES)).astype(np.intp)
+    ]
+
+    return np.where(to_chaotic, np.int8(Mode.CHAOTIC), choices), durations
+
+
+def _apply_high_stock_value_dampening_batch(
+    stock_values: FloatArray,
+    stock_deltas: FloatArray,
+    compiled: CompiledConfig,
+) -> FloatArray:
+    """Vectorized ``_apply_high_stock_value_dampening``."""
+    return np.where(
+        (stock_values > compiled.high_stock_value_threshold) & (stock_deltas > 0),
+        stock_deltas * compiled.high_stock_value_dampening,
+        stock_deltas,
+    )
+
+
+def _apply_low_stock_value_dampening_batch(
+    stock_values: FloatArray,
+    stock_deltas: FloatArray,
+    compiled: CompiledConfig,
+) -> tuple[FloatArray, FloatArray]:
+    """Vectorized ``_apply_low_stock_value_dampening``."""
+    stock_values = np.where(
+        stock_values < compiled.low_stock_value_threshold,
+        stock_values + (compiled.low_stock_value_threshold - stock_values) * 0.5,
+        stock_values,
+    )
+    stock_deltas = np.where(
+        (stock_values < compiled.low_stock_value_threshold) & (stock_deltas < 0),
+        stock_deltas * compiled.low_stock_value_delta_dampening,
+        stock_deltas,
+    )
+    stock_values = np.maximum(stock_values, compiled.min_stock_value)
+
+    return stock_values, stock_deltas
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from cookieLearner.market.batch import RESET_WARMUP_TICKS, MarketBatch
+from cookieLearner.market.market import GameEnvironment, Mode
+from cookieLearner.market.randomness import CounterStreams
+
+ENVIRONMENTS = [
+    GameEnvironment(bank_level=1, num_brokers=0, dragon_boost=0.0),
+    GameEnvironment(bank_level=8, num_brokers=3, dragon_boost=0.5),
+    GameEnvironment(bank_level=4, num_brokers=1, dragon_boost=1.0),
+    GameEnvironment(bank_level=2, num_brokers=0, dragon_boost=0.2),
+]
+STATE_FIELDS = (
+    "stock_values",
+    "stock_deltas",
+    "stock_modes",
+    "remaining_mode_durations",
+)
+N_TICKS = 200
+
+
+def test_state_stays_in_range() -> None:
+    batch = MarketBatch(ENVIRONMENTS, seed=0)
+    stock_values = batch.stock_values
+    batch.step_n(N_TICKS)
+
+    # Steps write into the same arrays
+    assert stock_values is batch.stock_values
+    assert batch.ticks == RESET_WARMUP_TICKS + N_TICKS
+    assert np.all(batch.stock_values >= batch.config.min_stock_value)
+    assert np.all((batch.stock_modes >= 0) & (batch.stock_modes < len(Mode)))
+    np.testing.assert_array_equal(batch.history.window()[-1], batch.stock_values)
+
+
+def test_markets_do_not_depend_on_their_batch() -> None:
+    batch = MarketBatch(ENVIRONMENTS, streams=CounterStreams(2))
+    shard = MarketBatch(
+        ENVIRONMENTS[2:],
+        streams=CounterStreams(2),
+        market_ids=[2, 3],
+    )
+    batch.step_n(N_TICKS)
+    shard.step_n(N_TICKS)
+
+    for field in STATE_FIELDS:
+        np.testing.assert_array_equal(getattr(shard, field), getattr(batch, field)[2:])
+
+
+def test_reset_markets_leaves_the_others_alone() -> None:
+    batch = MarketBatch(ENVIRONMENTS, seed=1)
+    batch.step_n(N_TICKS)
+    before = [getattr(batch, field).copy() for field in STATE_FIELDS]
+
+    batch.reset_markets([False, True, False, True])
+
+    for field, previous in zip(STATE_FIELDS, before, strict=True):
+        np.testing.assert_array_equal(getattr(batch, field)[::2], previous[::2])
+    assert not np.array_equal(batch.stock_values[1::2], before[0][1::2])
+    # The history of a reset market is its current value at every tick
+    np.testing.assert_array_equal(
+        batch.history.window()[:, 1::2] - batch.stock_values[1::2],
+        0.0,
+    )
+    assert batch.ticks == RESET_WARMUP_TICKS + N_TICKS
+
+
+def test_reset_markets_needs_an_rng() -> None:
+    batch = MarketBatch(ENVIRONMENTS, streams=CounterStreams(2))
+
+    with pytest.raises(ValueError, match="counter-based streams"):
+        batch.reset_markets([0])
+
+
+@pytest.mark.parametrize("market", range(len(ENVIRONMENTS)))
+def test_environment_round_trips(market: int) -> None:
+    assert MarketBatch(ENVIRONMENTS, seed=0).environment(market) == ENVIRONMENTS[market]
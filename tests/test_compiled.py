@@ -0,0 +1,50 @@
+from dataclasses import fields
+
+import numpy as np
+import pytest
+
+from cookieLearner.market.compiled import CompiledConfig
+from cookieLearner.market.market import (
+    Config,
+    GameEnvironment,
+    resting_stock_value,
+)
+
+CONFIG = Config(duration_max_dragon_boost=1)
+ENVIRONMENTS = [
+    GameEnvironment(bank_level=1, num_brokers=0, dragon_boost=0.0),
+    GameEnvironment(bank_level=9, num_brokers=4, dragon_boost=0.75),
+]
+N_GOODS = 4
+
+
+@pytest.mark.parametrize("market", range(len(ENVIRONMENTS)))
+def test_batch_rows_match_single_markets(market: int) -> None:
+    batch = CompiledConfig.from_environments(CONFIG, ENVIRONMENTS, N_GOODS)
+    single = CompiledConfig.from_config(CONFIG, ENVIRONMENTS[market], N_GOODS)
+
+    for field in fields(CompiledConfig):
+        row = np.asarray(getattr(batch, field.name))
+        if row.ndim:
+            row = row[market]
+        np.testing.assert_array_equal(
+            np.squeeze(row),
+            getattr(single, field.name),
+            err_msg=field.name,
+        )
+
+
+def test_terms_fold_the_environment() -> None:
+    environment = ENVIRONMENTS[1]
+    compiled = CompiledConfig.from_config(CONFIG, environment, N_GOODS)
+
+    np.testing.assert_array_equal(
+        compiled.resting_stock_values,
+        [
+            resting_stock_value(good, environment.bank_level, CONFIG)
+            for good in range(N_GOODS)
+        ],
+    )
+    assert compiled.high_stock_value_threshold == 100 + 8 * 3
+    assert compiled.chaotic_delta_range == 2 + 6 * environment.dragon_boost
+    assert compiled.duration_span == CONFIG.duration_max - 200
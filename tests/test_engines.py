@@ -0,0 +1,194 @@
+from collections.abc import Callable
+
+import numpy as np
+import pytest
+
+from cookieLearner.market import kernels
+from cookieLearner.market.compiled import CompiledConfig
+from cookieLearner.market.market import DEFAULT_CONFIG, GameEnvironment, Mode
+from cookieLearner.market.scalar_engine import tick_goods
+from cookieLearner.market.vectorized import (
+    DRAW_FAST_SECONDARY_GATE,
+    DRAW_INSTANT_GATE,
+    TICK_DRAWS,
+    tick_batch,
+)
+
+try:
+    import jax
+
+    from cookieLearner.market import jax_engine
+except ModuleNotFoundError:
+    jax = None
+
+ENVIRONMENTS = [
+    GameEnvironment(bank_level=1, num_brokers=0, dragon_boost=0.0),
+    GameEnvironment(bank_level=6, num_brokers=3, dragon_boost=0.4),
+    GameEnvironment(bank_level=2, num_brokers=0, dragon_boost=1.0),
+]
+N_GOODS = 300
+# One market without a global delta, two with one so instant changes happen
+GLOBAL_DELTA = np.array([[0.0], [0.7], [-0.4]])
+INSTANT_MODE_CHANGE_PROBABILITY = np.array([[0.9], [0.5], [0.3]])
+
+State = tuple[np.ndarray, ...]
+Engine = Callable[..., State]
+
+
+@pytest.fixture(scope="module")
+def compiled() -> CompiledConfig:
+    return CompiledConfig.from_environments(DEFAULT_CONFIG, ENVIRONMENTS, N_GOODS)
+
+
+@pytest.fixture(scope="module")
+def draws() -> tuple[State, np.ndarray]:
+    """Goods around the value thresholds and close to expiring, in every mode."""
+    rng = np.random.default_rng(8)
+    shape = (len(ENVIRONMENTS), N_GOODS)
+    state = (
+        rng.uniform(1, 150, shape),
+        rng.uniform(-2, 2, shape),
+        rng.integers(len(Mode), size=shape, dtype=np.int8),
+        rng.integers(-1, 4, size=shape),
+    )
+    return state, rng.random((TICK_DRAWS, *shape))
+
+
+def test_draws_take_every_branch(draws: tuple[State, np.ndarray]) -> None:
+    (_, _, modes, durations), uniforms = draws
+
+    instant_changes = (GLOBAL_DELTA != 0) & (
+        uniforms[DRAW_INSTANT_GATE] < INSTANT_MODE_CHANGE_PROBABILITY
+    )
+    fast_rise_to_fast_fall = (modes == Mode.FAST_RISE) & (
+        uniforms[DRAW_FAST_SECONDARY_GATE]
+        < DEFAULT_CONFIG.fast_mode_tick_fast_rise_to_fast_fall_probability
+    )
+    assert instant_changes.any()
+    assert fast_rise_to_fast_fall.any()
+    assert (durations <= 1).any()
+    assert (durations > 1).any()
+
+
+def scalar_tick_goods(
+    *state: np.ndarray,
+    global_delta: np.ndarray,
+    instant_mode_change_probability: np.ndarray,
+    compiled: CompiledConfig,  # noqa: ARG001
+    uniforms: np.ndarray,
+) -> State:
+    rows = []
+    for market, environment in enumerate(ENVIRONMENTS):
+        lists = [field[market].tolist() for field in state]
+        tick_goods(
+            *lists,
+            float(global_delta[market, 0]),
+            float(instant_mode_change_probability[market, 0]),
+            CompiledConfig.from_config(DEFAULT_CONFIG, environment, N_GOODS),
+            memoryview(np.ascontiguousarray(uniforms[:, market])),
+        )
+        rows.append(lists)
+    return tuple(
+        np.array(field, dtype=dtype)
+        for field, dtype in zip(
+            zip(*rows, strict=True),
+            (np.float64, np.float64, np.int8, np.int64),
+            strict=True,
+        )
+    )
+
+
+def jax_tick_goods(
+    *state: np.ndarray,
+    global_delta: np.ndarray,
+    instant_mode_change_probability: np.ndarray,
+    compiled: CompiledConfig,
+    uniforms: np.ndarray,
+) -> State:
+    rows = []
+    # Double precision, so that the engines take the same branches. Compiled
+    # float32 computations of earlier tests would be reused without clearing.
+    jax.clear_caches()
+    with jax.enable_x64(new_val=True):
+        for market, environment in enumerate(ENVIRONMENTS):
+            market_state = jax_engine.MarketState(
+                *(field[market] for field in state),
+                resting_stock_values=compiled.resting_stock_values[market],
+                bank_level=np.int64(environment.bank_level),
+                dragon_boost=np.float64(environment.dragon_boost),
+            )
+            advanced = jax_engine.tick_goods(
+                market_state,
+                global_delta[market, 0],
+                instant_mode_change_probability[market, 0],
+                uniforms[:, market],
+            )
+            rows.append([np.asarray(field) for field in advanced[: len(state)]])
+    return tuple(np.stack(field) for field in zip(*rows, strict=True))
+
+
+def numba_tick_goods(
+    *state: np.ndarray,
+    global_delta: np.ndarray,
+    instant_mode_change_probability: np.ndarray,
+    compiled: CompiledConfig,
+    uniforms: np.ndarray,
+) -> State:
+    # The kernel is the Numba engine whenever numba is installed
+    return kernels.tick_kernel(
+        *state,
+        global_delta,
+        instant_mode_change_probability,
+        compiled,
+        uniforms=uniforms,
+    )
+
+
+@pytest.mark.parametrize(
+    ("engine", "rtol"),
+    [
+        pytest.param(scalar_tick_goods, 0.0, id="scalar"),
+        pytest.param(
+            jax_tick_goods,
+            1e-12,
+            id="jax",
+            marks=pytest.mark.skipif(jax is None, reason="jax is not installed"),
+        ),
+        pytest.param(
+            numba_tick_goods,
+            0.0,
+            id="numba",
+            marks=pytest.mark.skipif(
+                not kernels.NUMBA_AVAILABLE,
+                reason="numba is not installed",
+            ),
+        ),
+    ],
+)
+def test_engine_matches_tick_batch(
+    engine: Engine,
+    rtol: float,
+    compiled: CompiledConfig,
+    draws: tuple[State, np.ndarray],
+) -> None:
+    state, uniforms = draws
+    expected = tick_batch(
+        *state,
+        GLOBAL_DELTA,
+        INSTANT_MODE_CHANGE_PROBABILITY,
+        compiled,
+        uniforms=uniforms,
+    )
+    actual = engine(
+        *(field.copy() for field in state),
+        global_delta=GLOBAL_DELTA,
+        instant_mode_change_probability=INSTANT_MODE_CHANGE_PROBABILITY,
+        compiled=compiled,
+        uniforms=uniforms,
+    )
+
+    values, deltas, modes, durations = actual
+    np.testing.assert_allclose(values, expected[0], rtol=rtol)
+    np.testing.assert_allclose(deltas, expected[1], rtol=rtol)
+    np.testing.assert_array_equal(modes, expected[2])
+    np.testing.assert_array_equal(durations, expected[3])
@@ -0,0 +1,180 @@
+import numpy as np
+import pytest
+
+from cookieLearner.market.env import MarketEnv, VectorMarketEnv
+from cookieLearner.market.market import GameEnvironment
+from cookieLearner.market.trading import (
+    LAST_BOUGHT,
+    LAST_NONE,
+    LAST_SOLD,
+    MAX_QUANTITY,
+    buy_cost,
+    buy_quantity,
+    sell_quantity,
+)
+
+ENVIRONMENT = GameEnvironment(bank_level=2, num_brokers=3, dragon_boost=0.0)
+N_GOODS = 5
+MAX_STOCK = 40
+CPS = 3.0
+STARTING_COOKIES = 100_000.0
+EPISODE_TICKS = 6
+SEED = 9
+# Units a bank of 2.5 unit prices affords
+AFFORDABLE = 2
+VECTOR_ENVIRONMENTS = [
+    ENVIRONMENT,
+    GameEnvironment(bank_level=5, num_brokers=0, dragon_boost=0.5),
+    GameEnvironment(bank_level=1, num_brokers=10, dragon_boost=0.0),
+]
+VECTOR_STARTING_COOKIES = np.array([100_000.0, 500.0, 20_000.0])
+
+
+def make_env(**kwargs: float) -> MarketEnv:
+    env = MarketEnv(
+        ENVIRONMENT,
+        max_stock=MAX_STOCK,
+        n_goods=N_GOODS,
+        cookies_ps_raw_highest=CPS,
+        starting_cookies=kwargs.get("starting_cookies", STARTING_COOKIES),
+        episode_ticks=EPISODE_TICKS,
+        seed=SEED,
+    )
+    env.reset()
+    return env
+
+
+def test_observation_is_reused_and_reward_is_net_worth_change() -> None:
+    env = make_env()
+    observation = env.observation
+    action = np.array([MAX_QUANTITY, 2, 0, -1, 0])
+
+    for step in range(1, EPISODE_TICKS + 1):
+        net_worth = env.net_worth
+        returned, reward, terminated, truncated, info = env.step(action)
+        action = -action
+
+        assert returned is observation
+        assert reward == pytest.approx(env.net_worth - net_worth, abs=1e-12)
+        assert not terminated
+        assert truncated == (step == EPISODE_TICKS)
+        np.testing.assert_array_equal(observation[:N_GOODS], env.stock_values)
+        np.testing.assert_array_equal(
+            observation[N_GOODS : 2 * N_GOODS],
+            env.stock_deltas,
+        )
+        np.testing.assert_array_equal(observation[2 * N_GOODS : -1], env.stock)
+        assert observation[-1] == env.bank
+        assert (info["cookies"], info["profit"]) == (env.cookies, env.profit)
+
+
+def test_reset_with_a_seed_replays_the_episode() -> None:
+    env = make_env()
+    first = env.observation.copy()
+    env.step([1] * N_GOODS)
+
+    env.reset(seed=SEED)
+
+    np.testing.assert_array_equal(env.observation, first)
+    assert (env.stock, env.cookies, env.profit) == ([0] * N_GOODS, STARTING_COOKIES, 0)
+
+
+def test_buys_are_capped_by_space_and_bank() -> None:
+    env = make_env()
+    cost = buy_cost(env.stock_values[0], CPS, env.overhead)
+
+    assert env.buy(0, MAX_STOCK + 5)
+    assert env.stock[0] == MAX_STOCK
+    assert env.cookies == pytest.approx(STARTING_COOKIES - cost * MAX_STOCK)
+    assert not env.buy(0, 1)
+
+    poor = make_env(starting_cookies=cost * (AFFORDABLE + 0.5))
+    assert not poor.buy(0, 3)
+    assert poor.buy(0, MAX_QUANTITY)
+    assert poor.stock[0] == AFFORDABLE
+
+
+def test_trades_lock_the_other_side_until_the_next_tick() -> None:
+    env = make_env()
+    assert env.buy(0, 4)
+    assert not env.sell(0, 1)
+
+    env.step([0] * N_GOODS)
+    assert env.sell(0, MAX_QUANTITY)
+    assert not env.buy(0, 1)
+    assert (env.stock[0], env.last[0]) == (0, LAST_SOLD)
+
+    env.step([0] * N_GOODS)
+    assert env.last[0] == LAST_NONE
+
+
+def test_rules_agree_on_scalars_and_arrays() -> None:
+    rng = np.random.default_rng(SEED)
+    quantity = rng.choice([0, 1, 7, 30, MAX_QUANTITY], size=200)
+    stock = rng.integers(0, 20, size=200)
+    last = rng.choice([LAST_NONE, LAST_BOUGHT, LAST_SOLD], size=200)
+    cost = buy_cost(rng.uniform(1, 150, size=200), CPS, 1.1)
+    cookies = rng.uniform(0, 3000, size=200)
+
+    bought = buy_quantity(quantity, cost, cookies, MAX_STOCK - stock, last)
+    sold = sell_quantity(quantity, stock, last)
+
+    assert bought.any()
+    assert sold.any()
+    for i in range(quantity.shape[0]):
+        assert (
+            buy_quantity(
+                int(quantity[i]),
+                float(cost[i]),
+                float(cookies[i]),
+                MAX_STOCK - int(stock[i]),
+                int(last[i]),
+            )
+            == bought[i]
+        )
+        assert sell_quantity(int(quantity[i]), int(stock[i]), int(last[i])) == sold[i]
+    assert not bought[last == LAST_SOLD].any()
+    assert not sold[last == LAST_BOUGHT].any()
+    assert (bought * cost <= cookies).all()
+
+
+def make_vector_env() -> VectorMarketEnv:
+    env = VectorMarketEnv(
+        VECTOR_ENVIRONMENTS,
+        max_stock=MAX_STOCK,
+        n_goods=N_GOODS,
+        cookies_ps_raw_highest=CPS,
+        starting_cookies=VECTOR_STARTING_COOKIES,
+        episode_ticks=EPISODE_TICKS,
+        seed=SEED,
+    )
+    env.reset()
+    return env
+
+
+def test_vector_env_steps_and_resets_markets_in_place() -> None:
+    env = make_vector_env()
+    observation = env.observation
+    rng = np.random.default_rng(SEED)
+    steps_holding_stock = 0
+
+    for step in range(1, 2 * EPISODE_TICKS + 1):
+        action = rng.choice([-MAX_QUANTITY, -1, 0, 3, MAX_QUANTITY], env.stock.shape)
+        net_worth = env.net_worth
+        returned, rewards, terminated, truncated, info = env.step(action)
+        done = step % EPISODE_TICKS == 0
+
+        assert returned is observation
+        assert not terminated.any()
+        np.testing.assert_array_equal(truncated, done)
+        np.testing.assert_array_equal(observation[:, 2 * N_GOODS : -1], env.stock)
+        np.testing.assert_allclose(observation[:, -1], env.cookies / CPS)
+        assert info["cookies"] is env.cookies
+        if done:
+            np.testing.assert_array_equal(env.stock, 0)
+            np.testing.assert_array_equal(env.cookies, VECTOR_STARTING_COOKIES)
+            np.testing.assert_array_equal(env.steps, 0)
+        else:
+            np.testing.assert_allclose(rewards, env.net_worth - net_worth, atol=1e-9)
+            steps_holding_stock += env.stock.any()
+    assert steps_holding_stock
@@ -0,0 +1,88 @@
+import threading
+
+import numpy as np
+import pytest
+
+from cookieLearner.market.batch import MarketBatch
+from cookieLearner.market.feed import stream
+from cookieLearner.market.market import GameEnvironment
+from cookieLearner.market.trajectories import Trajectories, record_ticks
+
+ENVIRONMENTS = [
+    GameEnvironment(bank_level=3, num_brokers=0, dragon_boost=0.0),
+    GameEnvironment(bank_level=8, num_brokers=1, dragon_boost=0.5),
+]
+N_GOODS = 4
+CHUNK = 6
+N_TICKS = 40
+PREFETCH = 2
+SEED = 21
+
+
+def make_batch() -> MarketBatch:
+    return MarketBatch(ENVIRONMENTS, n_goods=N_GOODS, history_depth=None, seed=SEED)
+
+
+def expected_run() -> Trajectories:
+    batch = make_batch()
+    run = Trajectories.empty_like(N_TICKS, batch)
+    record_ticks(batch, run)
+    return run
+
+
+@pytest.mark.parametrize("prefetch", [0, PREFETCH])
+def test_feed_yields_every_tick_in_order(prefetch: int) -> None:
+    chunks = [
+        Trajectories(*(column.copy() for column in chunk))
+        for chunk in stream(make_batch(), CHUNK, N_TICKS, prefetch=prefetch)
+    ]
+
+    full, rest = divmod(N_TICKS, CHUNK)
+    assert [chunk.n_ticks for chunk in chunks] == [CHUNK] * full + [rest]
+    for column, expected in zip(zip(*chunks, strict=True), expected_run(), strict=True):
+        np.testing.assert_array_equal(np.concatenate(column), expected)
+
+
+def test_feed_reuses_one_buffer_without_prefetch() -> None:
+    feed = stream(make_batch(), CHUNK, N_TICKS)
+    first = next(feed)
+    values = first.stock_values.copy()
+
+    second = next(feed)
+
+    assert np.shares_memory(first.stock_values, second.stock_values)
+    assert not np.array_equal(first.stock_values, values)
+
+
+def test_prefetched_feed_cycles_a_ring_of_buffers() -> None:
+    # Queued chunks, the held one and the one being filled
+    ring = PREFETCH + 2
+    bases = [
+        chunk.stock_values.base
+        for chunk in stream(make_batch(), CHUNK, N_TICKS, prefetch=PREFETCH)
+    ]
+
+    assert len({id(base) for base in bases}) == ring
+    assert all(bases[i] is bases[i + ring] for i in range(len(bases) - ring))
+    assert all(bases[i] is not bases[i + 1] for i in range(len(bases) - 1))
+
+
+def test_closing_an_endless_feed_stops_the_producer() -> None:
+    feed = stream(make_batch(), CHUNK, prefetch=PREFETCH)
+    next(feed)
+
+    feed.close()
+
+    assert not any(thread.name == "market-feed" for thread in threading.enumerate())
+
+
+def test_producer_errors_reach_the_consumer() -> None:
+    batch = make_batch()
+    error = RuntimeError("market failed")
+
+    def fail() -> None:
+        raise error
+
+    batch.step = fail
+    with pytest.raises(RuntimeError, match="market failed"):
+        next(stream(batch, CHUNK, prefetch=PREFETCH))
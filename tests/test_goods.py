@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from cookieLearner.market.batch import MarketBatch
+from cookieLearner.market.goods import GoodsTable, GoodView
+from cookieLearner.market.market import GameEnvironment, Good, Mode
+
+ENVIRONMENTS = [
+    GameEnvironment(bank_level=1, num_brokers=0, dragon_boost=0.0),
+    GameEnvironment(bank_level=3, num_brokers=1, dragon_boost=0.5),
+]
+N_GOODS = 4
+VALUE = 7.0
+DURATION = 9
+GOODS = [
+    Good(0, 12.5, -0.25, "Fast Rise", 40),
+    Good(1, 1.0, 0.0, "Stable", 1),
+    Good(2, 99.75, 3.5, "Chaotic", -2),
+]
+
+
+def test_table_round_trips_goods() -> None:
+    table = GoodsTable.from_goods(GOODS)
+
+    assert table.shape == (len(GOODS),)
+    assert table.to_goods() == GOODS
+    assert [view.mode_code for view in table] == [
+        Mode.FAST_RISE,
+        Mode.STABLE,
+        Mode.CHAOTIC,
+    ]
+
+
+def test_views_read_the_records_in_place() -> None:
+    table = GoodsTable.from_goods(GOODS)
+    view = table[2]
+    head = table[:2]
+
+    table.column("stock_value")[:] = VALUE
+    head.column("remaining_mode_duration")[1] = DURATION
+
+    assert isinstance(view, GoodView)
+    assert view.stock_value == VALUE
+    assert table[1].remaining_mode_duration == DURATION
+    with pytest.raises(AttributeError):
+        view.stock_value = 1.0
+
+
+def test_batch_table_holds_every_good() -> None:
+    batch = MarketBatch(ENVIRONMENTS, n_goods=N_GOODS, seed=0)
+
+    table = batch.goods_table()
+
+    assert table.shape == (len(ENVIRONMENTS), N_GOODS)
+    np.testing.assert_array_equal(table.column("stock_value"), batch.stock_values)
+    np.testing.assert_array_equal(table.column("mode"), batch.stock_modes)
+    assert [good.stock_id for good in table[1].to_goods()] == list(range(N_GOODS))
+
+
+def test_table_rejects_other_dtypes() -> None:
+    with pytest.raises(TypeError, match="GoodsTable needs records"):
+        GoodsTable(np.zeros(3))
+
+
+def test_good_and_environment_are_slotted_and_mutable() -> None:
+    good = Good(0, 10.0, 0.0, "Stable", 5)
+    environment = GameEnvironment(bank_level=1, num_brokers=0, dragon_boost=0.0)
+
+    good.stock_value = 11.0
+    environment.bank_level = 2
+
+    assert not hasattr(good, "__dict__")
+    assert not hasattr(environment, "__dict__")
+    assert (good.stock_value, environment.bank_level) == (11.0, 2)
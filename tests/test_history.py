@@ -0,0 +1,75 @@
+import math
+
+import numpy as np
+import pytest
+
+from cookieLearner.market.history import PriceHistory
+
+DEPTH = 5
+N_GOODS = 3
+
+
+def pushed(n_ticks: int) -> tuple[PriceHistory, np.ndarray]:
+    """History of ``n_ticks`` random pushes, and the pushed rows."""
+    rows = np.random.default_rng(n_ticks).uniform(1, 100, (n_ticks, N_GOODS))
+    history = PriceHistory((N_GOODS,), depth=DEPTH)
+    for row in rows:
+        history.push(row)
+    return history, rows
+
+
+@pytest.mark.parametrize("n_ticks", [0, 1, DEPTH - 1, DEPTH, 3 * DEPTH + 2])
+def test_window_holds_the_last_pushes(n_ticks: int) -> None:
+    history, rows = pushed(n_ticks)
+    kept = min(n_ticks, DEPTH)
+
+    assert len(history) == kept
+    np.testing.assert_array_equal(history.window(), rows[n_ticks - kept :])
+    for length in range(kept + 1):
+        np.testing.assert_array_equal(
+            history.window(length),
+            rows[n_ticks - length : n_ticks],
+        )
+    for back in range(kept):
+        np.testing.assert_array_equal(history.latest(back), rows[-1 - back])
+    with pytest.raises(IndexError, match="outside of the"):
+        history.latest(kept)
+    with pytest.raises(IndexError, match="outside of the"):
+        history.window(kept + 1)
+
+
+def test_window_is_a_view() -> None:
+    history, _ = pushed(2 * DEPTH + 1)
+    window = history.window()
+
+    history.fill(7.0)
+
+    np.testing.assert_array_equal(window, 7.0)
+
+
+def test_clear_forgets_the_values() -> None:
+    history, _ = pushed(DEPTH)
+    history.clear()
+
+    assert len(history) == 0
+    np.testing.assert_array_equal(history.good_delta(), 0.0)
+
+
+@pytest.mark.parametrize("back", [0, 1, DEPTH - 2])
+def test_good_delta_matches_js(back: int) -> None:
+    history, rows = pushed(2 * DEPTH)
+
+    # Floored percent change from vals[back+1] to vals[back] as in M.goodDelta
+    expected = [
+        math.floor((now / before - 1) * 10000) / 100
+        for now, before in zip(rows[-1 - back], rows[-2 - back], strict=True)
+    ]
+    np.testing.assert_array_equal(history.good_delta(back), expected)
+
+
+def test_good_delta_writes_into_out() -> None:
+    history, _ = pushed(DEPTH)
+    out = np.empty(N_GOODS)
+
+    assert history.good_delta(out=out) is out
+    np.testing.assert_array_equal(history.good_delta(DEPTH - 1), 0.0)
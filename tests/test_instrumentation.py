@@ -0,0 +1,76 @@
+import threading
+
+import numpy as np
+
+from cookieLearner.market.batch import MarketBatch
+from cookieLearner.market.instrumentation import (
+    N_MODES,
+    PHASES,
+    active_profile,
+    instrument,
+)
+from cookieLearner.market.market import DEFAULT_CONFIG, GameEnvironment
+
+ENVIRONMENTS = [
+    GameEnvironment(bank_level=1, num_brokers=0, dragon_boost=0.0),
+    GameEnvironment(bank_level=5, num_brokers=2, dragon_boost=1.0),
+]
+N_GOODS = 18
+N_TICKS = 60
+SEED = 17
+
+
+def make_batch() -> MarketBatch:
+    return MarketBatch(ENVIRONMENTS, n_goods=N_GOODS, history_depth=None, seed=SEED)
+
+
+def test_profile_counts_match_the_run() -> None:
+    batch = make_batch()
+    plain = make_batch()
+    transitions = np.zeros((N_MODES, N_MODES), dtype=np.int64)
+    min_value_hits = 0
+
+    with instrument() as profile:
+        for _ in range(N_TICKS):
+            modes = batch.stock_modes.copy()
+            batch.step()
+            np.add.at(transitions, (modes, batch.stock_modes), 1)
+            min_value_hits += np.count_nonzero(
+                batch.stock_values == DEFAULT_CONFIG.min_stock_value,
+            )
+    plain.step_n(N_TICKS)
+
+    np.fill_diagonal(transitions, 0)
+    assert profile.ticks == N_TICKS
+    assert profile.good_ticks == N_TICKS * len(ENVIRONMENTS) * N_GOODS
+    np.testing.assert_array_equal(profile.mode_transitions, transitions)
+    assert profile.mode_transitions.sum()
+    assert profile.min_stock_value_hits == min_value_hits
+    assert 0 < profile.instant_mode_changes < profile.good_ticks
+    assert list(profile.phase_seconds) == list(PHASES)
+    assert all(seconds > 0 for seconds in profile.phase_seconds.values())
+    assert profile.summary().startswith(f"{N_TICKS} ticks")
+    # Profiling does not change the market
+    np.testing.assert_array_equal(batch.stock_values, plain.stock_values)
+
+
+def test_blocks_nest_and_stay_in_their_thread() -> None:
+    batch = make_batch()
+    seen_by_thread = []
+
+    with instrument() as outer:
+        with instrument() as inner:
+            assert active_profile() is inner
+            thread = threading.Thread(
+                target=lambda: seen_by_thread.append(active_profile()),
+            )
+            thread.start()
+            thread.join()
+            batch.step()
+        assert active_profile() is outer
+        batch.step()
+    batch.step()
+
+    assert active_profile() is None
+    assert seen_by_thread == [None]
+    assert (inner.ticks, outer.ticks) == (1, 1)
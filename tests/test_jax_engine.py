@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from cookieLearner.market.market import GameEnvironment, Good, Mode
+
+pytest.importorskip("jax")
+
+import jax
+
+from cookieLearner.market.jax_engine import (
+    init_states,
+    rollout,
+    rollout_batch,
+    state_from_goods,
+    tick,
+)
+
+ENVIRONMENTS = [
+    GameEnvironment(bank_level=1, num_brokers=0, dragon_boost=0.0),
+    GameEnvironment(bank_level=5, num_brokers=2, dragon_boost=1.0),
+]
+N_GOODS = 7
+N_TICKS = 40
+
+
+def test_rollout_scans_tick() -> None:
+    state = init_states(ENVIRONMENTS, jax.random.key(0), n_goods=N_GOODS)
+    state = jax.tree_util.tree_map(lambda leaf: leaf[1], state)
+    key = jax.random.key(1)
+
+    final, trajectory = rollout(state, key, N_TICKS)
+
+    assert trajectory.stock_values.shape == (N_TICKS, N_GOODS)
+    for tick_index, tick_key in enumerate(jax.random.split(key, N_TICKS)):
+        state = tick(state, tick_key)
+        np.testing.assert_allclose(
+            trajectory.stock_values[tick_index],
+            state.stock_values,
+            rtol=1e-5,
+        )
+    np.testing.assert_array_equal(final.stock_modes, state.stock_modes)
+
+
+def test_rollout_batch_maps_rollout() -> None:
+    states = init_states(ENVIRONMENTS, jax.random.key(2), n_goods=N_GOODS)
+    keys = jax.random.split(jax.random.key(3), len(ENVIRONMENTS))
+
+    finals, trajectories = rollout_batch(states, keys, N_TICKS)
+
+    assert trajectories.stock_values.shape == (len(ENVIRONMENTS), N_TICKS, N_GOODS)
+    for market in range(len(ENVIRONMENTS)):
+        state = jax.tree_util.tree_map(lambda leaf, m=market: leaf[m], states)
+        final, trajectory = rollout(state, keys[market], N_TICKS)
+        np.testing.assert_allclose(
+            trajectories.stock_values[market],
+            trajectory.stock_values,
+            rtol=1e-5,
+        )
+        np.testing.assert_array_equal(finals.stock_modes[market], final.stock_modes)
+
+
+@pytest.mark.parametrize("as_label", [True, False])
+def test_state_from_goods_reads_every_good(*, as_label: bool) -> None:
+    goods = [
+        Good(
+            stock_id=stock_id,
+            stock_value=10.0 + stock_id,
+            stock_delta=-0.5,
+            mode=mode.label if as_label else mode,
+            remaining_mode_duration=stock_id + 1,
+        )
+        for stock_id, mode in enumerate(Mode)
+    ]
+
+    state = state_from_goods(goods, ENVIRONMENTS[1])
+
+    np.testing.assert_array_equal(state.stock_modes, list(Mode))
+    np.testing.assert_array_equal(state.remaining_mode_durations, range(1, 7))
+    np.testing.assert_allclose(state.stock_values, [good.stock_value for good in goods])
+    assert state.bank_level == ENVIRONMENTS[1].bank_level
@@ -0,0 +1,86 @@
+import random
+
+import numpy as np
+import pytest
+
+from cookieLearner.market.goods import GoodsTable
+from cookieLearner.market.market import (
+    STOCK_MODES,
+    GameEnvironment,
+    Good,
+    Mode,
+    resting_stock_value,
+    tick,
+)
+from cookieLearner.market.simulation import Market
+
+ENVIRONMENT = GameEnvironment(bank_level=2, num_brokers=0, dragon_boost=0.5)
+N_GOODS = 6
+N_TICKS = 30
+
+
+@pytest.mark.parametrize("mode", list(Mode))
+def test_coerce_accepts_every_form(mode: Mode) -> None:
+    for form in (mode, int(mode), np.int8(mode), mode.label):
+        assert Mode.coerce(form) is mode
+
+
+def test_coerce_rejects_unknown_modes() -> None:
+    with pytest.raises(ValueError, match="not in tuple"):
+        Mode.coerce("Sideways")
+    with pytest.raises(ValueError, match="not a valid Mode"):
+        Mode.coerce(len(Mode))
+
+
+@pytest.mark.parametrize("label", STOCK_MODES)
+def test_tick_accepts_mode_labels(label: str) -> None:
+    # value, delta, duration, resting value, bank level, global delta,
+    # instant mode change probability and dragon boost
+    arguments = (10.0, 0.1, 1, 20.0, 1, 0.5, 0.9, 0.0)
+    by_label = tick(*arguments[:2], label, *arguments[2:], rng=random.Random(1))
+    by_code = tick(
+        *arguments[:2],
+        Mode.from_label(label),
+        *arguments[2:],
+        rng=random.Random(1),
+    )
+    assert by_label == by_code
+
+
+def ticked_goods() -> list[Good]:
+    """Goods advanced by the scalar tick, whose mode is then a Mode."""
+    rng = random.Random(2)
+    goods = []
+    for stock_id, mode in enumerate(Mode):
+        state = (10.0 + stock_id, 0.0, mode.label, 3)
+        for _ in range(N_TICKS):
+            state = tick(
+                *state,
+                resting_stock_value(stock_id, ENVIRONMENT.bank_level),
+                ENVIRONMENT.bank_level,
+                0.0,
+                0.0,
+                ENVIRONMENT.dragon_boost,
+                rng=rng,
+            )
+        goods.append(Good(stock_id, *state))
+    return goods
+
+
+def test_ticked_goods_round_trip_through_market() -> None:
+    goods = ticked_goods()
+
+    market = Market(ENVIRONMENT, goods=goods)
+    table = GoodsTable.from_goods(goods)
+
+    for good, snapshot in zip(goods, market.goods, strict=True):
+        assert isinstance(good.mode, Mode)
+        assert snapshot == Good(
+            good.stock_id,
+            good.stock_value,
+            good.stock_delta,
+            good.mode.label,
+            good.remaining_mode_duration,
+        )
+    np.testing.assert_array_equal(table.column("mode"), [good.mode for good in goods])
+    assert Market(ENVIRONMENT, goods=market.goods).goods == market.goods
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from cookieLearner.market.batch import MarketBatch
+from cookieLearner.market.market import DEFAULT_CONFIG, Config, GameEnvironment, Mode
+from cookieLearner.market.markov import N_MODES, mode_model
+
+# Modes last 20 ticks or so, unlike the default config where every mode
+# expires after one tick as its drawn duration is negative
+LONG_MODES = Config(duration_max_dragon_boost=1.0)
+N_MARKETS = 40
+SEED = 6
+# Ticks skipped before counting, until the long modes drawn at reset have
+# ended by an instant mode change
+BURN_IN = 200
+
+
+def simulated_modes(config: Config, dragon_boost: float, n_ticks: int) -> np.ndarray:
+    """Mode of every good after every tick past the burn-in, one column per good."""
+    batch = MarketBatch(
+        [GameEnvironment(bank_level=1, num_brokers=0, dragon_boost=dragon_boost)]
+        * N_MARKETS,
+        config=config,
+        history_depth=None,
+        seed=SEED,
+    )
+    batch.step_n(BURN_IN)
+    modes = np.empty((n_ticks, batch.stock_modes.size), dtype=np.int8)
+    for row in modes:
+        batch.step()
+        row[:] = batch.stock_modes.ravel()
+    return modes
+
+
+@pytest.mark.parametrize(
+    ("config", "dragon_boost", "n_ticks", "rtol"),
+    [
+        pytest.param(DEFAULT_CONFIG, 0.0, 500, 0.03, id="default"),
+        pytest.param(LONG_MODES, 0.0, 4000, 0.05, id="long"),
+        pytest.param(LONG_MODES, 1.0, 4000, 0.05, id="long-dragon"),
+    ],
+)
+def test_model_matches_simulated_runs(
+    config: Config,
+    dragon_boost: float,
+    n_ticks: int,
+    rtol: float,
+) -> None:
+    model = mode_model(config, dragon_boost)
+    modes = simulated_modes(config, dragon_boost, n_ticks)
+
+    # A run starts whenever a good's mode differs from the previous tick's
+    ticks = np.bincount(modes[1:].ravel(), minlength=N_MODES)
+    entries = np.bincount(modes[1:][modes[1:] != modes[:-1]], minlength=N_MODES)
+
+    np.testing.assert_allclose(model.stationary, ticks / ticks.sum(), rtol=rtol)
+    np.testing.assert_allclose(model.mean_dwell, ticks / entries, rtol=rtol)
+
+
+def test_runs_span_stints_drawing_the_same_mode() -> None:
+    model = mode_model(DEFAULT_CONFIG)
+
+    # Almost every stint lasts a tick, so runs are geometric in the chance of
+    # drawing the same mode again
+    assert model.stint_length_probabilities[0] > 1 - 1e-3
+    np.testing.assert_allclose(
+        model.mean_dwell,
+        1 / (1 - np.diag(model.expiry_transitions)),
+        rtol=1e-3,
+    )
+
+
+def test_model_is_a_distribution_and_cached() -> None:
+    model = mode_model(LONG_MODES, 0.5)
+
+    np.testing.assert_allclose(model.stint_transitions.sum(axis=1), 1.0)
+    assert model.duration_probabilities.sum() == pytest.approx(1.0)
+    assert model.stint_length_probabilities.sum() == pytest.approx(1.0)
+    assert model.stationary.sum() == pytest.approx(1.0)
+    assert (
+        model.stationary[Mode.CHAOTIC] > mode_model(LONG_MODES).stationary[Mode.CHAOTIC]
+    )
+    assert mode_model(LONG_MODES, 0.5) is model
+    assert not model.mean_dwell.flags.writeable
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from cookieLearner.market.compiled import CompiledConfig
+from cookieLearner.market.market import DEFAULT_CONFIG, GameEnvironment, Mode
+from cookieLearner.market.vectorized import TICK_DRAWS, tick_batch
+
+pytest.importorskip("numba")
+
+from cookieLearner.market.numba_engine import tick_batch_numba
+
+ENVIRONMENTS = [
+    GameEnvironment(bank_level=1, num_brokers=0, dragon_boost=0.0),
+    GameEnvironment(bank_level=6, num_brokers=3, dragon_boost=0.4),
+    GameEnvironment(bank_level=2, num_brokers=0, dragon_boost=1.0),
+]
+N_GOODS = 18
+# Share of ticks with a global delta, higher than in the game
+GLOBAL_DELTA_PROBABILITY = 0.5
+
+
+def test_numba_kernel_matches_numpy_bitwise() -> None:
+    rng = np.random.default_rng(5)
+    compiled = CompiledConfig.from_environments(DEFAULT_CONFIG, ENVIRONMENTS, N_GOODS)
+    shape = (len(ENVIRONMENTS), N_GOODS)
+    state = (
+        rng.uniform(1, 150, shape),
+        rng.uniform(-2, 2, shape),
+        rng.integers(len(Mode), size=shape, dtype=np.int8),
+        rng.integers(1, 5, size=shape),
+    )
+    numba_state = state
+
+    for _ in range(500):
+        global_delta = np.where(
+            rng.random(shape[0]) < GLOBAL_DELTA_PROBABILITY,
+            rng.uniform(-1, 1, shape[0]),
+            0.0,
+        )[:, np.newaxis]
+        probability = rng.random(shape[0])[:, np.newaxis]
+        uniforms = rng.random((TICK_DRAWS, *shape))
+
+        state = tick_batch(
+            *state,
+            global_delta,
+            probability,
+            compiled,
+            uniforms=uniforms,
+        )
+        numba_state = tick_batch_numba(
+            *numba_state,
+            global_delta,
+            probability,
+            compiled,
+            uniforms=uniforms,
+        )
+        for expected, actual in zip(state, numba_state, strict=True):
+            np.testing.assert_array_equal(actual, expected)
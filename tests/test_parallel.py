@@ -0,0 +1,101 @@
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pytest
+
+from cookieLearner.market import parallel
+from cookieLearner.market.batch import MarketBatch
+from cookieLearner.market.market import GameEnvironment
+from cookieLearner.market.parallel import ShardedMarkets, ThreadedMarkets
+from cookieLearner.market.randomness import CounterStreams
+
+ENVIRONMENTS = [
+    GameEnvironment(bank_level=bank_level, num_brokers=0, dragon_boost=dragon_boost)
+    for bank_level in (1, 4, 9)
+    for dragon_boost in (0.0, 0.5)
+]
+STATE_FIELDS = (
+    "stock_values",
+    "stock_deltas",
+    "stock_modes",
+    "remaining_mode_durations",
+)
+N_TICKS = 50
+N_THREADS = 3
+
+
+@pytest.fixture(scope="module")
+def reference() -> MarketBatch:
+    batch = MarketBatch(ENVIRONMENTS, history_depth=None, streams=CounterStreams(11))
+    batch.step_n(N_TICKS)
+    return batch
+
+
+def assert_same_state(markets: object, batch: MarketBatch) -> None:
+    for field in STATE_FIELDS:
+        np.testing.assert_array_equal(getattr(markets, field), getattr(batch, field))
+
+
+@pytest.mark.parametrize("n_workers", [1, 2, 4])
+def test_sharded_markets_match_batch(n_workers: int, reference: MarketBatch) -> None:
+    with ShardedMarkets(ENVIRONMENTS, n_workers=n_workers, seed=11) as markets:
+        markets.step_n(N_TICKS)
+        assert_same_state(markets, reference)
+
+
+@pytest.mark.parametrize("n_workers", [1, 2, 4])
+def test_threaded_markets_match_batch(n_workers: int, reference: MarketBatch) -> None:
+    with ThreadedMarkets(ENVIRONMENTS, n_workers=n_workers, seed=11) as markets:
+        markets.step_n(N_TICKS)
+        assert_same_state(markets, reference)
+
+
+def test_threaded_blocks_run_on_the_pool_without_the_gil(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    expected = MarketBatch(ENVIRONMENTS, history_depth=None, streams=CounterStreams(11))
+    expected.step_n(N_TICKS)
+    expected.reset()
+    monkeypatch.setattr(parallel, "gil_enabled", lambda: False)
+
+    with ThreadedMarkets(ENVIRONMENTS, n_workers=N_THREADS, seed=11) as markets:
+        markets.step_n(N_TICKS)
+        markets.reset()
+
+        assert markets.n_workers == N_THREADS
+        assert markets.clock == expected.clock
+        assert_same_state(markets, expected)
+    markets.close()
+
+
+def test_close_is_idempotent() -> None:
+    markets = ShardedMarkets(ENVIRONMENTS, n_workers=2, seed=11)
+    with markets:
+        markets.close()
+        assert markets.closed
+        assert not hasattr(markets, "stock_values")
+    markets.close()
+
+
+def test_failed_startup_frees_the_shared_blocks(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    created = []
+
+    class RecordingSharedMemory(SharedMemory):
+        def __init__(self, *args: object, **kwargs: object) -> None:
+            super().__init__(*args, **kwargs)
+            if kwargs.get("create"):
+                created.append(self.name)
+
+    monkeypatch.setattr(parallel, "SharedMemory", RecordingSharedMemory)
+    # The workers fail to build their batch from a bank level of None
+    broken = [*ENVIRONMENTS, GameEnvironment(None, 0, 0.0)]
+
+    with pytest.raises(EOFError):
+        ShardedMarkets(broken, n_workers=2, seed=11)
+
+    assert len(created) == len(STATE_FIELDS)
+    for name in created:
+        with pytest.raises(FileNotFoundError):
+            SharedMemory(name=name)
@@ -0,0 +1,101 @@
+import numpy as np
+
+from cookieLearner.market.env import MarketEnv
+from cookieLearner.market.market import GameEnvironment
+from cookieLearner.market.portfolio import Portfolio
+from cookieLearner.market.trading import LAST_BOUGHT, LAST_SOLD, MAX_QUANTITY
+
+ENVIRONMENT = GameEnvironment(bank_level=3, num_brokers=6, dragon_boost=0.0)
+N_GOODS = 18
+MAX_STOCK = np.arange(N_GOODS) * 5 + 20
+CPS = 2.5
+STARTING_COOKIES = 5000.0
+N_TICKS = 300
+QUANTITIES = np.array([-MAX_QUANTITY, -3, 0, 0, 2, 5, MAX_QUANTITY])
+
+
+def make_env() -> MarketEnv:
+    env = MarketEnv(
+        ENVIRONMENT,
+        max_stock=MAX_STOCK,
+        cookies_ps_raw_highest=CPS,
+        starting_cookies=STARTING_COOKIES,
+        seed=4,
+    )
+    env.reset()
+    return env
+
+
+def make_portfolio() -> Portfolio:
+    return Portfolio.empty(
+        1,
+        N_GOODS,
+        MAX_STOCK,
+        num_brokers=ENVIRONMENT.num_brokers,
+        cookies_ps_raw_highest=CPS,
+        cookies=STARTING_COOKIES,
+    )
+
+
+def assert_same_books(portfolio: Portfolio, env: MarketEnv) -> None:
+    np.testing.assert_array_equal(portfolio.stock[0], env.stock)
+    np.testing.assert_array_equal(portfolio.last[0], env.last)
+    # Portfolio sums a tick's trades before adding them, MarketEnv adds each one
+    np.testing.assert_allclose(portfolio.cookies[0], env.cookies, atol=1e-9)
+    np.testing.assert_allclose(portfolio.profit[0], env.profit, atol=1e-9)
+
+
+def test_portfolio_trades_like_market_env() -> None:
+    rng = np.random.default_rng(0)
+    env = make_env()
+    portfolio = make_portfolio()
+    ticks_holding_stock = 0
+
+    for _ in range(N_TICKS):
+        action = rng.choice(QUANTITIES, size=N_GOODS)
+        stock_values = np.array([env.stock_values])
+        portfolio.trade(stock_values, action[np.newaxis])
+        env.step(action)
+        portfolio.new_tick()
+
+        assert_same_books(portfolio, env)
+        np.testing.assert_allclose(
+            portfolio.net_worth(np.array([env.stock_values]))[0],
+            env.net_worth,
+            rtol=1e-12,
+        )
+        ticks_holding_stock += any(env.stock)
+    assert ticks_holding_stock > N_TICKS // 2
+
+
+def test_trades_lock_the_other_side_until_the_next_tick() -> None:
+    env = make_env()
+    portfolio = make_portfolio()
+    stock_values = np.array([env.stock_values])
+    quantity = np.zeros((1, N_GOODS), dtype=np.int64)
+    quantity[0, :2] = 3
+
+    assert env.buy(0, 3)
+    assert env.buy(1, 3)
+    assert not env.sell(0, 1)
+    np.testing.assert_array_equal(
+        portfolio.buy(stock_values, quantity)[0, :2],
+        [True, True],
+    )
+    assert not portfolio.sell(stock_values, quantity)[0, 0]
+    assert_same_books(portfolio, env)
+    assert portfolio.last[0, 0] == LAST_BOUGHT
+
+    env.step(np.zeros(N_GOODS, dtype=np.int64))
+    portfolio.new_tick()
+    stock_values = np.array([env.stock_values])
+    assert env.sell(0, MAX_QUANTITY)
+    assert not env.buy(0, 1)
+    quantity[0, 1] = 0
+    quantity[0, 0] = MAX_QUANTITY
+    assert portfolio.sell(stock_values, quantity)[0, 0]
+    quantity[0, 0] = 1
+    assert not portfolio.buy(stock_values, quantity)[0, 0]
+    assert_same_books(portfolio, env)
+    assert portfolio.last[0, 0] == LAST_SOLD
+    assert portfolio.stock[0, 0] == 0
@@ -0,0 +1,137 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from cookieLearner.market.batch import MarketBatch
+from cookieLearner.market.feed import stream
+from cookieLearner.market.market import Config, GameEnvironment, resting_stock_value
+from cookieLearner.market.price_tables import (
+    ALL_MODES,
+    RATIO_STEP,
+    PriceTables,
+    build_price_tables,
+)
+
+CONFIG = Config(duration_max_dragon_boost=1)
+MIN_BANK_LEVEL = 2
+MAX_BANK_LEVEL = 3
+N_DRAGON_BOOSTS = 2
+N_MARKETS = 6
+N_TICKS = 300
+BURN_IN = 100
+N_GOODS = 3
+SEED = 13
+# Levels on the grid of the tabulated quantiles
+LEVELS = np.linspace(0.1, 0.9, 5)
+
+
+@pytest.fixture(scope="module")
+def tables() -> PriceTables:
+    return build_price_tables(
+        min_bank_level=MIN_BANK_LEVEL,
+        max_bank_level=MAX_BANK_LEVEL,
+        n_dragon_boosts=N_DRAGON_BOOSTS,
+        n_markets=N_MARKETS,
+        n_ticks=N_TICKS,
+        burn_in=BURN_IN,
+        n_goods=N_GOODS,
+        config=CONFIG,
+        seed=SEED,
+        n_quantiles=51,
+        cdf_points=64,
+    )
+
+
+def simulated_values(stock_id: int) -> np.ndarray:
+    """Values of a good in the first environment of the grid, as tabulated."""
+    seeds = np.random.SeedSequence(SEED).spawn(
+        (MAX_BANK_LEVEL - MIN_BANK_LEVEL + 1) * N_DRAGON_BOOSTS,
+    )
+    batch = MarketBatch(
+        [GameEnvironment(bank_level=MIN_BANK_LEVEL, num_brokers=0, dragon_boost=0.0)]
+        * N_MARKETS,
+        n_goods=N_GOODS,
+        config=CONFIG,
+        rng=np.random.default_rng(seeds[0]),
+        history_depth=None,
+    )
+    batch.step_n(BURN_IN)
+    return np.concatenate(
+        [
+            chunk.stock_values[..., stock_id].ravel()
+            for chunk in stream(batch, n_ticks=N_TICKS)
+        ],
+    )
+
+
+@pytest.mark.parametrize("stock_id", range(N_GOODS))
+def test_quantiles_match_the_simulated_values(
+    tables: PriceTables,
+    stock_id: int,
+) -> None:
+    values = simulated_values(stock_id)
+    resting = resting_stock_value(stock_id, MIN_BANK_LEVEL, CONFIG)
+
+    quantiles = tables.quantile(LEVELS, stock_id, MIN_BANK_LEVEL)
+
+    assert tables.counts[stock_id, 0, 0, ALL_MODES] == values.size
+    # The tables interpolate within the histogram bin of the sample that
+    # reaches each level
+    np.testing.assert_allclose(
+        quantiles / resting,
+        np.quantile(values / resting, LEVELS, method="inverted_cdf"),
+        atol=RATIO_STEP,
+    )
+
+
+def test_cdf_inverts_the_quantiles(tables: PriceTables) -> None:
+    stock_id = np.arange(N_GOODS)[:, np.newaxis]
+    values = tables.quantile(LEVELS, stock_id, MAX_BANK_LEVEL, dragon_boost=0.1)
+
+    assert (np.diff(values, axis=1) > 0).all()
+    np.testing.assert_allclose(
+        tables.cdf_at(values, stock_id, MAX_BANK_LEVEL, dragon_boost=0.1),
+        np.broadcast_to(LEVELS, values.shape),
+        atol=0.02,
+    )
+
+
+def test_queries_outside_the_grid_use_the_nearest_cell(tables: PriceTables) -> None:
+    def ratios(bank_level: int, dragon_boost: float) -> np.ndarray:
+        resting = resting_stock_value(1, bank_level, CONFIG)
+        return tables.quantile(LEVELS, 1, bank_level, dragon_boost) / resting
+
+    np.testing.assert_allclose(ratios(0, -1.0), ratios(MIN_BANK_LEVEL, 0.0))
+    np.testing.assert_allclose(ratios(99, 5.0), ratios(MAX_BANK_LEVEL, 0.1))
+
+
+def test_save_load_round_trip(tables: PriceTables, tmp_path: Path) -> None:
+    path = tmp_path / "tables.npz"
+    tables.save(path)
+
+    loaded = PriceTables.load(path)
+
+    assert loaded.config == CONFIG
+    assert loaded.bank_levels == tables.bank_levels
+    np.testing.assert_array_equal(loaded.dragon_boosts, tables.dragon_boosts)
+    for name in ("quantiles", "cdf", "cdf_low", "cdf_step", "counts"):
+        np.testing.assert_array_equal(getattr(loaded, name), getattr(tables, name))
+    np.testing.assert_array_equal(
+        loaded.quantile(LEVELS, 2, MAX_BANK_LEVEL, 0.1, mode=1),
+        tables.quantile(LEVELS, 2, MAX_BANK_LEVEL, 0.1, mode=1),
+    )
+
+
+def test_load_rejects_other_versions(tables: PriceTables, tmp_path: Path) -> None:
+    path = tmp_path / "tables.npz"
+    tables.save(path)
+    with np.load(path) as data:
+        arrays = dict(data)
+    arrays["header"] = np.array(
+        str(arrays["header"]).replace('"version": 1', '"version": 0'),
+    )
+    np.savez(path, **arrays)
+
+    with pytest.raises(ValueError, match="Unsupported price tables version 0"):
+        PriceTables.load(path)
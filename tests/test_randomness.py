@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from cookieLearner.market.randomness import CounterStreams, UniformBlocks
+
+SEED = 12
+BLOCK_SIZE = 10
+N_MARKETS = 12
+N_DRAWS = 5
+N_GOODS = 3
+TICK = 40
+
+
+def test_blocks_serve_the_generator_stream() -> None:
+    source = UniformBlocks(SEED, block_size=BLOCK_SIZE)
+    out = np.empty((2, 4))
+
+    draws = [source.random() for _ in range(3)]
+    draws.extend(source.random(7).tolist())
+    draws.append(source.random())
+    draws.extend(source.random(out=out).ravel().tolist())
+    draws.extend(source.random() for _ in range(25))
+    draws.extend(source.random((3, 5)).ravel().tolist())
+
+    expected = np.random.Generator(np.random.PCG64(SEED)).random(len(draws))
+    np.testing.assert_array_equal(draws, expected)
+    assert all(type(draw) is float for draw in draws[:3])
+
+
+def test_blocks_reject_float32_and_strided_out() -> None:
+    source = UniformBlocks(SEED, block_size=BLOCK_SIZE)
+
+    with pytest.raises(TypeError, match="float32"):
+        source.random(3, dtype=np.float32)
+    with pytest.raises(ValueError, match="C-contiguous"):
+        source.random(out=np.empty((4, 4))[:, ::2])
+
+
+@pytest.mark.parametrize("n_goods", [None, N_GOODS])
+def test_streams_do_not_depend_on_the_shard(n_goods: int | None) -> None:
+    streams = CounterStreams(SEED)
+    every_market = streams.uniforms(TICK, np.arange(N_MARKETS), N_DRAWS, n_goods)
+    market_ids = np.array([7, 8, 2, 11, 0])
+
+    shard = streams.uniforms(TICK, market_ids, N_DRAWS, n_goods)
+
+    assert every_market.shape[:2] == (N_DRAWS, N_MARKETS)
+    np.testing.assert_array_equal(shard, every_market[:, market_ids])
+    np.testing.assert_array_equal(
+        CounterStreams(SEED).uniforms(TICK, market_ids, N_DRAWS, n_goods),
+        shard,
+    )
+
+
+def test_streams_differ_by_address() -> None:
+    streams = CounterStreams(SEED)
+    market_ids = np.arange(N_MARKETS)
+    per_good = streams.uniforms(TICK, market_ids, N_DRAWS, N_GOODS)
+    others = [
+        streams.uniforms(TICK + 1, market_ids, N_DRAWS, N_GOODS),
+        streams.uniforms(TICK, market_ids, N_DRAWS * N_GOODS)
+        .reshape(N_DRAWS, N_GOODS, N_MARKETS)
+        .transpose(0, 2, 1),
+        CounterStreams(SEED + 1).uniforms(TICK, market_ids, N_DRAWS, N_GOODS),
+    ]
+
+    # Overlapping streams would repeat values, independent ones almost never do
+    values = [per_good, *others]
+    assert len(np.unique(np.concatenate([value.ravel() for value in values]))) == (
+        len(values) * per_good.size
+    )
+    assert len(np.unique(per_good)) == per_good.size
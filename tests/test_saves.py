@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from cookieLearner.market.batch import MarketBatch
+from cookieLearner.market.market import GameEnvironment
+from cookieLearner.market.saves import MarketSaves, decode_saves, encode_saves
+
+N_GOODS = 3
+# officeLevel:brokers:graphLines:profit:graphCols, three goods and onMinigame
+SAVE = "2:5:1:1234.5:0: 1025:1:-50:120:7:0:1:900!350:5:275:3:0:1:0:0!100:0:0:1:2:0:2:125! 1"
+
+
+def test_decode_reads_every_field() -> None:
+    saves = decode_saves([SAVE], n_goods=N_GOODS)
+
+    np.testing.assert_array_equal(saves.office_level, [2])
+    np.testing.assert_array_equal(saves.brokers, [5])
+    np.testing.assert_array_equal(saves.profit, [1234.5])
+    np.testing.assert_array_equal(saves.on_minigame, [True])
+    np.testing.assert_array_equal(saves.stock_values, [[10.25, 3.5, 1.0]])
+    np.testing.assert_array_equal(saves.stock_modes, [[1, 5, 0]])
+    np.testing.assert_array_equal(saves.stock_deltas, [[-0.5, 2.75, 0.0]])
+    np.testing.assert_array_equal(saves.remaining_mode_durations, [[120, 3, 1]])
+    np.testing.assert_array_equal(saves.stock, [[7, 0, 2]])
+    np.testing.assert_array_equal(saves.hidden, [[False, True, False]])
+    np.testing.assert_array_equal(saves.last, [[1, 0, 2]])
+    np.testing.assert_array_equal(saves.prev, [[9.0, 0.0, 1.25]])
+    assert saves.loaded.all()
+
+
+def test_encode_round_trips_a_save() -> None:
+    assert encode_saves(decode_saves([SAVE, SAVE], n_goods=N_GOODS)) == [SAVE, SAVE]
+
+
+def test_decode_round_trips_a_batch() -> None:
+    batch = MarketBatch(
+        [GameEnvironment(bank_level=4, num_brokers=3, dragon_boost=0.0)] * 5,
+        seed=1,
+    )
+    batch.step_n(100)
+    saves = MarketSaves.from_batch(batch)
+    decoded = decode_saves(encode_saves(saves))
+
+    # Hundredths are truncated on encoding
+    np.testing.assert_allclose(decoded.stock_values, saves.stock_values, atol=0.01)
+    np.testing.assert_allclose(decoded.stock_deltas, saves.stock_deltas, atol=0.01)
+    np.testing.assert_array_equal(decoded.stock_modes, saves.stock_modes)
+    np.testing.assert_array_equal(
+        decoded.remaining_mode_durations,
+        saves.remaining_mode_durations,
+    )
+    np.testing.assert_array_equal(decoded.brokers, saves.brokers)
+
+
+def test_empty_fields_read_as_zero() -> None:
+    header, goods, on_minigame = SAVE.split(" ")
+    records = goods.split("!")
+    records[0] = "1000:1::5:0:0:0:0"
+    records[1] = ":5:275:3:0:1:0:"
+    save = f"{header} {'!'.join(records)} {on_minigame}"
+
+    saves = decode_saves([SAVE, save], n_goods=N_GOODS)
+
+    np.testing.assert_array_equal(saves.stock_values[1], [10.0, 0.0, 1.0])
+    np.testing.assert_array_equal(saves.stock_deltas[1], [0.0, 2.75, 0.0])
+    np.testing.assert_array_equal(saves.stock_values[0], [10.25, 3.5, 1.0])
+    assert saves.loaded.all()
+
+
+def test_missing_goods_are_not_loaded() -> None:
+    saves = decode_saves(["0:0:1:0:0: 1025:1:-50:120:7:0:1:900! 0"], n_goods=N_GOODS)
+
+    np.testing.assert_array_equal(saves.loaded, [[True, False, False]])
+    np.testing.assert_array_equal(saves.stock_values[0], [10.25, 0.0, 0.0])
+
+
+@pytest.mark.parametrize("mode", ["6", "-1"])
+def test_unknown_modes_are_rejected(mode: str) -> None:
+    save = SAVE.replace(":5:275:", f":{mode}:275:")
+
+    with pytest.raises(ValueError, match=f"mode {mode} for good 1"):
+        decode_saves([SAVE, save], n_goods=N_GOODS)
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from cookieLearner.market.batch import MarketBatch
+from cookieLearner.market.instrumentation import instrument
+from cookieLearner.market.market import GameEnvironment
+from cookieLearner.market.randomness import CounterStreams
+from cookieLearner.market.simulation import Market
+
+ENVIRONMENTS = [
+    GameEnvironment(bank_level=1, num_brokers=0, dragon_boost=0.0),
+    GameEnvironment(bank_level=5, num_brokers=10, dragon_boost=0.0),
+    GameEnvironment(bank_level=3, num_brokers=2, dragon_boost=0.7),
+]
+STATE_FIELDS = (
+    "stock_values",
+    "stock_deltas",
+    "stock_modes",
+    "remaining_mode_durations",
+)
+
+
+@pytest.mark.parametrize("market_id", range(len(ENVIRONMENTS)))
+def test_market_matches_batch_row(market_id: int) -> None:
+    batch = MarketBatch(ENVIRONMENTS, streams=CounterStreams(7))
+    market = Market(
+        ENVIRONMENTS[market_id],
+        streams=CounterStreams(7),
+        market_id=market_id,
+    )
+    batch.step_n(300)
+    market.step_n(300)
+
+    for field in STATE_FIELDS:
+        np.testing.assert_array_equal(
+            getattr(market, field),
+            getattr(batch, field)[market_id],
+        )
+    np.testing.assert_array_equal(
+        market.history.window(),
+        batch.history.window()[:, market_id],
+    )
+
+
+@pytest.mark.parametrize("environment", ENVIRONMENTS)
+def test_market_loop_matches_batched_kernel(environment: GameEnvironment) -> None:
+    market = Market(environment, seed=3)
+    market.step_n(2000)
+    # Instrumented ticks run the batched kernel
+    with instrument():
+        instrumented = Market(environment, seed=3)
+        instrumented.step_n(2000)
+
+    for field in STATE_FIELDS:
+        np.testing.assert_array_equal(
+            getattr(market, field),
+            getattr(instrumented, field),
+        )
@@ -0,0 +1,101 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from cookieLearner.market.market import Config, GameEnvironment
+from cookieLearner.market.store import (
+    TrajectoryReader,
+    TrajectoryWriter,
+    write_trajectories,
+)
+from cookieLearner.market.trajectories import Trajectories, generate_trajectories
+
+ENVIRONMENTS = [
+    GameEnvironment(bank_level=2, num_brokers=0, dragon_boost=0.0),
+    GameEnvironment(bank_level=7, num_brokers=4, dragon_boost=0.5),
+    GameEnvironment(bank_level=2, num_brokers=0, dragon_boost=0.0),
+]
+CONFIG = Config(duration_min=5)
+SEED = 3
+N_GOODS = 5
+N_TICKS = 70
+CHUNK_TICKS = 32
+
+
+def test_store_round_trip(tmp_path: Path) -> None:
+    reader = write_trajectories(
+        tmp_path / "store",
+        len(ENVIRONMENTS),
+        N_TICKS,
+        ENVIRONMENTS,
+        config=CONFIG,
+        seed=SEED,
+        n_goods=N_GOODS,
+        chunk_ticks=CHUNK_TICKS,
+    )
+    expected = generate_trajectories(
+        len(ENVIRONMENTS),
+        N_TICKS,
+        ENVIRONMENTS,
+        config=CONFIG,
+        seed=SEED,
+        n_goods=N_GOODS,
+    )
+
+    assert reader.n_ticks == N_TICKS
+    assert reader.config == CONFIG
+    assert reader.seed == SEED
+    assert reader.environments == ENVIRONMENTS
+    assert reader.distinct_environments == ENVIRONMENTS[:2]
+    for actual, wanted in zip(reader.trajectories, expected, strict=True):
+        np.testing.assert_array_equal(actual, wanted)
+
+    window = reader.window(slice(10, 20), 1, slice(2, None))
+    np.testing.assert_array_equal(
+        window.stock_values,
+        expected.stock_values[10:20, 1, 2:],
+    )
+    chunks = list(reader.iter_chunks(chunk_ticks=CHUNK_TICKS))
+    assert [chunk.n_ticks for chunk in chunks] == [
+        CHUNK_TICKS,
+        CHUNK_TICKS,
+        N_TICKS - 2 * CHUNK_TICKS,
+    ]
+
+
+def test_writer_reads_up_to_the_last_flush(tmp_path: Path) -> None:
+    chunk = Trajectories.empty(4, len(ENVIRONMENTS), N_GOODS)
+    for column in chunk:
+        column[...] = 1
+    writer = TrajectoryWriter(
+        tmp_path,
+        capacity=3 * chunk.n_ticks,
+        environments=ENVIRONMENTS,
+        n_goods=N_GOODS,
+    )
+    writer.append(chunk)
+    writer.flush()
+    writer.append(chunk)
+
+    assert TrajectoryReader(tmp_path).n_ticks == chunk.n_ticks
+    writer.close()
+    assert TrajectoryReader(tmp_path).n_ticks == 2 * chunk.n_ticks
+
+
+def test_writer_close_is_idempotent(tmp_path: Path) -> None:
+    chunk = Trajectories.empty(4, len(ENVIRONMENTS), N_GOODS)
+    with TrajectoryWriter(
+        tmp_path,
+        capacity=6,
+        environments=ENVIRONMENTS,
+        n_goods=N_GOODS,
+    ) as writer:
+        writer.append(chunk)
+        with pytest.raises(ValueError, match="Cannot append 4 ticks"):
+            writer.append(chunk)
+    writer.close()
+
+    assert writer.closed
+    with pytest.raises(ValueError, match="closed"):
+        writer.append(chunk)
@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from cookieLearner.market.batch import MarketBatch
+from cookieLearner.market.market import NUM_GOODS, GameEnvironment
+from cookieLearner.market.simulation import Market
+from cookieLearner.market.trajectories import (
+    TRAJECTORY_DTYPES,
+    Trajectories,
+    generate_trajectories,
+    iter_trajectories,
+    record_ticks,
+)
+
+ENVIRONMENTS = [
+    GameEnvironment(bank_level=1, num_brokers=0, dragon_boost=0.0),
+    GameEnvironment(bank_level=7, num_brokers=2, dragon_boost=0.5),
+]
+N_GOODS = 5
+N_TICKS = 23
+CHUNK_TICKS = 10
+SEED = 3
+
+
+def test_trajectories_record_the_batch_after_every_tick() -> None:
+    batch = MarketBatch(ENVIRONMENTS, n_goods=N_GOODS, history_depth=None, seed=SEED)
+    expected = []
+    for _ in range(N_TICKS):
+        batch.step()
+        expected.append(batch.stock_values.copy())
+
+    trajectories = generate_trajectories(
+        len(ENVIRONMENTS),
+        N_TICKS,
+        ENVIRONMENTS,
+        seed=SEED,
+        n_goods=N_GOODS,
+        chunk_ticks=CHUNK_TICKS,
+    )
+
+    assert trajectories.n_ticks == N_TICKS
+    for field, dtype in TRAJECTORY_DTYPES.items():
+        assert getattr(trajectories, field).dtype == dtype
+    np.testing.assert_array_equal(
+        trajectories.stock_values,
+        np.array(expected, dtype=np.float32),
+    )
+    np.testing.assert_array_equal(trajectories.stock_modes[-1], batch.stock_modes)
+    np.testing.assert_array_equal(
+        trajectories.remaining_mode_durations[-1],
+        batch.remaining_mode_durations,
+    )
+
+
+def test_chunk_size_does_not_change_the_run() -> None:
+    runs = [
+        generate_trajectories(
+            len(ENVIRONMENTS),
+            N_TICKS,
+            ENVIRONMENTS,
+            seed=SEED,
+            n_goods=N_GOODS,
+            chunk_ticks=chunk_ticks,
+        )
+        for chunk_ticks in (1, CHUNK_TICKS, 2 * N_TICKS)
+    ]
+
+    for run in runs[1:]:
+        for column, expected in zip(run, runs[0], strict=True):
+            np.testing.assert_array_equal(column, expected)
+
+
+def test_chunks_are_views_of_one_buffer() -> None:
+    chunks = list(
+        iter_trajectories(
+            len(ENVIRONMENTS),
+            N_TICKS,
+            ENVIRONMENTS[0],
+            n_goods=N_GOODS,
+            chunk_ticks=CHUNK_TICKS,
+        ),
+    )
+
+    assert [chunk.n_ticks for chunk in chunks] == [10, 10, 3]
+    assert all(
+        np.shares_memory(chunk.stock_values, chunks[0].stock_values) for chunk in chunks
+    )
+
+
+def test_environments_must_match_the_markets() -> None:
+    with pytest.raises(ValueError, match="Expected 3 environments, got 2"):
+        next(iter_trajectories(3, N_TICKS, ENVIRONMENTS))
+
+
+def test_record_ticks_steps_a_single_market() -> None:
+    market = Market(ENVIRONMENTS[1], seed=SEED)
+    chunk = Trajectories.empty_like(N_TICKS, market)
+
+    record_ticks(market, chunk)
+
+    assert chunk.stock_values.shape == (N_TICKS, NUM_GOODS)
+    np.testing.assert_array_equal(
+        chunk.stock_values[-1],
+        np.float32(market.stock_values),
+    )
@@ -0,0 +1,145 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from cookieLearner.market.market import Config, Mode
+from cookieLearner.market.trading import MAX_QUANTITY
+from cookieLearner.market.value_iteration import (
+    BUY,
+    HOLD,
+    SELL,
+    TradingPolicy,
+    _Kernel,
+    _value_iteration,
+    solve_trading_policy,
+)
+
+CONFIG = Config(duration_max_dragon_boost=1)
+MIN_BANK_LEVEL = 1
+MAX_BANK_LEVEL = 2
+MAX_BROKERS = 3
+VALUE_BINS = 8
+DELTA_BINS = 3
+N_GOODS = 3
+DISCOUNT = 0.9
+# Prices of the two states of a deterministic cycle
+LOW_PRICE = 1.0
+HIGH_PRICE = 3.0
+
+
+@pytest.fixture(scope="module")
+def policy() -> TradingPolicy:
+    return solve_trading_policy(
+        min_bank_level=MIN_BANK_LEVEL,
+        max_bank_level=MAX_BANK_LEVEL,
+        max_brokers=MAX_BROKERS,
+        value_bins=VALUE_BINS,
+        delta_bins=DELTA_BINS,
+        discount=DISCOUNT,
+        tolerance=1e-9,
+        n_markets=8,
+        n_ticks=400,
+        burn_in=100,
+        n_goods=N_GOODS,
+        config=CONFIG,
+        seed=4,
+    )
+
+
+def test_cycle_buys_low_and_sells_high() -> None:
+    kernel = _Kernel(
+        *np.zeros((4, 1)),
+        row_starts=np.array([0, 1, 2]),
+        targets=np.array([1, 0]),
+        probabilities=np.ones(2),
+        state_values=np.array([LOW_PRICE, HIGH_PRICE]),
+        visited=np.ones(2, dtype=np.bool_),
+    )
+
+    actions, values = _value_iteration(
+        kernel,
+        slice(0, 2),
+        np.ones(1),
+        DISCOUNT,
+        tolerance=1e-12,
+        max_iterations=10_000,
+    )
+
+    # Buying low and selling high every other tick forever
+    buy_low = (HIGH_PRICE * DISCOUNT - LOW_PRICE) / (1 - DISCOUNT**2)
+    np.testing.assert_array_equal(actions[0], [[BUY, HOLD], [HOLD, SELL]])
+    np.testing.assert_allclose(
+        values[0],
+        [
+            [buy_low, DISCOUNT * (HIGH_PRICE + DISCOUNT * buy_low)],
+            [DISCOUNT * buy_low, HIGH_PRICE + DISCOUNT * buy_low],
+        ],
+    )
+
+
+def test_policy_trades_only_from_the_right_holding(policy: TradingPolicy) -> None:
+    assert policy.actions.shape == (
+        N_GOODS,
+        MAX_BANK_LEVEL - MIN_BANK_LEVEL + 1,
+        MAX_BROKERS + 1,
+        VALUE_BINS,
+        DELTA_BINS,
+        len(Mode),
+        2,
+    )
+    assert set(np.unique(policy.actions[..., 0])) <= {HOLD, BUY}
+    assert set(np.unique(policy.actions[..., 1])) <= {HOLD, SELL}
+    assert (policy.actions == BUY).any()
+    assert (policy.actions == SELL).any()
+    # Cheaper buys with every broker can only help
+    assert (np.diff(policy.values[..., 0], axis=2) >= 0).all()
+
+
+def test_quantities_follow_the_actions(policy: TradingPolicy) -> None:
+    stock_id = np.arange(N_GOODS)[:, np.newaxis]
+    stock_value = np.linspace(1, 150, 20)
+    arguments = (stock_id, MAX_BANK_LEVEL, 1, stock_value, 0.0, Mode.STABLE)
+
+    for stock, held, quantity in ((0, False, MAX_QUANTITY), (5, True, -MAX_QUANTITY)):
+        actions = policy.action(*arguments, held)
+        quantities = policy.quantities(*arguments, stock)
+        np.testing.assert_array_equal(quantities != 0, actions != HOLD)
+        np.testing.assert_array_equal(quantities[quantities != 0], quantity)
+
+
+def test_save_load_round_trip(policy: TradingPolicy, tmp_path: Path) -> None:
+    path = tmp_path / "policy.npz"
+    policy.save(path)
+
+    loaded = TradingPolicy.load(path)
+
+    assert (loaded.config, loaded.dragon_boost, loaded.discount) == (
+        CONFIG,
+        0.0,
+        DISCOUNT,
+    )
+    assert loaded.bank_levels == policy.bank_levels
+    assert loaded.max_brokers == MAX_BROKERS
+    for name in ("value_low", "value_step", "delta_low", "delta_step", "values"):
+        np.testing.assert_array_equal(getattr(loaded, name), getattr(policy, name))
+    np.testing.assert_array_equal(loaded.actions, policy.actions)
+    stock_value = np.linspace(1, 150, 20)
+    np.testing.assert_array_equal(
+        loaded.action(1, 99, 7, stock_value, 0.5, Mode.FAST_RISE, held=True),
+        policy.action(1, 99, 7, stock_value, 0.5, Mode.FAST_RISE, held=True),
+    )
+
+
+def test_load_rejects_other_versions(policy: TradingPolicy, tmp_path: Path) -> None:
+    path = tmp_path / "policy.npz"
+    policy.save(path)
+    with np.load(path) as data:
+        arrays = dict(data)
+    arrays["header"] = np.array(
+        str(arrays["header"]).replace('"version": 1', '"version": 2'),
+    )
+    np.savez(path, **arrays)
+
+    with pytest.raises(ValueError, match="Unsupported trading policy version 2"):
+        TradingPolicy.load(path)
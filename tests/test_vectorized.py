@@ -0,0 +1,117 @@
+import random
+
+import numpy as np
+import pytest
+
+from cookieLearner.market.compiled import CompiledConfig
+from cookieLearner.market.market import (
+    DEFAULT_CONFIG,
+    GameEnvironment,
+    Mode,
+    resting_stock_value,
+    tick,
+)
+from cookieLearner.market.vectorized import tick_batch
+
+ENVIRONMENT = GameEnvironment(bank_level=3, num_brokers=0, dragon_boost=0.3)
+N_GOODS = 6
+N_TICKS = 12
+# Every tick carries a global delta, so instant mode changes happen
+GLOBAL_DELTA = 0.5
+INSTANT_MODE_CHANGE_PROBABILITY = 0.2
+
+
+def initial_state(n_rows: int) -> tuple[np.ndarray, ...]:
+    """Rows of goods starting in every mode, close to expiring."""
+    shape = (n_rows, N_GOODS)
+    return (
+        np.full(shape, 50.0),
+        np.full(shape, 0.5),
+        np.broadcast_to(np.arange(N_GOODS, dtype=np.int8) % len(Mode), shape).copy(),
+        np.full(shape, 4, dtype=np.int64),
+    )
+
+
+def run_scalar(n_rows: int) -> tuple[np.ndarray, ...]:
+    rng = random.Random(0)
+    values, deltas, modes, durations = initial_state(n_rows)
+    modes = modes.astype(object)
+    for row in range(n_rows):
+        for good in range(N_GOODS):
+            state = (
+                float(values[row, good]),
+                float(deltas[row, good]),
+                Mode(modes[row, good]),
+                int(durations[row, good]),
+            )
+            for _ in range(N_TICKS):
+                state = tick(
+                    *state,
+                    resting_stock_value(good, ENVIRONMENT.bank_level),
+                    ENVIRONMENT.bank_level,
+                    GLOBAL_DELTA,
+                    INSTANT_MODE_CHANGE_PROBABILITY,
+                    ENVIRONMENT.dragon_boost,
+                    rng=rng,
+                )
+            index = (row, good)
+            values[index], deltas[index], modes[index], durations[index] = state
+    return values, deltas, modes.astype(np.int8), durations
+
+
+def run_batch(n_rows: int) -> tuple[np.ndarray, ...]:
+    rng = np.random.default_rng(0)
+    compiled = CompiledConfig.from_config(DEFAULT_CONFIG, ENVIRONMENT, N_GOODS)
+    state = initial_state(n_rows)
+    for _ in range(N_TICKS):
+        state = tick_batch(
+            *state,
+            GLOBAL_DELTA,
+            INSTANT_MODE_CHANGE_PROBABILITY,
+            compiled,
+            rng=rng,
+        )
+    return state
+
+
+@pytest.fixture(scope="module")
+def scalar() -> tuple[np.ndarray, ...]:
+    return run_scalar(2000)
+
+
+@pytest.fixture(scope="module")
+def batch() -> tuple[np.ndarray, ...]:
+    return run_batch(20_000)
+
+
+def assert_same_mean(scalar: np.ndarray, batch: np.ndarray) -> None:
+    """Means per good agree within 5 standard errors."""
+    standard_error = np.sqrt(
+        scalar.var(axis=0) / scalar.shape[0] + batch.var(axis=0) / batch.shape[0],
+    )
+    difference = np.abs(scalar.mean(axis=0) - batch.mean(axis=0))
+    assert np.all(difference <= 5 * standard_error + 1e-12)
+
+
+@pytest.mark.parametrize("field", [0, 1, 3])
+def test_tick_batch_matches_scalar_tick_in_distribution(
+    scalar: tuple[np.ndarray, ...],
+    batch: tuple[np.ndarray, ...],
+    field: int,
+) -> None:
+    assert_same_mean(
+        scalar[field].astype(np.float64),
+        batch[field].astype(np.float64),
+    )
+
+
+@pytest.mark.parametrize("mode", list(Mode))
+def test_tick_batch_matches_scalar_mode_shares(
+    scalar: tuple[np.ndarray, ...],
+    batch: tuple[np.ndarray, ...],
+    mode: Mode,
+) -> None:
+    assert_same_mean(
+        (scalar[2] == mode).astype(np.float64),
+        (batch[2] == mode).astype(np.float64),
+    )